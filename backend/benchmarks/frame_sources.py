@@ -0,0 +1,122 @@
+"""
+Frame source microbenchmark against a local MJPEG stand-in (an HTTP server
+streaming synthetic JPEG frames, like an IP doorbell's MJPEG endpoint).
+
+Compares decoding on the consumer loop (read + imdecode inline, as
+Pipeline.run did with cv2.VideoCapture) with MjpegSource's decode thread at
+each decode scale, while the consumer spends --work-ms per frame.
+
+    python -m backend.benchmarks.frame_sources [--size 1920x1080] [--fps 30] [--seconds 5] [--work-ms 25]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.core.sources import MjpegSource, SyntheticSource, REDUCED_FLAGS
+
+BOUNDARY = b"frame"
+
+
+def make_jpegs(size, count=60):
+    source = SyntheticSource(size=size, fps=1000)
+    source._open()
+    return [cv2.imencode(".jpg", source._decode(), [int(cv2.IMWRITE_JPEG_QUALITY), 85])[1].tobytes()
+            for _ in range(count)]
+
+
+def serve(jpegs, fps):
+    """MJPEG over HTTP on a free local port. :return: (server, url)"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY.decode()}")
+            self.end_headers()
+            i = 0
+            try:
+                while True:
+                    jpg = jpegs[i % len(jpegs)]
+                    self.wfile.write(b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+                                     + f"Content-Length: {len(jpg)}\r\n\r\n".encode() + jpg + b"\r\n")
+                    i += 1
+                    time.sleep(1.0 / fps)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/stream.mjpg"
+
+
+def run_inline(url, seconds, work_s):
+    """Consumer reads and decodes the stream itself."""
+    source = MjpegSource(url)
+    source._running = True
+    source._open()
+    processed, decode_ms = 0, []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        jpg = source._next_jpeg()
+        if jpg is None:
+            # Stream closed: reconnect as the source thread would
+            source._close()
+            source._open()
+            continue
+        cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), REDUCED_FLAGS[1])
+        decode_ms.append((time.perf_counter() - t0) * 1000.0)
+        time.sleep(work_s)
+        processed += 1
+    source._close()
+    return processed / seconds, float(np.mean(decode_ms))
+
+
+def run_threaded(url, seconds, work_s, scale):
+    source = MjpegSource(url, decode_scale=scale, metrics_prefix="benchmark.source")
+    source.start()
+    processed = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        if source.read() is None: continue
+        time.sleep(work_s)
+        processed += 1
+    stats = source.stats()
+    source.stop()
+    return processed / seconds, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--work-ms", type=float, default=25, help="Simulated pipeline work per frame")
+    args = parser.parse_args()
+    w, h = (int(v) for v in args.size.split("x"))
+
+    server, url = serve(make_jpegs((w, h)), args.fps)
+    work_s = args.work_ms / 1000.0
+    print(f"MJPEG stand-in {w}x{h} @ {args.fps:.0f} fps, {args.work_ms:.0f} ms work per frame")
+    print(f"{'mode':<16} {'processed fps':>14} {'source fps':>11} {'decode ms':>10} {'dropped':>8} {'size':>10}")
+
+    fps, decode_ms = run_inline(url, args.seconds, work_s)
+    print(f"{'inline':<16} {fps:>14.1f} {'-':>11} {decode_ms:>10.2f} {'-':>8} {f'{w}x{h}':>10}")
+    for scale in (1, 2, 4):
+        fps, stats = run_threaded(url, args.seconds, work_s, scale)
+        size = "x".join(str(v) for v in stats["size"]) if stats["size"] else "-"
+        print(f"{f'threaded 1/{scale}':<16} {fps:>14.1f} {stats['fps']:>11.1f} {stats['decode_ms']:>10.2f} {stats['dropped']:>8} {size:>10}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
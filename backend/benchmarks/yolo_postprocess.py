@@ -0,0 +1,123 @@
+"""
+YOLO postprocess benchmark: the previous transpose + cv2.dnn.NMSBoxes + dict
+loop path against the vectorized postprocess_yolo, per frame and batched.
+Uses synthetic outputs shaped like the weapon model's, so no model is needed.
+
+    python -m backend.benchmarks.yolo_postprocess [--frames 200] [--batch 8] [--candidates 40]
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.config.config import Config
+from backend.core.detections import postprocess_yolo
+
+ANCHORS = 8400
+
+
+def legacy_postprocess(output, img_width, img_height, img_size, conf_thres, iou_thres, classes):
+    """The pre-vectorization WeaponDetector.postprocess, kept for comparison."""
+    predictions = np.transpose(output[0], (0, 2, 1))
+    pred = predictions[0]
+    class_scores = pred[:, 4:]
+    max_scores = np.max(class_scores, axis=1)
+    max_indices = np.argmax(class_scores, axis=1)
+    mask = max_scores > conf_thres
+    filtered_pred = pred[mask]
+    filtered_scores = max_scores[mask]
+    filtered_indices = max_indices[mask]
+    if len(filtered_pred) == 0:
+        return []
+
+    cx, cy, w, h = filtered_pred[:, 0], filtered_pred[:, 1], filtered_pred[:, 2], filtered_pred[:, 3]
+    scale_x = img_width / img_size
+    scale_y = img_height / img_size
+    x1 = (cx - w/2) * scale_x
+    y1 = (cy - h/2) * scale_y
+    x2 = (cx + w/2) * scale_x
+    y2 = (cy + h/2) * scale_y
+    boxes_np = np.stack([x1, y1, x2-x1, y2-y1], axis=1)
+
+    indices = cv2.dnn.NMSBoxes(bboxes=boxes_np.tolist(), scores=filtered_scores.tolist(),
+                               score_threshold=conf_thres, nms_threshold=iou_thres)
+    results = []
+    if len(indices) > 0:
+        for i in indices.flatten():
+            class_id = filtered_indices[i]
+            class_name = classes[class_id] if class_id < len(classes) else f"Class {class_id}"
+            results.append({"box": boxes_np[i].astype(int).tolist(), "score": float(filtered_scores[i]), "class": class_name})
+    return results
+
+
+def synthetic_output(rng, n, num_classes, img_size, candidates):
+    """[n, 4 + nc, anchors]: background noise plus clusters of overlapping confident boxes."""
+    out = np.empty((n, 4 + num_classes, ANCHORS), dtype=np.float32)
+    out[:, 0:2] = rng.uniform(0, img_size, (n, 2, ANCHORS))
+    out[:, 2:4] = rng.uniform(8, img_size / 4, (n, 2, ANCHORS))
+    out[:, 4:] = rng.uniform(0, 0.3, (n, num_classes, ANCHORS))
+    for i in range(n):
+        idx = rng.choice(ANCHORS, candidates, replace=False)
+        centers = rng.uniform(100, img_size - 100, (max(candidates // 8, 1), 2))
+        cluster = rng.integers(0, len(centers), candidates)
+        out[i, 0:2, idx] = centers[cluster] + rng.normal(0, 4, (candidates, 2))
+        out[i, 2:4, idx] = rng.uniform(60, 120, (candidates, 2))
+        out[i, 4 + rng.integers(0, num_classes, candidates), idx] = rng.uniform(Config.WEAPON_CONF_THRESH, 1.0, candidates)
+    return out
+
+
+def timed(fn, repeats):
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) * 1000.0 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO postprocess benchmark")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--candidates", type=int, default=40, help="Boxes above the threshold per frame")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    nc = len(Config.WEAPON_CLASS_NAMES)
+    size = Config.WEAPON_IMG_SIZE
+    conf, iou = Config.WEAPON_CONF_THRESH, Config.WEAPON_IOU_THRESH
+    outputs = synthetic_output(rng, args.batch, nc, size, args.candidates)
+    frame_hw = (720, 1280)
+
+    def legacy():
+        for i in range(args.batch):
+            legacy_postprocess([outputs[i:i + 1]], frame_hw[1], frame_hw[0], size, conf, iou, Config.WEAPON_CLASS_NAMES)
+
+    def vectorized():
+        for i in range(args.batch):
+            postprocess_yolo(outputs[i:i + 1], [frame_hw], size, conf, iou)
+
+    def batched():
+        postprocess_yolo(outputs, [frame_hw] * args.batch, size, conf, iou)
+
+    repeats = max(args.frames // args.batch, 1)
+    for fn in (legacy, vectorized, batched):
+        fn() # Warm up
+    results = [("legacy (transpose + NMSBoxes)", timed(legacy, repeats)),
+               ("vectorized, per frame", timed(vectorized, repeats)),
+               (f"vectorized, batch of {args.batch}", timed(batched, repeats))]
+
+    kept_legacy = sum(len(legacy_postprocess([outputs[i:i + 1]], frame_hw[1], frame_hw[0], size, conf, iou,
+                                             Config.WEAPON_CLASS_NAMES)) for i in range(args.batch))
+    kept_new = sum(len(d) for d in postprocess_yolo(outputs, [frame_hw] * args.batch, size, conf, iou))
+    print(f"{args.batch} frames x {ANCHORS} anchors, {args.candidates} candidates/frame, {nc} classes")
+    print(f"boxes kept: legacy {kept_legacy} (class-agnostic NMS), vectorized {kept_new} (class-aware NMS)")
+    print(f"{'path':<32} {'ms/frame':>9}")
+    for name, ms in results:
+        print(f"{name:<32} {ms / args.batch:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+import os
+import argparse
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.model_select import KINDS, calibrate, load_calibration, machine_key, print_table, select_variant
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model variants on this machine and pick the ones that fit the frame budget")
+    parser.add_argument("kinds", nargs="*", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--show", action="store_true", help="Print the stored results without benchmarking")
+    args = parser.parse_args()
+
+    print(f"Machine: {machine_key()}")
+    if args.show:
+        machine = load_calibration().get("machines", {}).get(machine_key(), {})
+    else:
+        machine = calibrate(args.kinds)
+    print_table(machine)
+    for kind in KINDS:
+        variant = select_variant(kind)
+        print(f"Selected {kind}: {variant['name']} ({variant['path']})")
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,9 @@ load_dotenv()
 class Config:
     # Model settings
     MODEL_PATH = "models/pose/pose_landmarker_lite.task"
+    POSE_RESET_GAP_MS = 5000 # Timestamp gap inserted by PoseDetector.reset() between streams
     MOVINET_MODEL_PATH = "models/violence/model.tflite"
+    MOVINET_ZERO_COPY = True # Write frames / states straight into the interpreter's tensors
     
     # Camera / Pipeline settings
     FPS = 30
@@ -49,14 +51,170 @@ class Config:
     WEAPON_DEBOUNCE_FRAMES = 10
     WEAPON_COOLDOWN_S = 20.0
     WEAPON_CLASS_NAMES = ['Gun', 'Explosive', 'Grenade', 'Knife']
+    # Cascade: a cheap stage 1 screens frames, the full detector runs on candidates
+    WEAPON_CASCADE = True
+    WEAPON_CASCADE_STAGE1_MODEL = "models/weapons/best_320.onnx" # Missing: the full model at STAGE1_SIZE (dynamic-shape exports only)
+    WEAPON_CASCADE_STAGE1_SIZE = 320
+    WEAPON_CASCADE_STAGE1_THRESH = 0.25 # Low: stage 1 only has to not miss
+    WEAPON_CASCADE_SAFETY_INTERVAL = 15 # Run the full detector at least every N frames
+    WEAPON_CASCADE_HOLD_FRAMES = 15 # Keep running the full detector this many frames after a hit
+    # Detect-then-track: boxes follow optical flow between detector results
+    WEAPON_DETECT_INTERVAL = 3 # Send every Nth frame to the weapon worker
+    WEAPON_TRACKING = True
+    WEAPON_TRACK_DECAY = 0.97 # Score multiplier per tracked (undetected) frame
+    WEAPON_TRACK_MIN_SCORE = 0.5 # Drop a track whose decayed score falls below this
+    WEAPON_TRACK_MAX_AGE_S = 2.0 # Drop a track not re-detected for this long
+    WEAPON_TRACK_IOU = 0.3 # Detection-to-track matching
+    WEAPON_TRACK_POINTS = 30 # Flow points per box
+    WEAPON_TRACK_SCALE = 0.5 # Flow is computed on a downscaled grey frame
+
+    # ONNX Runtime sessions (backend/core/ort_session.py)
+    ORT_INTRA_OP_THREADS = 0 # 0 = ONNX Runtime default (one per physical core)
+    ORT_INTER_OP_THREADS = 0
+    ORT_GRAPH_OPTIMIZATION = "all" # "disable", "basic", "extended" or "all"
+    ORT_EXECUTION_MODE = "sequential" # or "parallel" (only helps graphs with parallel branches)
+    ORT_CACHE_DIR = "models/.ort_cache" # Optimized graphs, keyed by model hash; None disables
+    ORT_IO_BINDING = True # Preallocated input / output buffers bound once
+
+    # Model variants (see backend/core/model_select.py). Artefacts that are not
+    # on disk are skipped. "img_size" only matters for dynamic-shape ONNX exports.
+    MOVINET_VARIANTS = {
+        "float": {"path": "models/violence/model.tflite"},
+        "dynamic": {"path": "models/violence/model_dynamic.tflite"}, # Dynamic-range quantized
+        "int8": {"path": "models/violence/model_int8.tflite"}
+    }
+    WEAPON_VARIANTS = {
+        "640": {"path": "models/weapons/best.onnx", "img_size": 640},
+        "640-int8": {"path": "models/weapons/best_int8.onnx", "img_size": 640},
+        "416": {"path": "models/weapons/best_416.onnx", "img_size": 416},
+        "320": {"path": "models/weapons/best_320.onnx", "img_size": 320}
+    }
+    MODEL_VARIANT_SELECTION = "auto" # "auto": best calibrated variant within budget; or "default": MOVINET_MODEL_PATH / WEAPON_MODEL_PATH
+    MODEL_FRAME_BUDGET_MS = {"violence": 66.0, "weapon": 100.0} # p95 inference latency each worker must stay under
+    MODEL_ACCURACY_TOLERANCE = 0.05 # Accept a faster variant this much less accurate than the best
+    MODEL_CALIBRATION_PATH = "models/calibration.json"
+    MODEL_CALIBRATION_CLIPS = "models/calibration" # <kind>/<label>/*.mp4, e.g. violence/fight, weapon/none
+    MODEL_CALIBRATION_POSITIVE = {"violence": "fight", "weapon": "weapon"} # Label of positive clips
+    MODEL_CALIBRATION_FRAMES = 90 # Frames per clip
+    MODEL_CALIBRATE_ON_STARTUP = False # Calibrate before starting workers if this machine has no results
 
-    # Clip & Logging Settings
     # Clip & Logging Settings
     LOG_DIR = "logs"
-    CLIP_DURATION_SECONDS = 60
-    CLIP_COOLDOWN_SECONDS = 60
+    CLIP_TRIGGER_INTENT = 0.6 # Intent that starts an event
+    CLIP_SUSTAIN_INTENT = 0.5 # Event extends while intent stays above this (hysteresis)
+    CLIP_QUIET_PERIOD_S = 5.0 # Event ends after this long below sustain; re-triggers inside it are merged
+    CLIP_MAX_DURATION_S = 120.0 # Hard cap; a still-active event continues in a new clip
+    CLIP_SEGMENT_SECONDS = 2.0 # Length of live-viewable segments
+    CLIP_SEGMENT_QUEUE_MAX = 120 # Raw frames spooled to tmpfs but not yet encoded (all events) before dropping; ~750 MB at 1080p
+    CLIP_KEEP_SEGMENTS = False # Keep segments after they were concatenated
+    SUMMARY_MAX_SEGMENTS = 8 # Segments uploaded for the AI summary when they could not be joined
+    FFMPEG_BIN = "ffmpeg"
+    FFPROBE_BIN = "ffprobe" # Keyframe index for replay seeks
+
+    # Clip Encoder Pool
+    CLIP_ENCODER_WORKERS = 2
+    CLIP_ENCODER_NICE = 10 # Lower priority than the real-time loop
+    CLIP_ENCODER_MAX_PENDING = 8 # Queued jobs before new segments drop frames
+    CLIP_SPOOL_DIR = None # Raw frame spool; None -> /dev/shm if available, else system temp
+
+    # Retention Settings
+    RETENTION_ENABLED = True
+    RETENTION_MAX_BYTES = 8 * 1024**3 # Total budget for clips + metadata
+    RETENTION_MAX_AGE_DAYS = None # e.g. 30; None/0 disables the age limit
+    RETENTION_SWEEP_INTERVAL_S = 300
+    RETENTION_ORPHAN_GRACE_S = 3600 # Unreferenced media older than this is removed
+    RETENTION_REENCODE_AFTER_DAYS = None # e.g. 7; None/0 disables re-encoding. Only clips saved with 'saved_at' are touched
+    RETENTION_REENCODE_SCALE = 0.5
+    RETENTION_REENCODE_NICE = 19
+    EVENT_INDEX_PATH = None # SQLite index of logs/metadata; None -> <LOG_DIR>/events.db
     
     
+    # WebSocket Streaming
+    WS_CLIENT_QUEUE_MAX = 64 # JSON messages queued per client before the oldest is dropped
+    WS_CLIENT_STALL_S = 5.0 # A single send blocked this long disconnects the client
+
+    # Inference worker supervision (ModelPool)
+    WORKER_SUPERVISE_INTERVAL_S = 1.0
+    WORKER_HANG_TIMEOUT_S = 15.0 # No heartbeat for this long -> killed and restarted
+    WORKER_LOAD_TIMEOUT_S = 120.0 # Model load budget before a worker counts as hung
+    WORKER_RESTART_BACKOFF_S = 2.0
+    WORKER_RESTART_BACKOFF_MAX_S = 120.0
+
+    # Shared inference servers: one process per model serving every camera stream
+    INFERENCE_SERVER = True # False: one violence / weapon worker process per ModelPool
+    INFERENCE_MAX_STREAMS = 8 # Frame slots (PIPELINE_FRAME_MAX_BYTES each) reserved in shared memory
+    INFERENCE_MAX_BATCH = 4
+    INFERENCE_BATCH_WAIT_MS = 5.0 # How long the server waits for other streams after the first request
+
+    # "thread": pipeline runs inside the API process. "process": its own supervised
+    # process, frames come back through shared memory (no GIL shared with the API).
+    PIPELINE_MODE = "thread"
+    PIPELINE_FRAME_MAX_BYTES = 1920 * 1080 * 3 # Shared slot capacity
+    PIPELINE_META_MAX_BYTES = 64 * 1024
+    PIPELINE_METRICS_INTERVAL_S = 2.0
+    PIPELINE_RESTART_BACKOFF_S = 1.0
+    PIPELINE_RESTART_BACKOFF_MAX_S = 60.0
+
+    # Cameras: one pipeline each. source is a device index, a video file or a
+    # local rtsp:// / http:// URL; cpus pins the camera's process (None: any core).
+    # With more than one camera, each runs in its own process (CameraOrchestrator).
+    # e.g. "side_gate": {"source": "rtsp://192.168.1.21:554/stream1", "cpus": [2]},
+    #      "garage": {"source": "rtsp://192.168.1.22:554/stream1", "cpus": [3]}
+    CAMERAS = {
+        "front_door": {"source": 0, "cpus": None}
+    }
+    DEFAULT_CAMERA = "front_door" # Used by /ws without ?camera=, replay and live video
+    # Sensor -> camera, looked up as "device/sensor", then "device", then "sensor"
+    # (device from the message or /ws/sensor?device=...); unmapped sensors use DEFAULT_CAMERA
+    SENSOR_CAMERAS = {}
+
+    # Frame sources (backend/core/sources.py). A camera source may also be a dict,
+    # e.g. {"url": "rtsp://...", "decode_scale": 2} or {"type": "synthetic", "size": (640, 480)}
+    SOURCE_DECODE_SCALE = 1 # 1, 2, 4 or 8: decode at 1/n resolution (reduced JPEG decode for MJPEG / images)
+    SOURCE_HW_DECODE = True # Ask FFmpeg for hardware decoding (VAAPI, etc.) where OpenCV supports it
+    SOURCE_RTSP_TRANSPORT = "tcp" # "tcp" or "udp"
+    SOURCE_OPEN_TIMEOUT_S = 10.0
+    SOURCE_READ_TIMEOUT_S = 5.0 # No frame for this long: the stream is reconnected
+    SOURCE_RECONNECT_BACKOFF_S = 1.0
+    SOURCE_RECONNECT_BACKOFF_MAX_S = 30.0
+    SOURCE_FILE_QUEUE = 8 # Frames decoded ahead for files / image directories (never dropped)
+    SOURCE_METRICS_INTERVAL_S = 1.0
+
+    # Stream tiers, picked by clients at connect (?tier=...). Each tier is encoded
+    # once per frame and only while somebody watches it. fps=None -> every frame.
+    STREAM_TIERS = {
+        "full": {"height": None, "quality": 70, "fps": None},
+        "480p": {"height": 480, "quality": 50, "fps": None},
+        "240p": {"height": 240, "quality": 50, "fps": 5},
+    }
+    STREAM_DEFAULT_TIER = "full"
+    STREAM_CHANGE_GRID = (32, 18) # Thumbnail size used to detect unchanged frames
+    STREAM_CHANGE_THRESH = 1.0 # Mean abs grey-level difference below which a frame is unchanged
+    STREAM_REFRESH_S = 1.0 # Re-encode at least this often even if nothing changed
+    STREAM_ENCODER_THREADS = 2 # JPEG encoding threads, off the pipeline thread
+    STREAM_JPEG_BACKEND = "auto" # "auto" (simplejpeg if installed), "simplejpeg" or "opencv"
+
+    # Fragmented MP4 (H.264) live stream on /ws/video, for remote viewing over slow uplinks
+    LIVE_VIDEO_ENABLED = True
+    LIVE_VIDEO_HEIGHT = 720
+    LIVE_VIDEO_FPS = 15
+    LIVE_VIDEO_GOP_S = 0.5 # Fragment length; also the added latency
+    LIVE_VIDEO_BITRATE = "1200k"
+    LIVE_VIDEO_LEVEL = "3.1"
+    LIVE_VIDEO_CODEC = "avc1.42E01F" # Constrained baseline, level 3.1 (MSE codec string)
+    LIVE_VIDEO_CLIENT_QUEUE = 4 # Fragments queued per client before dropping
+    LIVE_VIDEO_IDLE_STOP_S = 10.0 # Stop ffmpeg this long after the last viewer left
+
+    # Binary frame protocol: signal order of the packed float32 vector.
+    # Changing this list changes the schema ID sent to clients at connect.
+    STREAM_SIGNAL_KEYS = [
+        "presence_s", "doorbell_rings", "net_disp", "motion_E", "velocity",
+        "head_yaw_rate", "head_osc", "head_down", "dir_flip", "osc_energy",
+        "stop_go", "hand_fidget", "movinet_pressure", "loitering_score",
+        "loitering_time", "loitering_radius", "weapon_confirmed",
+        "weapon_cooldown", "weapon_score"
+    ]
+
     # GenAI
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     
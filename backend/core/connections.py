@@ -0,0 +1,311 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+from fastapi import WebSocket
+from backend.config.config import Config
+from backend.core.metrics import metrics
+from backend.core.frame_protocol import FrameSchema
+from backend.core.encoder import default_serializer
+from backend.core.stream import TIER_META, TIER_EVENTS
+
+PROTOCOL_LEGACY = "legacy" # JSON metadata message + JPEG message
+PROTOCOL_BINARY = "binary" # One message: header + packed signals + JPEG
+
+
+class FrameMailbox:
+    """
+    Single-slot handoff from producer threads to the asyncio loop.
+
+    put() overwrites the slot (latest frame wins) and wakes the loop with
+    call_soon_threadsafe only when the slot was empty, so there is at most one
+    wakeup per delivered frame and none at all when idle.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, name="stream"):
+        self.loop = loop
+        self.name = name # Metrics prefix
+        self.event = asyncio.Event()
+        self._lock = threading.Lock()
+        self._slot = None # (item, put time)
+        self.replaced = 0
+
+    def put(self, item):
+        with self._lock:
+            was_empty = self._slot is None
+            if not was_empty:
+                self.replaced += 1
+                metrics.inc(f"{self.name}.handoff_replaced")
+            self._slot = (item, time.perf_counter())
+        if was_empty:
+            try:
+                self.loop.call_soon_threadsafe(self.event.set)
+            except RuntimeError:
+                pass # Loop closed during shutdown
+
+    async def get(self):
+        """Wait for the next item; returns (item, handoff latency in ms)."""
+        while True:
+            await self.event.wait()
+            self.event.clear()
+            with self._lock:
+                slot, self._slot = self._slot, None
+            if slot is not None:
+                item, put_at = slot
+                latency_ms = (time.perf_counter() - put_at) * 1000.0
+                metrics.observe(f"{self.name}.handoff_ms", latency_ms)
+                return item, latency_ms
+
+
+class FrameBundle:
+    """
+    One broadcast frame: metadata plus the latest image of every watched tier.
+    Wire messages are built lazily per (protocol, tier, with image) and shared by
+    all clients that need the same variant.
+    """
+    def __init__(self, schema, seq, timestamp, metadata, images):
+        self.schema = schema
+        self.seq = seq
+        self.timestamp = timestamp
+        self.metadata = metadata
+        self.images = images # tier -> (image_id, jpg_bytes)
+        self._built = {}
+
+    def messages(self, protocol, tier, include_image):
+        key = (protocol, tier, include_image)
+        if key not in self._built:
+            jpg = self.images[tier][1] if include_image else b""
+            if protocol == PROTOCOL_BINARY:
+                # Empty payload = image unchanged, keep showing the previous one
+                msgs = [("bytes", self.schema.pack(self.seq, self.timestamp, self.metadata, jpg))]
+            else:
+                msgs = [("text", json.dumps(self.metadata))]
+                if jpg:
+                    msgs.append(("bytes", jpg))
+            self._built[key] = msgs
+        return self._built[key]
+
+
+class ClientConnection:
+    """
+    One dashboard socket with its own outbound queue and sender task.
+
+    Frames use a single slot (latest frame wins): a client that cannot keep up
+    skips frames instead of delaying everyone else. JSON messages (sensor events,
+    notifications) go through a small bounded queue and are sent before frames.
+    A send that takes longer than WS_CLIENT_STALL_S disconnects the client.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, websocket: WebSocket, on_close=None, protocol=PROTOCOL_LEGACY, tier=None, camera=None):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.tier = tier or Config.STREAM_DEFAULT_TIER
+        self.camera = camera or Config.DEFAULT_CAMERA
+        self.last_image_id = None # Last image actually sent to this client
+        self.client_id = next(self._ids)
+        self.on_close = on_close
+        self.connected_at = time.time()
+
+        self.frame_slot = None # (FrameBundle, enqueue time)
+        self.messages = deque()
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+        # Counters
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.lag_ms = 0.0 # EMA of enqueue -> sent
+        self.max_lag_ms = 0.0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    def push_frame(self, bundle):
+        """Replace the pending frame (FrameBundle)."""
+        if self.frame_slot is not None:
+            self.frames_dropped += 1
+        self.frame_slot = (bundle, time.perf_counter())
+        self.wakeup.set()
+
+    def push_message(self, text):
+        """Queue a pre-serialized JSON message."""
+        if len(self.messages) >= Config.WS_CLIENT_QUEUE_MAX:
+            self.messages.popleft()
+            self.messages_dropped += 1
+        self.messages.append((text, time.perf_counter()))
+        self.wakeup.set()
+
+    async def _send(self, kind, payload):
+        if kind == "bytes":
+            send = self.websocket.send_bytes(payload)
+        elif kind == "text":
+            send = self.websocket.send_text(payload)
+        else:
+            send = self.websocket.send_json(payload)
+        await asyncio.wait_for(send, timeout=Config.WS_CLIENT_STALL_S)
+
+    def _record_lag(self, enqueued):
+        lag = (time.perf_counter() - enqueued) * 1000.0
+        self.lag_ms = 0.1 * lag + 0.9 * self.lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag)
+
+    async def _run(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+
+                while self.messages:
+                    text, enqueued = self.messages.popleft()
+                    await self._send("text", text)
+                    self.messages_sent += 1
+                    self._record_lag(enqueued)
+
+                if self.frame_slot is not None:
+                    bundle, enqueued = self.frame_slot
+                    self.frame_slot = None
+                    # Image only if this client does not have it yet
+                    image_id = bundle.images[self.tier][0] if self.tier in bundle.images else None
+                    include_image = image_id is not None and image_id != self.last_image_id
+                    for kind, payload in bundle.messages(self.protocol, self.tier, include_image):
+                        await self._send(kind, payload)
+                    if include_image:
+                        self.last_image_id = image_id
+                    self.frames_sent += 1
+                    self._record_lag(enqueued)
+        except asyncio.CancelledError:
+            return
+        except asyncio.TimeoutError:
+            print(f"[WS] Client {self.client_id} stalled for {Config.WS_CLIENT_STALL_S}s, disconnecting")
+            metrics.inc("ws.stall_disconnects")
+            try:
+                await asyncio.wait_for(self.websocket.close(), timeout=1.0)
+            except Exception:
+                pass
+        except Exception:
+            pass # Socket closed underneath us
+
+        if self.on_close:
+            self.on_close(self.websocket)
+
+    def stats(self):
+        return {
+            "client_id": self.client_id,
+            "camera": self.camera,
+            "protocol": self.protocol,
+            "tier": self.tier,
+            "connected_s": time.time() - self.connected_at,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "pending_messages": len(self.messages),
+            "lag_ms": self.lag_ms,
+            "max_lag_ms": self.max_lag_ms
+        }
+
+
+class ConnectionManager:
+    def __init__(self):
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.sensor_connections: List[WebSocket] = []
+        self.schema = FrameSchema()
+        self.frame_seq = {} # camera -> seq
+        # Replaced, never mutated: read from the pipeline threads without a lock
+        self.active_tiers = frozenset()
+        self.camera_tiers = {} # camera -> frozenset of watched tiers
+
+    @property
+    def active_connections(self):
+        return list(self.clients.keys())
+
+    def _update_tiers(self):
+        frame_clients = [c for c in self.clients.values() if c.tier != TIER_EVENTS]
+        self.active_tiers = frozenset(c.tier for c in frame_clients if c.tier != TIER_META)
+        camera_tiers = {}
+        for c in frame_clients:
+            tiers = camera_tiers.setdefault(c.camera, set())
+            if c.tier != TIER_META:
+                tiers.add(c.tier)
+        self.camera_tiers = {camera: frozenset(tiers) for camera, tiers in camera_tiers.items()}
+        metrics.set("ws.clients", len(self.clients))
+        metrics.set("stream.active_tiers", sorted(self.active_tiers))
+        for camera in Config.CAMERAS:
+            metrics.set(f"cameras.{camera}.ws_clients", sum(1 for c in self.clients.values() if c.camera == camera))
+
+    def watched(self, camera=None):
+        """True if any client receives the camera's frames (any camera if camera is None)."""
+        return bool(self.camera_tiers) if camera is None else camera in self.camera_tiers
+
+    def tiers_for(self, camera=None):
+        """Tiers to encode for a camera's frames."""
+        if camera is None:
+            return self.active_tiers
+        return self.camera_tiers.get(camera, frozenset())
+
+    async def connect(self, websocket: WebSocket, protocol=PROTOCOL_LEGACY, tier=None, camera=None):
+        await websocket.accept()
+        if protocol not in (PROTOCOL_LEGACY, PROTOCOL_BINARY):
+            protocol = PROTOCOL_LEGACY
+        if tier not in (TIER_META, TIER_EVENTS) and tier not in Config.STREAM_TIERS:
+            tier = Config.STREAM_DEFAULT_TIER
+        if camera not in Config.CAMERAS:
+            camera = Config.DEFAULT_CAMERA
+        client = ClientConnection(websocket, on_close=self.disconnect, protocol=protocol, tier=tier, camera=camera)
+        self.clients[websocket] = client
+        self._update_tiers()
+        if protocol == PROTOCOL_BINARY:
+            # Signal names are sent once; frames only carry the packed vector
+            client.push_message(json.dumps(self.schema.describe()))
+        client.start()
+        return client
+
+    async def connect_sensor(self, websocket: WebSocket):
+        await websocket.accept()
+        self.sensor_connections.append(websocket)
+        print("Sensor connected!")
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client:
+            client.stop()
+            self._update_tiers()
+        if websocket in self.sensor_connections:
+            self.sensor_connections.remove(websocket)
+
+    def broadcast_frame(self, images, metadata, timestamp=None, camera=None):
+        """
+        Hand a frame to every client watching the camera. Never blocks on a slow socket.
+        :param images: {tier: (image_id, jpg_bytes)} from StreamEncoder
+        :param camera: camera id, None for every client
+        """
+        if not self.clients: return
+        key = camera or Config.DEFAULT_CAMERA
+        seq = self.frame_seq[key] = self.frame_seq.get(key, 0) + 1
+        if timestamp is None:
+            timestamp = metadata.get("timestamp", time.time())
+        bundle = FrameBundle(self.schema, seq, timestamp, metadata, images)
+        for client in list(self.clients.values()):
+            if client.tier != TIER_EVENTS and (camera is None or client.camera == camera):
+                client.push_frame(bundle)
+
+    def broadcast_json(self, data: dict):
+        # Serialize once, not once per client
+        text = json.dumps(data, default=default_serializer)
+        is_event = data.get("type") == "event_update"
+        for client in list(self.clients.values()):
+            if is_event or client.tier != TIER_EVENTS:
+                client.push_message(text)
+
+    def stats(self):
+        # Snapshot: clients connect and disconnect on the event loop meanwhile
+        return [client.stats() for client in list(self.clients.values())]
@@ -0,0 +1,88 @@
+import numpy as np
+from backend.config.config import Config
+
+# Detection records and YOLO postprocessing. numpy only, so the pipeline,
+# tracker and visualizer can use them without loading ONNX Runtime.
+
+# Detections are a structured array, one record per box; fields are read the
+# same way on a record as on the whole array (det['score'], dets['score'])
+DETECTION_DTYPE = np.dtype([
+    ('box', '<i4', (4,)), # [x, y, w, h] in frame pixels
+    ('score', '<f4'),
+    ('class_id', '<i2')
+])
+
+
+def no_detections():
+    return np.empty(0, dtype=DETECTION_DTYPE)
+
+
+def class_name(class_id):
+    class_id = int(class_id)
+    return Config.WEAPON_CLASS_NAMES[class_id] if class_id < len(Config.WEAPON_CLASS_NAMES) else f"Class {class_id}"
+
+
+def nms(boxes, scores, iou_thres, groups=None):
+    """
+    Greedy non-maximum suppression on [K, 4] x1y1x2y2 boxes. Boxes in different
+    groups (class, frame) never suppress each other: each group is shifted to its
+    own region first, so one pass handles all of them.
+    :return: indices of the kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+    if groups is not None:
+        boxes = boxes + groups.astype(np.float32)[:, None] * (2 * np.abs(boxes).max() + 1)
+    x1, y1, x2, y2 = boxes.T
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_thres]
+    return np.asarray(keep, dtype=np.intp)
+
+
+def postprocess_yolo(output, image_sizes, img_size, conf_thres, iou_thres):
+    """
+    Vectorized YOLOv8 postprocess for a batch.
+    :param output: raw [N, 4 + num_classes, anchors] output; read in place (no transpose copy)
+    :param image_sizes: (height, width) of each of the N frames
+    :return: list of N DETECTION_DTYPE arrays
+    """
+    n = output.shape[0]
+    class_scores = output[:, 4:, :]
+    class_ids = class_scores.argmax(axis=1) # [N, anchors]
+    max_scores = np.take_along_axis(class_scores, class_ids[:, None, :], axis=1)[:, 0, :]
+    frame_idx, anchor_idx = np.nonzero(max_scores > conf_thres)
+    if frame_idx.size == 0:
+        return [no_detections() for _ in range(n)]
+
+    cx, cy, w, h = output[frame_idx, :4, anchor_idx].T # [4, K]
+    scores = max_scores[frame_idx, anchor_idx]
+    classes = class_ids[frame_idx, anchor_idx]
+
+    # Scale back to each frame's size
+    sizes = np.asarray(image_sizes, dtype=np.float32)
+    sx = sizes[frame_idx, 1] / img_size
+    sy = sizes[frame_idx, 0] / img_size
+    xyxy = np.stack([(cx - w / 2) * sx, (cy - h / 2) * sy, (cx + w / 2) * sx, (cy + h / 2) * sy], axis=1)
+
+    keep = nms(xyxy, scores, iou_thres, groups=frame_idx * class_scores.shape[1] + classes)
+    kept = xyxy[keep]
+    result = np.empty(len(keep), dtype=DETECTION_DTYPE)
+    result['box'] = np.stack([kept[:, 0], kept[:, 1], kept[:, 2] - kept[:, 0], kept[:, 3] - kept[:, 1]], axis=1)
+    result['score'] = scores[keep]
+    result['class_id'] = classes[keep]
+
+    # Split per frame (stable sort keeps score order within a frame)
+    frames = frame_idx[keep]
+    order = np.argsort(frames, kind='stable')
+    counts = np.bincount(frames, minlength=n)
+    return np.split(result[order], np.cumsum(counts)[:-1])
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from backend.config.config import Config
+from backend.core.metrics import metrics
+
+# --- Jobs (top-level so they can be pickled into the pool) ---
+
+def _init_worker(nice_level):
+    try:
+        os.nice(nice_level)
+    except (AttributeError, OSError):
+        pass # Not supported on this platform
+    # One encode per process; let the pool size control parallelism
+    cv2.setNumThreads(1)
+
+
+def encode_segment(spool_path, shape, n_frames, fps, out_base):
+    """
+    Encode raw BGR frames from a spool file into one WebM segment, then delete the spool.
+    :return: (output path, encode time in ms)
+    """
+    t0 = time.perf_counter()
+    h, w, c = shape
+    frames = np.memmap(spool_path, dtype=np.uint8, mode='r', shape=(n_frames, h, w, c))
+
+    out_path = f"{out_base}.webm"
+    out = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'vp80'), fps, (w, h))
+    if not out.isOpened():
+        print("[ENCODER] Warning: vp80 failed, trying mp4v (might not play in browser)")
+        out_path = f"{out_base}.mp4"
+        out = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+
+    for i in range(n_frames):
+        out.write(np.ascontiguousarray(frames[i]))
+    out.release()
+
+    del frames
+    os.remove(spool_path)
+    return out_path, (time.perf_counter() - t0) * 1000.0
+
+
+def concat_segments(segments_dir, files, out_base, ffmpeg_bin):
+    """
+    Join segments into one file without re-encoding (ffmpeg concat demuxer).
+    :return: output path, or None if segments should be served as is
+    """
+    ffmpeg = shutil.which(ffmpeg_bin)
+    if not ffmpeg:
+        print("[ENCODER] ffmpeg not found, serving segments as is")
+        return None
+
+    out_path = f"{out_base}{os.path.splitext(files[0])[1]}"
+    list_path = os.path.join(segments_dir, "concat.txt")
+    with open(list_path, 'w') as f:
+        for name in files:
+            f.write(f"file '{name}'\n")
+
+    cmd = [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+           "-i", list_path, "-c", "copy", out_path]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0 or not os.path.exists(out_path):
+        print(f"[ENCODER] Concat failed, serving segments as is: {result.stderr.decode(errors='ignore')}")
+        return None
+    return out_path
+
+
+def write_thumbnail(path, frame):
+    return bool(cv2.imwrite(path, frame))
+
+
+def default_serializer(obj):
+    if isinstance(obj, (np.integer, np.floating, np.bool_)):
+        return obj.item()
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+def write_json(path, data):
+    # Atomic replace so /api/events never reads a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4, default=default_serializer)
+    os.replace(tmp_path, path)
+    return path
+
+
+# --- Pool ---
+
+def spool_dir():
+    """Raw frame spool. tmpfs when available so spooling never touches the SD card."""
+    path = Config.CLIP_SPOOL_DIR
+    if not path:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = os.path.join(base, "doorbell-spool")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class ClipEncoderPool:
+    """
+    Small process pool for clip encoding, thumbnails and metadata writes.
+    Keeps VP8 encoding off the real-time process so it never competes for the GIL.
+    """
+    def __init__(self, workers=None, nice_level=None):
+        workers = workers or Config.CLIP_ENCODER_WORKERS
+        nice_level = Config.CLIP_ENCODER_NICE if nice_level is None else nice_level
+        # spawn: the parent runs threads, forking it is not safe
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(nice_level,)
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        metrics.set("clip_encoder.workers", workers)
+        metrics.set("clip_encoder.queue_depth", 0)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self._pending += 1
+            metrics.set("clip_encoder.queue_depth", self._pending)
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        with self._lock:
+            self._pending -= 1
+            metrics.set("clip_encoder.queue_depth", self._pending)
+        if future.exception() is not None:
+            metrics.inc("clip_encoder.failed")
+            print(f"[ENCODER] Job failed: {future.exception()}")
+        else:
+            metrics.inc("clip_encoder.completed")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_encoder_pool():
+    """Shared pool; created on first use so workers only start when something records."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ClipEncoderPool()
+        return _pool
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from backend.config.config import Config
+
+# Index of logs/metadata/*.json, so listings and retention sweeps don't glob
+# and parse every file. SQLite because it is written from several processes
+# (save threads, encoder pool, retention re-encode) and read by the API.
+# The JSON files stay the source of truth: sync() reconciles the index with
+# the directory listing, parsing only files it has not seen.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    meta_filename TEXT PRIMARY KEY,
+    clip_id TEXT,
+    camera_id TEXT,
+    timestamp REAL,
+    updated REAL,
+    data TEXT
+)
+"""
+
+
+def index_path(log_dir=None):
+    return Config.EVENT_INDEX_PATH or os.path.join(log_dir or Config.LOG_DIR, "events.db")
+
+
+class EventIndex:
+    def __init__(self, log_dir=None):
+        log_dir = log_dir or Config.LOG_DIR
+        self.meta_dir = os.path.join(log_dir, "metadata")
+        self.path = index_path(log_dir)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call: safe across threads and forked workers
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            with conn: # Commits, or rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def upsert(self, json_path, data):
+        """Record a metadata file that was just written."""
+        try:
+            updated = os.path.getmtime(json_path)
+        except OSError:
+            updated = time.time()
+        row = (os.path.basename(json_path), data.get("clip_id"), data.get("camera_id"),
+               data.get("timestamp", updated), updated, json.dumps(data, default=str))
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?)", row)
+
+    def remove(self, json_path):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM events WHERE meta_filename = ?", (os.path.basename(json_path),))
+
+    def events(self, camera=None):
+        """
+        :return: list of (meta_filename, updated, metadata dict), most recently written first
+        """
+        query = "SELECT meta_filename, updated, camera_id, data FROM events ORDER BY updated DESC"
+        with self._connect() as conn:
+            rows = conn.execute(query).fetchall()
+        result = []
+        for filename, updated, camera_id, data in rows:
+            # Events from before multi-camera support belong to the default camera
+            if camera and (camera_id or Config.DEFAULT_CAMERA) != camera:
+                continue
+            result.append((filename, updated, json.loads(data)))
+        return result
+
+    def find(self, clip_id):
+        """Metadata path of an event by clip_id, None if unknown."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT meta_filename FROM events WHERE clip_id = ? ORDER BY updated DESC LIMIT 1",
+                               (clip_id,)).fetchone()
+        return os.path.join(self.meta_dir, row[0]) if row else None
+
+    def sync(self):
+        """
+        Reconcile with the metadata directory: files written or removed behind
+        the index's back (older versions, manual cleanup) are picked up. Only
+        new or modified files are parsed.
+        """
+        try:
+            names = [n for n in os.listdir(self.meta_dir) if n.endswith(".json")]
+        except FileNotFoundError:
+            names = []
+        with self._connect() as conn:
+            known = dict(conn.execute("SELECT meta_filename, updated FROM events").fetchall())
+
+        stale = [name for name in known if name not in names]
+        added = 0
+        for name in names:
+            path = os.path.join(self.meta_dir, name)
+            try:
+                if known.get(name) == os.path.getmtime(path):
+                    continue
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[INDEX] Skipping unreadable {path}: {e}")
+                continue
+            self.upsert(path, data)
+            added += 1
+
+        if stale:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM events WHERE meta_filename = ?", [(name,) for name in stale])
+        if added or stale:
+            print(f"[INDEX] Synced event index: {added} updated, {len(stale)} removed")
+
+
+def save_event(json_path, data):
+    """Atomic metadata write plus index update. Runs in the encoder pool."""
+    from backend.core.encoder import write_json
+    write_json(json_path, data)
+    EventIndex(os.path.dirname(os.path.dirname(json_path))).upsert(json_path, data)
+    return json_path
+
+
+def remove_event(json_path):
+    """Drop an event's metadata, index entry first."""
+    EventIndex(os.path.dirname(os.path.dirname(json_path))).remove(json_path)
+    try:
+        os.remove(json_path)
+    except FileNotFoundError:
+        pass
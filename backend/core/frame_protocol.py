@@ -0,0 +1,82 @@
+import math
+import struct
+import zlib
+import numpy as np
+from backend.config.config import Config
+
+# Binary live-frame format (one WebSocket message per frame):
+#   header  <3sBIIdfBH>  magic "DBF", version, schema_id, seq, timestamp (s),
+#                         intent score, threat level index, signal count
+#   signals float32[n]   in schema order, NaN when missing
+#   payload              JPEG bytes, empty when the image did not change
+FRAME_MAGIC = b"DBF"
+FRAME_VERSION = 1
+HEADER = struct.Struct("<3sBIIdfBH")
+
+THREAT_LEVELS = ["CALM", "UNUSUAL", "SUSPICIOUS", "THREAT"]
+UNKNOWN_LEVEL = 255
+
+
+class FrameSchema:
+    """
+    Fixed signal ordering for the binary format. Sent once at connect so frames only
+    carry the packed float32 vector, not the signal names.
+    """
+    def __init__(self, signal_keys=None):
+        self.signal_keys = list(signal_keys or Config.STREAM_SIGNAL_KEYS)
+        self.schema_id = zlib.crc32(",".join(self.signal_keys).encode()) & 0xFFFFFFFF
+        self._index = {k: i for i, k in enumerate(self.signal_keys)}
+
+    def describe(self):
+        return {
+            "type": "schema",
+            "version": FRAME_VERSION,
+            "schema_id": self.schema_id,
+            "header_bytes": HEADER.size,
+            "signals": self.signal_keys,
+            "levels": THREAT_LEVELS
+        }
+
+    def pack(self, seq, timestamp, metadata, jpg_bytes):
+        """
+        Build one binary frame message.
+        :param metadata: {"intent_score", "threat_level", "signals": {name: float}}
+        """
+        vector = np.full(len(self.signal_keys), np.nan, dtype=np.float32)
+        for key, val in metadata.get("signals", {}).items():
+            i = self._index.get(key)
+            if i is not None:
+                vector[i] = val
+
+        level = metadata.get("threat_level")
+        level_idx = THREAT_LEVELS.index(level) if level in THREAT_LEVELS else UNKNOWN_LEVEL
+        intent = metadata.get("intent_score", math.nan)
+
+        header = HEADER.pack(
+            FRAME_MAGIC, FRAME_VERSION, self.schema_id, seq & 0xFFFFFFFF,
+            float(timestamp), float(intent), level_idx, len(self.signal_keys)
+        )
+        return b"".join((header, vector.tobytes(), jpg_bytes))
+
+    def unpack(self, data):
+        """
+        Inverse of pack(), as frameProtocol.js decodes it (for tests and tools).
+        :return: dict, or None for another magic, version or schema
+        """
+        if len(data) < HEADER.size:
+            return None
+        magic, version, schema_id, seq, timestamp, intent, level_idx, count = HEADER.unpack_from(data)
+        if magic != FRAME_MAGIC or version != FRAME_VERSION or schema_id != self.schema_id:
+            return None
+        vector = np.frombuffer(data, dtype=np.float32, count=count, offset=HEADER.size)
+        signals = {key: float(val) for key, val in zip(self.signal_keys, vector) if not math.isnan(val)}
+        return {
+            "seq": seq,
+            "timestamp": timestamp,
+            "metadata": {
+                "intent_score": intent,
+                "threat_level": THREAT_LEVELS[level_idx] if level_idx < len(THREAT_LEVELS) else "UNKNOWN",
+                "signals": signals
+            },
+            "jpeg": bytes(data[HEADER.size + 4 * count:])
+        }
@@ -0,0 +1,272 @@
+import time
+import queue
+import multiprocessing
+from backend.config.config import Config
+from backend.core.pipeline_host import SharedFrameSlot
+from backend.core.worker_health import WorkerHealth
+
+# One server process per model serves every camera stream:
+#   - each stream has a SharedFrameSlot its pipeline writes frames into (shared
+#     by both models, so a frame is copied once);
+#   - pipelines post ("frame", stream_id) / ("reset", stream_id) on the model's
+#     request queue;
+#   - results come back on the stream's own result queue (latest only).
+# Queues and slots live in InferenceChannels, created once by the ModelPool, so
+# a restarted server picks up where the old one left off and clients in other
+# processes are unaffected.
+
+
+class InferenceChannels:
+    """
+    Queues shared by a model's server (any incarnation) and its clients.
+
+    Created on the spawn context: clients are handed to camera processes started
+    with spawn (PipelineProcess), which refuses locks made on the fork context.
+    The forked servers inherit them either way.
+    """
+    def __init__(self, max_streams=Config.INFERENCE_MAX_STREAMS, ctx=None):
+        ctx = ctx or multiprocessing.get_context("spawn")
+        self.requests = ctx.Queue(maxsize=max_streams * 4)
+        self.results = [ctx.Queue(maxsize=1) for _ in range(max_streams)]
+        self.alive = ctx.Value('b', False) # A server is up and its model loaded
+
+
+class StreamSlot:
+    """
+    Writer side of a stream's frame slot. Picklable (attaches by name in the
+    process that uses it); a frame handed to both models with the same
+    frame_id is written once.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._slot = None
+        self._last_id = None
+
+    def __getstate__(self):
+        return {"name": self.name, "_slot": None, "_last_id": None}
+
+    def write(self, frame, frame_id=None):
+        """:param frame_id: per-frame counter; None always writes"""
+        if frame_id is not None and frame_id == self._last_id:
+            return True
+        if self._slot is None:
+            self._slot = SharedFrameSlot(self.name, writer=True)
+        ok = self._slot.write(frame, {})
+        self._last_id = frame_id if ok else None
+        return ok
+
+
+class InferenceClient:
+    """
+    A pipeline's handle on one model server, for one stream. Same surface as
+    the worker processes it replaces: process_frame(), get_latest_*(), reset(),
+    is_alive().
+    """
+    def __init__(self, stream_id, channels, slot):
+        self.stream_id = stream_id
+        self.channels = channels
+        self.slot = slot
+
+    def is_alive(self):
+        return bool(self.channels.alive.value)
+
+    def process_frame(self, frame, frame_id=None):
+        if not self.slot.write(frame, frame_id):
+            return
+        try:
+            self.channels.requests.put_nowait(("frame", self.stream_id))
+        except queue.Full:
+            pass # Server is behind; it reads the latest frame anyway
+
+    def get_latest(self):
+        try:
+            return self.channels.results[self.stream_id].get_nowait()
+        except queue.Empty:
+            return None
+
+    get_latest_probability = get_latest
+    get_latest_detections = get_latest
+
+    def reset(self):
+        self.slot._last_id = None # A new run numbers its frames from 0 again
+        try:
+            while True:
+                self.channels.results[self.stream_id].get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.channels.requests.put(("reset", self.stream_id), timeout=1.0)
+        except queue.Full:
+            print(f"[INFERENCE] Request queue full, reset of stream {self.stream_id} dropped")
+
+
+class InferenceServer(multiprocessing.Process):
+    """
+    Serves one model to all streams with dynamic batching: after the first
+    request it gathers more for up to INFERENCE_BATCH_WAIT_MS or until
+    INFERENCE_MAX_BATCH streams are waiting, then runs them together. The wait
+    is skipped when the model cannot run a batch at once.
+
+    - weapon: batched session runs when the export has a dynamic batch size,
+      otherwise back to back on the one session; with the cascade each stream
+      keeps its own schedule and the stage-1 and full runs are each batched
+      across the streams that need them.
+    - violence: the MoViNet stream export has batch size 1, so a batch runs
+      back to back on the one interpreter, swapping in each stream's recurrent
+      states.
+    """
+    def __init__(self, kind, channels, slot_names, model_kwargs):
+        super().__init__()
+        self.daemon = True
+        self.kind = kind
+        self.channels = channels
+        self.slot_names = slot_names
+        self.model_kwargs = model_kwargs
+        self.running = multiprocessing.Value('b', True)
+        self.health = WorkerHealth() # Heartbeat / latency, read by the ModelPool supervisor
+
+    def stop(self):
+        self.running.value = False
+
+    def _load(self):
+        if self.kind == "violence":
+            from backend.core.violence import ViolenceDetector
+            return ViolenceDetector(self.model_kwargs["model_path"])
+        from backend.core.weapon import WeaponCascade, WeaponDetector
+        if Config.WEAPON_CASCADE:
+            return WeaponCascade(**self.model_kwargs)
+        return WeaponDetector(**self.model_kwargs)
+
+    def run(self):
+        try:
+            t0 = time.perf_counter()
+            self.model = self._load()
+        except Exception as e:
+            print(f"[INFERENCE] Failed to load {self.kind} model: {e}")
+            raise SystemExit(1) # Non-zero exit: the supervisor restarts us with backoff
+        self.health.mark_ready((time.perf_counter() - t0) * 1000.0)
+        print(f"[INFERENCE] {self.kind} server ready: load {self.health.load_ms.value:.0f} ms, RSS {self.health.rss_mb.value:.0f} MB")
+
+        self.slots = {}
+        self.last_seq = {}
+        self.streams = {} # stream_id -> per-stream state (MoViNet states / cascade)
+        self.batchable = self._batchable()
+        self.channels.alive.value = True
+        try:
+            self._serve()
+        finally:
+            self.channels.alive.value = False
+            for slot in self.slots.values():
+                slot.close()
+
+    def _batchable(self):
+        # MoViNet's stream export has batch size 1
+        return self.kind == "weapon" and self.model.batchable
+
+    def _serve(self):
+        # Without batched runs waiting for more streams only adds latency:
+        # requests already queued are still taken together
+        wait_s = Config.INFERENCE_BATCH_WAIT_MS / 1000.0 if self.batchable else 0.0
+        if not self.batchable:
+            print(f"[INFERENCE] {self.kind} model runs one frame at a time, not waiting to batch")
+        while self.running.value:
+            self.health.beat()
+            try:
+                msg = self.channels.requests.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            pending = []
+            self._handle(msg, pending)
+
+            # Dynamic batching: wait a little for other streams
+            deadline = time.perf_counter() + wait_s
+            while len(pending) < Config.INFERENCE_MAX_BATCH:
+                remaining = deadline - time.perf_counter()
+                try:
+                    msg = self.channels.requests.get(timeout=remaining) if remaining > 0 else self.channels.requests.get_nowait()
+                except queue.Empty:
+                    break
+                self._handle(msg, pending)
+            if pending:
+                self._run_batch(pending)
+
+    def _handle(self, msg, pending):
+        kind, stream_id = msg
+        if kind == "reset":
+            self.streams.pop(stream_id, None)
+            if stream_id in pending:
+                pending.remove(stream_id)
+            try:
+                self.channels.results[stream_id].get_nowait()
+            except queue.Empty:
+                pass
+        elif stream_id not in pending:
+            pending.append(stream_id)
+
+    def _read(self, stream_id):
+        slot = self.slots.get(stream_id)
+        if slot is None:
+            slot = self.slots[stream_id] = SharedFrameSlot(self.slot_names[stream_id])
+        item = slot.read(self.last_seq.get(stream_id))
+        if item is None:
+            return None
+        self.last_seq[stream_id], frame, _ = item
+        return frame
+
+    def _run_batch(self, stream_ids):
+        frames = []
+        ids = []
+        for stream_id in stream_ids:
+            frame = self._read(stream_id)
+            if frame is not None:
+                frames.append(frame)
+                ids.append(stream_id)
+        if not frames:
+            return
+
+        try:
+            t0 = time.perf_counter()
+            if self.kind == "weapon":
+                results = self._predict_weapon(ids, frames)
+            else:
+                results = [self._predict(stream_id, frame) for stream_id, frame in zip(ids, frames)]
+            # Latency per frame, comparable with the single-stream workers
+            self.health.record((time.perf_counter() - t0) * 1000.0 / len(frames))
+            self.health.record_batch(len(frames))
+        except Exception as e:
+            print(f"[INFERENCE] {self.kind} inference error: {e}")
+            self.health.record_error()
+            return
+
+        for stream_id, result in zip(ids, results):
+            out = self.channels.results[stream_id]
+            try:
+                out.get_nowait() # Consume old
+            except queue.Empty:
+                pass
+            try:
+                out.put_nowait(result)
+            except queue.Full:
+                pass
+
+    def _predict(self, stream_id, frame):
+        """Violence: back to back, with each stream's recurrent states."""
+        states = self.streams.get(stream_id)
+        if states is None:
+            states = self.streams[stream_id] = self.model.new_states()
+        self.model.use_states(states)
+        prob = self.model.predict(frame)
+        self.streams[stream_id] = self.model.store_states(states)
+        return prob
+
+    def _predict_weapon(self, stream_ids, frames):
+        """Weapon: batched across streams (per-stream cascade schedules, shared detectors)."""
+        if not hasattr(self.model, "for_stream"):
+            return self.model.predict_many(frames)
+        cascades = []
+        for stream_id in stream_ids:
+            cascade = self.streams.get(stream_id)
+            if cascade is None:
+                cascade = self.streams[stream_id] = self.model.for_stream()
+            cascades.append(cascade)
+        return self.model.predict_streams(cascades, frames)
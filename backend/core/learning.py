@@ -55,21 +55,10 @@ class LearningSystem:
         """
         # 1. Load Event Data
         meta_path = os.path.join(self.meta_dir, f"{event_id}.json")
-        # Fallback search if filename doesn't match ID exactly (id is inside json)
+        # Filename doesn't match the ID: look the clip_id up in the event index
         if not os.path.exists(meta_path):
-             # Try searching content? No, strictly assume filename matches for now or passed path
-             # Actually, server passes full event object or we glob. 
-             # Let's glob for ID if not direct match.
-             import glob
-             files = glob.glob(os.path.join(self.meta_dir, "*.json"))
-             for f in files:
-                 with open(f, 'r') as jf:
-                     try:
-                        d = json.load(jf)
-                        if d.get("clip_id") == event_id:
-                            meta_path = f
-                            break
-                     except: pass
+            from backend.core.event_index import EventIndex
+            meta_path = EventIndex(self.logs_dir).find(event_id) or meta_path
         
         if not os.path.exists(meta_path):
             return {"error": "Event not found"}
@@ -0,0 +1,389 @@
+import asyncio
+import json
+import shutil
+import struct
+import subprocess
+import threading
+import time
+from collections import deque
+import cv2
+from fastapi import WebSocket
+from backend.config.config import Config
+from backend.core.metrics import metrics
+from backend.core.encoder import default_serializer
+
+# Fragmented MP4 live stream for Media Source Extensions:
+#   text   {"type": "video_init", "mime": ...}     once, at connect
+#   bytes  init segment (ftyp + moov)              once, at connect
+#   bytes  media fragment (moof + mdat)            every GOP, starts with a keyframe
+#   text   {"type": "video_meta", "pts": s, ...}   per frame, pts = video time in seconds
+#   text   {"type": "video_reset"}                 encoder restarted: a new init segment follows, pts restart at 0
+INIT_BOXES = (b"ftyp", b"moov")
+
+
+def _frame_size(width, height):
+    """Output size: LIVE_VIDEO_HEIGHT tall at most, even dimensions (yuv420p)."""
+    target = Config.LIVE_VIDEO_HEIGHT
+    if target and height > target:
+        width, height = int(round(width * target / height)), target
+    return width // 2 * 2, height // 2 * 2
+
+
+class LiveVideoEncoder:
+    """
+    One ffmpeg process encoding the live frames to fragmented H.264 MP4.
+
+    A feeder thread writes the latest frame to ffmpeg at a constant LIVE_VIDEO_FPS
+    (repeating it if the pipeline is slower), so presentation timestamps are simply
+    frame_index / fps. A reader thread splits ffmpeg's output into MP4 boxes and
+    hands out the init segment and complete fragments.
+    """
+    def __init__(self, width, height, on_init, on_fragment, on_meta):
+        self.width, self.height = width, height
+        self.fps = Config.LIVE_VIDEO_FPS
+        self.on_init = on_init
+        self.on_fragment = on_fragment
+        self.on_meta = on_meta # (pts, metadata)
+
+        self.proc = None
+        self.running = False
+        self._slot = None # (frame, metadata)
+        self._slot_lock = threading.Lock()
+        self._frame_ready = threading.Event()
+        self.frames_written = 0
+
+    def _command(self, ffmpeg):
+        gop = max(1, int(round(self.fps * Config.LIVE_VIDEO_GOP_S)))
+        return [
+            ffmpeg, "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{self.width}x{self.height}",
+            "-framerate", str(self.fps), "-i", "pipe:0",
+            "-an", "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+            "-profile:v", "baseline", "-level", Config.LIVE_VIDEO_LEVEL, "-pix_fmt", "yuv420p",
+            # Fixed GOP: every fragment starts with a keyframe, so late joiners can start anywhere
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-b:v", Config.LIVE_VIDEO_BITRATE, "-maxrate", Config.LIVE_VIDEO_BITRATE,
+            "-bufsize", Config.LIVE_VIDEO_BITRATE,
+            "-f", "mp4", "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "pipe:1"
+        ]
+
+    def start(self):
+        """:return: False if ffmpeg is missing or could not be started"""
+        ffmpeg = shutil.which(Config.FFMPEG_BIN)
+        if not ffmpeg:
+            print("[LIVE VIDEO] ffmpeg not found, video stream unavailable")
+            return False
+        try:
+            self.proc = subprocess.Popen(self._command(ffmpeg), stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        except OSError as e:
+            print(f"[LIVE VIDEO] Could not start ffmpeg: {e}")
+            return False
+        self.running = True
+        threading.Thread(target=self._feed_loop, name="live-video-feed", daemon=True).start()
+        threading.Thread(target=self._read_loop, name="live-video-read", daemon=True).start()
+        print(f"[LIVE VIDEO] Encoder started: {self.width}x{self.height} @ {self.fps} fps")
+        return True
+
+    def stop(self):
+        self.running = False
+        self._frame_ready.set()
+        if self.proc:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.proc.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        print("[LIVE VIDEO] Encoder stopped")
+
+    def submit(self, frame, metadata):
+        """Latest frame wins; never blocks the caller."""
+        with self._slot_lock:
+            self._slot = (frame, metadata)
+        self._frame_ready.set()
+
+    def _feed_loop(self):
+        # Wait for the first frame, then write at a constant rate
+        self._frame_ready.wait()
+        interval = 1.0 / self.fps
+        next_at = time.perf_counter()
+        while self.running:
+            with self._slot_lock:
+                frame, metadata = self._slot
+            if frame.shape[1] != self.width or frame.shape[0] != self.height:
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            try:
+                self.proc.stdin.write(frame.tobytes())
+            except (BrokenPipeError, ValueError, OSError):
+                print("[LIVE VIDEO] ffmpeg input closed")
+                break
+            self.on_meta(self.frames_written / self.fps, metadata)
+            self.frames_written += 1
+
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_at = time.perf_counter() # Fell behind: do not burst to catch up
+        self.running = False
+
+    def _read_loop(self):
+        buf = bytearray()
+        init = bytearray()
+        fragment = bytearray()
+        stdout = self.proc.stdout
+        while True:
+            chunk = stdout.read(65536)
+            if not chunk:
+                break
+            buf += chunk
+            # Split complete top-level boxes: size (u32, big endian) + type
+            while len(buf) >= 8:
+                size, box_type = struct.unpack(">I4s", buf[:8])
+                if size == 1:
+                    if len(buf) < 16: break
+                    size = struct.unpack(">Q", buf[8:16])[0]
+                if size < 8 or len(buf) < size:
+                    break
+                box = bytes(buf[:size])
+                del buf[:size]
+
+                if box_type in INIT_BOXES:
+                    init += box
+                    if box_type == b"moov":
+                        self.on_init(bytes(init))
+                elif box_type == b"mdat":
+                    fragment += box
+                    metrics.observe("live_video.fragment_bytes", len(fragment))
+                    self.on_fragment(bytes(fragment))
+                    fragment = bytearray()
+                else:
+                    fragment += box # moof (and styp/sidx if present)
+        self.running = False
+
+
+class VideoClient:
+    """
+    One /ws/video socket. Sends the init segment first, then whole fragments.
+    Like ClientConnection it has its own sender task; when it falls behind, whole
+    fragments are dropped (each starts with a keyframe, so playback recovers).
+    """
+    def __init__(self, websocket: WebSocket, on_close):
+        self.websocket = websocket
+        self.on_close = on_close
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.initialized = False # Init segment queued
+        self.fragments_sent = 0
+        self.fragments_dropped = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    def push(self, kind, payload):
+        """
+        kind: "init" and "control" (video_init / video_reset text) are never
+        dropped; "bytes" (fragment) and "text" (its metadata) are.
+        """
+        if kind == "bytes" and sum(1 for k, _ in self.queue if k == "bytes") >= Config.LIVE_VIDEO_CLIENT_QUEUE:
+            # Drop the oldest queued fragment and the metadata queued just before it
+            end = next(i for i, (k, _) in enumerate(self.queue) if k == "bytes")
+            start = end
+            while start > 0 and self.queue[start - 1][0] == "text":
+                start -= 1
+            for _ in range(end - start + 1):
+                del self.queue[start]
+            self.fragments_dropped += 1
+            metrics.inc("live_video.fragments_dropped")
+        self.queue.append((kind, payload))
+        self.wakeup.set()
+
+    async def _run(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.queue:
+                    kind, payload = self.queue.popleft()
+                    if kind == "init":
+                        send = self.websocket.send_bytes(payload)
+                    elif kind == "bytes":
+                        send = self.websocket.send_bytes(payload)
+                        self.fragments_sent += 1
+                    else:
+                        send = self.websocket.send_text(payload)
+                    await asyncio.wait_for(send, timeout=Config.WS_CLIENT_STALL_S)
+        except asyncio.CancelledError:
+            return
+        except Exception:
+            pass # Stalled or closed
+        self.on_close(self.websocket)
+
+
+class LiveVideoHub:
+    """
+    Owns the encoder and the /ws/video clients. The encoder only runs while at
+    least one client is connected (stopped after LIVE_VIDEO_IDLE_STOP_S).
+
+    Thread-safe entry point: submit(), which never blocks: starting, restarting
+    and stopping ffmpeg happen on a control thread. Client handling runs on the
+    event loop.
+    """
+    RESTART_INTERVAL_S = 1.0 # At most one encoder start per interval
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.clients = {}
+        self.encoder = None
+        self.init_segment = None
+        self.unavailable = False # ffmpeg missing: stop trying
+        self._last_client_left = None
+        self._pending = None # (frame, metadata) waiting for an encoder to start
+        self._started_at = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._control = threading.Thread(target=self._control_loop, name="live-video-control", daemon=True)
+        self._control.start()
+
+    @property
+    def mime(self):
+        return f'video/mp4; codecs="{Config.LIVE_VIDEO_CODEC}"'
+
+    def submit(self, frame, metadata):
+        """Called from the pipeline / replay thread with the annotated frame. Never blocks."""
+        encoder = self.encoder
+        if encoder is not None and encoder.running:
+            encoder.submit(frame, metadata)
+            return
+        if not self.clients or self.unavailable:
+            return
+        # No encoder (yet, or it exited): the control thread starts one with this frame
+        self._pending = (frame, metadata)
+        self._wakeup.set()
+
+    def _control_loop(self):
+        while not self._closed:
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+            if self._closed: break
+
+            encoder = self.encoder
+            idle = not self.clients and self._last_client_left is not None and \
+                time.time() - self._last_client_left > Config.LIVE_VIDEO_IDLE_STOP_S
+            if encoder is not None and not encoder.running:
+                print("[LIVE VIDEO] Encoder exited, restarting")
+                self._stop_encoder()
+            elif encoder is not None and idle:
+                # Nobody has watched for a while
+                self._stop_encoder()
+
+            pending, self._pending = self._pending, None
+            if self.encoder is None and pending is not None and self.clients and not self.unavailable:
+                delay = self._started_at + self.RESTART_INTERVAL_S - time.time()
+                if delay > 0:
+                    self._pending = pending
+                    time.sleep(delay)
+                    self._wakeup.set()
+                    continue
+                self._start_encoder(*pending)
+
+    def _start_encoder(self, frame, metadata):
+        self._started_at = time.time()
+        width, height = _frame_size(frame.shape[1], frame.shape[0])
+        encoder = LiveVideoEncoder(width, height, self._on_init, self._on_fragment, self._on_meta)
+        if not encoder.start():
+            if not shutil.which(Config.FFMPEG_BIN):
+                self.unavailable = True # Latched: no retry per frame
+                metrics.set("live_video.status", "unavailable")
+            return
+        encoder.submit(frame, metadata)
+        with self._lock:
+            self.encoder = encoder
+        metrics.set("live_video.status", "running")
+
+    def _stop_encoder(self):
+        with self._lock:
+            encoder, self.encoder = self.encoder, None
+        if encoder:
+            encoder.stop()
+            metrics.set("live_video.status", "stopped")
+            try:
+                # Clients need the next encoder's init segment before its fragments
+                self.loop.call_soon_threadsafe(self._reset_clients)
+            except RuntimeError:
+                pass # Loop closed during shutdown
+
+    # --- Encoder callbacks (reader / feeder threads) ---
+
+    def _on_init(self, data):
+        self.loop.call_soon_threadsafe(self._set_init, data)
+
+    def _on_fragment(self, data):
+        self.loop.call_soon_threadsafe(self._broadcast, "bytes", data)
+
+    def _on_meta(self, pts, metadata):
+        if not self.clients: return
+        text = json.dumps({"type": "video_meta", "pts": pts, "metadata": metadata}, default=default_serializer)
+        self.loop.call_soon_threadsafe(self._broadcast, "text", text)
+
+    # --- Event loop side ---
+
+    def _reset_clients(self):
+        """The encoder was replaced: the old init segment no longer applies."""
+        self.init_segment = None
+        for client in self.clients.values():
+            if client.initialized:
+                # New stream, timestamps restart from zero
+                client.push("control", json.dumps({"type": "video_reset"}))
+            client.initialized = False
+
+    def _set_init(self, data):
+        self.init_segment = data
+        for client in self.clients.values():
+            if not client.initialized:
+                client.push("init", data)
+                client.initialized = True
+
+    def _broadcast(self, kind, payload):
+        for client in list(self.clients.values()):
+            # Fragments only after the init segment
+            if client.initialized:
+                client.push(kind, payload)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = VideoClient(websocket, on_close=self.disconnect)
+        self.clients[websocket] = client
+        self._last_client_left = None
+        client.push("control", json.dumps({"type": "video_init", "mime": self.mime, "fps": Config.LIVE_VIDEO_FPS}))
+        if self.init_segment:
+            client.push("init", self.init_segment)
+            client.initialized = True
+        client.start()
+        metrics.set("live_video.clients", len(self.clients))
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client:
+            client.stop()
+        if not self.clients:
+            self._last_client_left = time.time()
+        metrics.set("live_video.clients", len(self.clients))
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._control.join(timeout=1.0)
+        self._stop_encoder()
@@ -1,30 +1,51 @@
 import os
 import time
-import json
 import threading
-import cv2
-import numpy as np
 import uuid
 from datetime import datetime
 from backend.config.config import Config
 from backend.core.summarizer import ClipSummarizer
+from backend.core.retention import RetentionManager
+from backend.core.recorder import SegmentedRecording
+from backend.core.encoder import get_encoder_pool, write_thumbnail
+from backend.core.event_index import save_event, remove_event
 
 class EventLogger:
     STATE_IDLE = "IDLE"
     STATE_RECORDING = "RECORDING"
-    STATE_COOLDOWN = "COOLDOWN"
+    STATE_TRAILING = "TRAILING" # Intent dropped, still recording the quiet period
 
-    def __init__(self, no_logs=False):
+    def __init__(self, no_logs=False, camera_id=None, retention=True):
+        """
+        :param camera_id: namespace for multi-camera setups: prefixes the file names
+                          and is stored in every event's metadata
+        :param retention: run the RetentionManager (it covers the whole LOG_DIR,
+                          so only one logger per installation should)
+        """
         self.config = Config
         self.summarizer = ClipSummarizer()
         self.no_logs = no_logs
+        self.camera_id = camera_id
+        self.file_prefix = f"{camera_id}_" if camera_id else ""
         print(self.no_logs)
+        # Lifecycle notifications for the dashboard, set by the server: callable(dict).
+        # May be called from the pipeline, save or retention threads.
+        self.on_event = None
         # State
         self.state = self.STATE_IDLE
-        self.active_clip_frames = [] 
+        self.recording = None # SegmentedRecording of the active event
+        self.live_meta_path = None # In-progress metadata entry
+        self.live_meta_future = None # Its pending write
+        self.last_frame = None
+        self.best_frame = None # Frame at peak intent, used as thumbnail
         
         # Session Stats
+        self.clip_id = None
         self.start_timestamp = 0.0
+        self.last_active_time = 0.0
+        self.merged_triggers = 0
+        self.continued_from = None
+        self.continue_from = None # clip_id of an event that hit CLIP_MAX_DURATION_S while active
         self.trigger_level = ""
         self.current_level = ""
         self.transitions = []
@@ -34,21 +55,47 @@ class EventLogger:
         self.sum_intent = 0.0
         self.count_intent = 0
         
-        # Timers
-        self.recording_stop_time = 0.0
-        self.cooldown_expiry = 0.0
-        
         # Directories
         self.clips_dir = os.path.join(self.config.LOG_DIR, "clips")
         self.meta_dir = os.path.join(self.config.LOG_DIR, "metadata")
         os.makedirs(self.clips_dir, exist_ok=True)
         os.makedirs(self.meta_dir, exist_ok=True)
+
+        # Clip encoding, thumbnails and metadata writes run in a process pool
+        self.encoder_pool = get_encoder_pool() if not self.no_logs else None
+
+        # Disk quota / age limit
+        self.retention = None
+        if not self.no_logs and retention and self.config.RETENTION_ENABLED:
+            self.retention = RetentionManager(self.config.LOG_DIR)
+            self.retention.on_evict = lambda event, reason: self._publish("removed", event["clip_id"], {"reason": reason})
+            self.retention.start()
         
-        print(f"EventLogger initialized. Fixed clip duration: {self.config.CLIP_DURATION_SECONDS}s. No Logs: {self.no_logs}")
+        print(f"EventLogger initialized. Quiet period: {self.config.CLIP_QUIET_PERIOD_S}s, max clip: {self.config.CLIP_MAX_DURATION_S}s. No Logs: {self.no_logs}")
 
     @property
     def is_recording(self):
-        return self.state == self.STATE_RECORDING
+        return self.state in (self.STATE_RECORDING, self.STATE_TRAILING)
+
+    def _publish(self, action, clip_id, changes=None):
+        """
+        Notify listeners of an event lifecycle step. `changes` only holds the fields
+        that are new or changed, clients merge them into the entry with this clip_id.
+        """
+        if self.on_event is None or not clip_id:
+            return
+        message = {
+            "type": "event_update",
+            "action": action,
+            "clip_id": clip_id,
+            "changes": changes or {}
+        }
+        if self.camera_id:
+            message["camera_id"] = self.camera_id
+        try:
+            self.on_event(message)
+        except Exception as e:
+            print(f"[LOGGER] Failed to publish {action}: {e}")
 
     def update_frame(self, frame):
         """
@@ -56,16 +103,19 @@ class EventLogger:
         """
         now = time.time()
         
-        if self.state == self.STATE_RECORDING:
-            self.active_clip_frames.append(frame.copy())
+        if self.is_recording:
+            # Spooled straight from the caller's buffer; only the thumbnail candidate is copied
+            self.last_frame = frame
+            self.recording.write(frame, now)
             
-            # Check Duration Expiry
-            if now > self.recording_stop_time:
-                self._finalize_clip()
+            # Quiet period over -> event ends
+            if self.state == self.STATE_TRAILING and now - self.last_active_time > self.config.CLIP_QUIET_PERIOD_S:
+                self._finalize_clip(now)
 
-        elif self.state == self.STATE_COOLDOWN:
-            if now > self.cooldown_expiry:
-                self.state = self.STATE_IDLE
+            # Hard cap -> close this clip, continue in a new one if still active
+            elif now - self.start_timestamp > self.config.CLIP_MAX_DURATION_S:
+                self.continue_from = self.clip_id if self.state == self.STATE_RECORDING else None
+                self._finalize_clip(now)
 
     def update_state(self, threat_level, intent_score, signals, fusion_weights, weapon_present, movinet_pressure):
         """
@@ -78,27 +128,48 @@ class EventLogger:
         if self.no_logs:
             return
 
-        # Hard threshold >= 0.6 OR Weapon
-        is_event = (intent_score >= 0.6) or weapon_present
+        # Trigger and sustain thresholds (hysteresis) OR Weapon
+        is_trigger = (intent_score >= self.config.CLIP_TRIGGER_INTENT) or weapon_present
+        is_sustained = (intent_score >= self.config.CLIP_SUSTAIN_INTENT) or weapon_present
         
-        # Start Recording
-        if is_event and self.state == self.STATE_IDLE:
-            print(f"[LOGGER] Event Triggered: Score={intent_score:.2f}, Weapon={weapon_present}")
-            self._start_recording(threat_level, intent_score, now)
+        if self.state == self.STATE_IDLE:
+            # Start Recording (a capped event that is still active continues immediately)
+            if is_trigger or (self.continue_from and is_sustained):
+                print(f"[LOGGER] Event Triggered: Score={intent_score:.2f}, Weapon={weapon_present}")
+                self._start_recording(threat_level, intent_score, now)
+            else:
+                self.continue_from = None
+
+        elif self.state == self.STATE_RECORDING:
+            if is_sustained:
+                self.last_active_time = now
+            else:
+                self.state = self.STATE_TRAILING
+
+        elif self.state == self.STATE_TRAILING:
+            # Back above sustain inside the quiet period extends the same event
+            if is_sustained:
+                self.state = self.STATE_RECORDING
+                self.last_active_time = now
+                if is_trigger:
+                    print(f"[LOGGER] Re-trigger merged into current event: Score={intent_score:.2f}")
+                    self.merged_triggers += 1
             
         # Update Stats (only if recording)
-        if self.state == self.STATE_RECORDING:
+        if self.is_recording:
             self._update_stats(threat_level, intent_score, signals, weapon_present, now)
 
     def _start_recording(self, threat_level, intent_score, now):
         self.state = self.STATE_RECORDING
-        print("[LOGGER] Recording started (Fixed 60s)")
-        
-        self.recording_stop_time = now + self.config.CLIP_DURATION_SECONDS
-        self.active_clip_frames = [] 
+        print("[LOGGER] Recording started")
         
         # Init Stats
+        self.clip_id = str(uuid.uuid4())
         self.start_timestamp = now
+        self.last_active_time = now
+        self.merged_triggers = 0
+        self.continued_from = self.continue_from
+        self.continue_from = None
         self.trigger_level = threat_level
         self.current_level = threat_level
         self.transitions = [] 
@@ -108,6 +179,24 @@ class EventLogger:
         self.sum_intent = 0.0
         self.count_intent = 0
 
+        # Segments become playable while the event is still in progress
+        self.recording = SegmentedRecording(self.clips_dir, self.clip_id, now)
+        ts_str = datetime.fromtimestamp(now).strftime("%Y%m%d_%H%M%S")
+        self.live_meta_path = os.path.join(self.meta_dir, f"{self.file_prefix}event_{ts_str}_RECORDING.json")
+        live_meta = {
+            "clip_id": self.clip_id,
+            "camera_id": self.camera_id,
+            "timestamp": now,
+            "trigger_level": threat_level,
+            "final_level": threat_level,
+            "status": "recording",
+            "playlist_url": self.recording.playlist_url
+        }
+        self.live_meta_future = self.encoder_pool.submit(save_event, self.live_meta_path, live_meta)
+        self._publish("recording_started", self.clip_id, dict(
+            live_meta, video_url=None, meta_filename=os.path.basename(self.live_meta_path)
+        ))
+
     def _update_stats(self, threat_level, intent_score, signals, weapon_present, now):
         # 1. Transitions
         if threat_level != self.current_level:
@@ -124,6 +213,8 @@ class EventLogger:
             self.weapon_seen = True
             
         # 3. Intent Stats
+        if intent_score > self.max_intent and self.last_frame is not None:
+            self.best_frame = self.last_frame.copy()
         self.max_intent = max(self.max_intent, intent_score)
         self.sum_intent += intent_score
         self.count_intent += 1
@@ -139,8 +230,8 @@ class EventLogger:
                 s["max"] = max(s["max"], val)
                 s["count"] += 1
 
-    def _finalize_clip(self):
-        print(f"[LOGGER] Finalizing clip with {len(self.active_clip_frames)} frames.")
+    def _finalize_clip(self, now):
+        print(f"[LOGGER] Finalizing clip {self.clip_id}.")
         
         # Calculate Final Stats
         final_signals = {}
@@ -165,122 +256,139 @@ class EventLogger:
         
         # Construct Metadata
         metadata = {
-            "clip_id": str(uuid.uuid4()),
+            "clip_id": self.clip_id,
+            "camera_id": self.camera_id,
             "timestamp": self.start_timestamp,
-            "duration": self.config.CLIP_DURATION_SECONDS,
+            "duration": now - self.start_timestamp,
             "trigger_level": self.trigger_level, 
             "final_level": self.current_level,
             "max_intent": self.max_intent,
             "mean_intent": mean_intent,
             "weapon_detected": self.weapon_seen,
             "transitions": self.transitions,
+            "merged_triggers": self.merged_triggers,
             "signals_stats": final_signals
         }
+        if self.continued_from:
+            metadata["continued_from"] = self.continued_from
         
-        # Move to Cooldown
-        self.state = self.STATE_COOLDOWN
-        self.cooldown_expiry = time.time() + self.config.CLIP_COOLDOWN_SECONDS
+        # No cooldown: a new trigger can start the next event straight away
+        self.state = self.STATE_IDLE
         
         # Async Save
-        frames_to_save = self.active_clip_frames
+        recording = self.recording
+        thumb_frame = self.best_frame if self.best_frame is not None else self.last_frame.copy()
+        recording.close()
         
         # Clear active
-        self.active_clip_frames = []
+        self.recording = None
+        self.best_frame = None
+        self.last_frame = None
         self.signal_stats = {}
         self.transitions = []
         
         # Spawn thread
-        t = threading.Thread(target=self._save_clip_async, args=(frames_to_save, metadata))
+        t = threading.Thread(target=self._save_clip_async, args=(recording, metadata, thumb_frame, self.live_meta_path, self.live_meta_future))
         t.start()
+        self.live_meta_path = None
+        self.live_meta_future = None
 
-    def _save_clip_async(self, frames, metadata):
-        if not frames: return
-        
-        # Dynamic FPS calculation: (Frames / Duration)
-        # Assuming duration was strictly adhered to
-        duration = metadata['duration']
-        actual_fps = len(frames) / duration
-        # Clamp FPS to reasonable bounds if needed, or stick to actual
-        # To be safe, ensure it's not 0
-        if actual_fps < 1.0: actual_fps = 1.0
-        
-        print(f"[LOGGER] Saving video at {actual_fps:.2f} FPS (Real-time playback).")
+    def _save_clip_async(self, recording, metadata, thumb_frame, live_meta_path, live_meta_future=None):
+        # Wait for the segment writer to flush the last segment
+        recording.wait()
+        # The in-progress entry must exist before it is replaced or removed, or a
+        # short event leaves a stale "recording" entry behind
+        if live_meta_future is not None:
+            try:
+                live_meta_future.result()
+            except Exception as e:
+                print(f"[LOGGER] In-progress metadata write failed: {e}")
+        if not recording.segments:
+            recording.remove()
+            if live_meta_path:
+                remove_event(live_meta_path)
+            self._publish("removed", metadata["clip_id"], {"reason": "empty"})
+            return
         
         ts_str = datetime.fromtimestamp(metadata["timestamp"]).strftime("%Y%m%d_%H%M%S")
-        filename_base = f"event_{ts_str}_{metadata['final_level']}" 
-        
-        # Switch to WebM (VP8) for better browser compatibility without external DLLs
-        vid_path = os.path.join(self.clips_dir, f"{filename_base}.webm")
+        filename_base = f"{self.file_prefix}event_{ts_str}_{metadata['final_level']}"
         json_path = os.path.join(self.meta_dir, f"{filename_base}.json")
         
-        # Write Video
-        h, w, _ = frames[0].shape
-        
-        try:
-            # VP8 is widely supported in Chrome/Edge and OpenCV
-            fourcc = cv2.VideoWriter_fourcc(*'vp80')
-            out = cv2.VideoWriter(vid_path, fourcc, actual_fps, (w, h))
-            if not out.isOpened():
-                raise Exception("vp80 failed")
-        except:
-             print("[LOGGER] Warning: vp80 failed, trying mp4v (might not play in browser)")
-             vid_path = os.path.join(self.clips_dir, f"{filename_base}.mp4")
-             fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-             out = cv2.VideoWriter(vid_path, fourcc, actual_fps, (w, h))
-
-        for f in frames:
-            out.write(f)
-        out.release()
-        
-        # Write JSON
-        def default_serializer(obj):
-            if isinstance(obj, (np.integer, np.floating, np.bool_)):
-                return obj.item()
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            return str(obj)
+        # Join segments without re-encoding; fall back to serving the playlist
+        vid_path = recording.concatenate(os.path.join(self.clips_dir, filename_base))
+        if vid_path and not self.config.CLIP_KEEP_SEGMENTS:
+            recording.remove()
+        else:
+            metadata["playlist_url"] = recording.playlist_url
+        metadata["status"] = "complete"
+        metadata["dropped_frames"] = recording.manifest["dropped_frames"]
 
-        # Write Initial JSON
-        def default_serializer(obj):
-            if isinstance(obj, (np.integer, np.floating, np.bool_)):
-                return obj.item()
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            return str(obj)
+        # Save Thumbnail (frame at peak intent)
+        if thumb_frame is not None:
+            try:
+                thumb_path = os.path.join(self.clips_dir, f"{metadata['clip_id']}.jpg")
+                if self.encoder_pool.submit(write_thumbnail, thumb_path, thumb_frame).result():
+                    metadata["thumbnail_url"] = f"/videos/{metadata['clip_id']}.jpg"
+                    print(f"[LOGGER] Saved thumbnail: {thumb_path}")
+                    self._publish("thumbnail_ready", metadata["clip_id"], {"thumbnail_url": metadata["thumbnail_url"]})
+            except Exception as e:
+                print(f"[LOGGER] Failed to save thumbnail: {e}")
 
-        with open(json_path, 'w') as f:
-            json.dump(metadata, f, indent=4, default=default_serializer)
+        self.encoder_pool.submit(save_event, json_path, metadata).result()
+        # Final metadata replaces the in-progress entry
+        if live_meta_path and live_meta_path != json_path:
+            remove_event(live_meta_path)
             
-        print(f"[LOGGER] Saved clip: {vid_path}")
-        
-        # Save Thumbnail (Best Frame or First Frame)
-        # We can try to pick a frame with high intent if we tracked it, 
-        # but for now let's just use the middle frame or the first one.
-        # Ideally, we should have passed `best_frame` index or image.
-        # Let's use the frame at 50% for now as a heuristic for "action".
-        try:
-            thumb_idx = len(frames) // 2
-            thumb_frame = frames[thumb_idx]
-            thumb_path = os.path.join(self.clips_dir, f"{metadata['clip_id']}.jpg")
-            cv2.imwrite(thumb_path, thumb_frame)
-            metadata["thumbnail_url"] = f"/videos/{metadata['clip_id']}.jpg"
-            print(f"[LOGGER] Saved thumbnail: {thumb_path}")
-        except Exception as e:
-            print(f"[LOGGER] Failed to save thumbnail: {e}")
+        print(f"[LOGGER] Saved clip: {vid_path or recording.playlist_url}")
+        changes = {k: v for k, v in metadata.items() if k != "thumbnail_url"}
+        changes["video_url"] = f"/videos/{os.path.basename(vid_path)}" if vid_path else None
+        changes["meta_filename"] = os.path.basename(json_path)
+        if vid_path:
+            changes["playlist_url"] = None # Segments were merged and removed
+        self._publish("clip_saved", metadata["clip_id"], changes)
         
         # Generate Summary if API Key is present
         # This might take time, but we are in a thread.
         # However, if queue fills up, new events might be delayed?
         # Ideally, summarization should be a separate queue/worker if frequent.
-        # For now, inline in this thread is fine as configured (60s cooldown).
+        # For now, inline in this thread is fine (one save thread per event).
         
-        if self.summarizer.client:
+        media = self._summary_media(vid_path, recording, metadata)
+        if self.summarizer.client and media:
             print("[LOGGER] Requesting AI Summary...")
-            summary = self.summarizer.summarize(vid_path, metadata)
+            summary = self.summarizer.summarize(media, metadata)
             if summary:
                 metadata["summary"] = summary
-                
-                # Rewrite JSON with summary
-                with open(json_path, 'w') as f:
-                    json.dump(metadata, f, indent=4, default=default_serializer)
                 print("[LOGGER] Summary saved to metadata.")
+                self._publish("summary_attached", metadata["clip_id"], {"summary": summary})
+
+        # Last write from this process; retention only rewrites metadata carrying saved_at.
+        # Never recreate an event that was evicted or deleted meanwhile.
+        if os.path.exists(json_path):
+            metadata["saved_at"] = time.time()
+            self.encoder_pool.submit(save_event, json_path, metadata).result()
+
+        if self.retention:
+            self.retention.request_sweep()
+
+    def _summary_media(self, vid_path, recording, metadata):
+        """
+        Footage for the summarizer: the joined clip, else (no ffmpeg, concat failed)
+        up to SUMMARY_MAX_SEGMENTS segments spread over the event, else the thumbnail.
+        """
+        if vid_path:
+            return [vid_path]
+        paths = [os.path.join(recording.segments_dir, seg["file"]) for seg in recording.segments]
+        paths = [path for path in paths if os.path.exists(path)]
+        if paths:
+            limit = max(1, self.config.SUMMARY_MAX_SEGMENTS)
+            if len(paths) > limit:
+                step = len(paths) / limit
+                paths = [paths[int(i * step)] for i in range(limit)]
+            return paths
+        thumb_path = os.path.join(self.clips_dir, f"{metadata['clip_id']}.jpg")
+        return [thumb_path] if os.path.exists(thumb_path) else []
+
+    def close(self):
+        if self.retention:
+            self.retention.stop()
@@ -0,0 +1,44 @@
+import threading
+
+
+class Metrics:
+    """
+    Process-wide counters and gauges, exported by /api/metrics.
+    Names are dotted paths, e.g. "clip_encoder.queue_depth".
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def set(self, name, value):
+        with self._lock:
+            self._values[name] = value
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def observe(self, name, value, alpha=0.1):
+        """Track a latency-like sample as last / EMA / max."""
+        with self._lock:
+            ema = self._values.get(f"{name}.ema")
+            self._values[f"{name}.last"] = value
+            self._values[f"{name}.ema"] = value if ema is None else alpha * value + (1 - alpha) * ema
+            self._values[f"{name}.max"] = max(self._values.get(f"{name}.max", value), value)
+
+    def update(self, values):
+        """Merge a snapshot, e.g. one reported by the pipeline process."""
+        with self._lock:
+            self._values.update(values)
+
+    def remove_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._values if k.startswith(prefix)]:
+                del self._values[key]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+metrics = Metrics()
@@ -0,0 +1,299 @@
+import time
+import threading
+from backend.config.config import Config
+from backend.core.metrics import metrics
+from backend.core import model_select
+from backend.core.pose_detector import PoseDetector
+from backend.core.violence import ViolenceWorker
+from backend.core.weapon import WeaponWorker
+from backend.core.worker_health import STATUS_OK, STATUS_HUNG, STATUS_DEAD, STATUS_RESTARTING
+from backend.core.pipeline_host import SharedFrameSlot
+from backend.core.inference_server import InferenceChannels, InferenceClient, InferenceServer, StreamSlot
+
+WORKER_TYPES = {
+    "violence": ViolenceWorker,
+    "weapon": WeaponWorker
+}
+
+
+class ModelPool:
+    """
+    Long-lived owner of the models: the pose landmarker and the MoViNet / weapon
+    worker processes. Pipelines attach to it instead of loading their own, so
+    switching between live and replay only resets state and never reloads models
+    or leaks worker processes.
+
+    One in-process pipeline uses the models at a time; attaching a new one
+    detaches the old. With INFERENCE_SERVER the workers are shared inference
+    servers: the in-process pipeline is stream 0, and open_stream() hands out
+    clients for pipelines in other processes (StreamModels), so adding cameras
+    adds no model instances.
+
+    A supervisor thread watches each worker's heartbeat (WorkerHealth). Crashed
+    or hung workers are killed and restarted with exponential backoff, and their
+    health is published as workers.<name>.* metrics.
+    """
+    def __init__(self):
+        self.pose = PoseDetector()
+        self.workers = {}
+        self.variants = self._select_variants()
+
+        # Shared inference servers: channels and frame slots outlive server restarts
+        self.channels = {}
+        self.slots = []
+        self.clients = {} # Stream 0 (this process)
+        self._free_streams = []
+        self._stream_lock = threading.Lock()
+        if Config.INFERENCE_SERVER:
+            self.channels = {name: InferenceChannels() for name in WORKER_TYPES}
+            self.slots = [SharedFrameSlot(create=True) for _ in range(Config.INFERENCE_MAX_STREAMS)]
+            self._free_streams = list(range(Config.INFERENCE_MAX_STREAMS))
+            self.clients = self.open_stream()
+        self.owner = None
+        self._lock = threading.Lock()
+
+        # Supervision state per worker
+        self.restarts = {name: 0 for name in WORKER_TYPES}
+        self._backoff = {name: Config.WORKER_RESTART_BACKOFF_S for name in WORKER_TYPES}
+        self._restart_at = {name: None for name in WORKER_TYPES}
+
+        self._running = True
+        for name in WORKER_TYPES:
+            self._start_worker(name)
+        self._supervisor = threading.Thread(target=self._supervise, name="model-supervisor", daemon=True)
+        self._supervisor.start()
+
+    @property
+    def violence_worker(self):
+        if Config.INFERENCE_SERVER:
+            return self.clients["violence"]
+        return self.workers.get("violence")
+
+    @property
+    def weapon_worker(self):
+        if Config.INFERENCE_SERVER:
+            return self.clients["weapon"]
+        return self.workers.get("weapon")
+
+    def open_stream(self):
+        """
+        Clients of every inference server for a new stream. Picklable, so they
+        can be passed to another process (see StreamModels).
+        :return: {name: InferenceClient}
+        """
+        with self._stream_lock:
+            if not self._free_streams:
+                raise RuntimeError(f"All {Config.INFERENCE_MAX_STREAMS} inference streams are in use")
+            stream_id = self._free_streams.pop(0)
+        slot = StreamSlot(self.slots[stream_id].name) # Shared by both models: one copy per frame
+        return {name: InferenceClient(stream_id, self.channels[name], slot) for name in WORKER_TYPES}
+
+    def close_stream(self, clients):
+        stream_id = next(iter(clients.values())).stream_id
+        for client in clients.values():
+            client.reset()
+        with self._stream_lock:
+            if stream_id not in self._free_streams:
+                self._free_streams.append(stream_id)
+
+    def _select_variants(self):
+        """Model artefact per worker, from this machine's calibration results."""
+        calibration = model_select.load_calibration()
+        if (Config.MODEL_CALIBRATE_ON_STARTUP and Config.MODEL_VARIANT_SELECTION == "auto"
+                and not model_select.is_calibrated(calibration)):
+            print("[MODEL POOL] No calibration for this machine, calibrating model variants")
+            model_select.calibrate()
+            calibration = model_select.load_calibration()
+        selected = {}
+        for name in WORKER_TYPES:
+            selected[name] = model_select.select_variant(name, calibration)
+            metrics.set(f"workers.{name}.variant", selected[name]["name"])
+            print(f"[MODEL POOL] {name}: variant {selected[name]['name']} ({selected[name]['path']})")
+        return selected
+
+    def _start_worker(self, name):
+        kwargs = model_select.worker_kwargs(name, self.variants[name])
+        if Config.INFERENCE_SERVER:
+            worker = InferenceServer(name, self.channels[name], [slot.name for slot in self.slots], kwargs)
+        else:
+            worker = WORKER_TYPES[name](**kwargs)
+        worker.start() # Not under _lock: a spawn start takes a while
+        with self._lock:
+            if not self._running:
+                # Shut down meanwhile
+                worker.stop()
+                worker.terminate()
+                return
+            self.workers[name] = worker
+        print(f"[MODEL POOL] Started {name} worker (pid {worker.pid})")
+
+    def attach(self, owner):
+        """Hand the models to a pipeline with clean per-stream state."""
+        with self._lock:
+            if self.owner is not None and self.owner is not owner:
+                print("[MODEL POOL] Previous pipeline still attached, detaching it")
+            self.owner = owner
+            self.reset()
+        return self
+
+    def detach(self, owner):
+        with self._lock:
+            if self.owner is owner:
+                self.owner = None
+
+    def reset(self):
+        """Clear per-stream state (MoViNet states, queued frames, pose tracking)."""
+        self.pose.reset()
+        for worker in (self.violence_worker, self.weapon_worker):
+            if worker is not None and worker.is_alive():
+                worker.reset()
+
+    # --- Supervision ---
+
+    def _supervise(self):
+        while self._running:
+            now = time.time()
+            with self._lock:
+                if not self._running: break
+                actions = [(name, self._check_worker(name, now)) for name in WORKER_TYPES]
+            # Decided under the lock, done outside it: attach() / detach() never wait
+            # on a process starting or being killed
+            for name, action in actions:
+                if action == "kill":
+                    self._kill_worker(name)
+                elif action == "start":
+                    self._start_worker(name)
+            time.sleep(Config.WORKER_SUPERVISE_INTERVAL_S)
+
+    def _check_worker(self, name, now):
+        """Supervision bookkeeping for one worker. :return: "start", "kill" or None"""
+        worker = self.workers[name]
+        restart_at = self._restart_at[name]
+
+        if restart_at is not None:
+            # Waiting out the backoff
+            if now >= restart_at:
+                self.restarts[name] += 1
+                self._restart_at[name] = None
+                metrics.set(f"workers.{name}.restarts", self.restarts[name])
+                return "start"
+            metrics.set(f"workers.{name}.status", STATUS_RESTARTING)
+            return None
+
+        health = worker.health.snapshot(worker.is_alive(), now)
+        status = health["status"]
+        for key, value in health.items():
+            metrics.set(f"workers.{name}.{key}", value)
+        metrics.set(f"workers.{name}.restarts", self.restarts[name])
+
+        if status in (STATUS_DEAD, STATUS_HUNG):
+            backoff = self._backoff[name]
+            print(f"[MODEL POOL] {name} worker {status} (exit code {worker.exitcode}), restarting in {backoff:.0f}s")
+            metrics.inc(f"workers.{name}.failures")
+            self._restart_at[name] = now + backoff
+            self._backoff[name] = min(backoff * 2, Config.WORKER_RESTART_BACKOFF_MAX_S)
+            metrics.set(f"workers.{name}.status", STATUS_RESTARTING)
+            return "kill"
+        if status == STATUS_OK and health["uptime_s"] > Config.WORKER_RESTART_BACKOFF_MAX_S:
+            # Stable again: the next failure starts from the short backoff
+            self._backoff[name] = Config.WORKER_RESTART_BACKOFF_S
+        return None
+
+    def _kill_worker(self, name):
+        worker = self.workers[name]
+        if worker.is_alive():
+            worker.terminate()
+            worker.join(timeout=1.0)
+        if name in self.channels:
+            self.channels[name].alive.value = False # Killed: it could not clear this itself
+
+    def health(self):
+        """{name: snapshot} for every worker, e.g. for /api/health."""
+        now = time.time()
+        result = {}
+        for name, worker in self.workers.items():
+            if self._restart_at[name] is not None:
+                result[name] = {"status": STATUS_RESTARTING, "restarts": self.restarts[name]}
+            else:
+                result[name] = dict(worker.health.snapshot(worker.is_alive(), now), restarts=self.restarts[name],
+                                    variant=self.variants[name]["name"])
+        return result
+
+    def shutdown(self, timeout=2.0):
+        """Stop the worker processes and release the landmarker."""
+        with self._lock:
+            self._running = False
+            for worker in self.workers.values():
+                worker.stop()
+            for worker in self.workers.values():
+                if not worker.is_alive(): continue
+                worker.join(timeout=timeout)
+                if worker.is_alive():
+                    worker.terminate()
+            self.workers = {}
+            for slot in self.slots:
+                slot.close()
+            self.slots = []
+            self.pose.close()
+            self.owner = None
+        print("[MODEL POOL] Shut down")
+
+
+class StreamModels:
+    """
+    Model access for a pipeline in another process: its own pose landmarker
+    plus clients of the parent's inference servers (ModelPool.open_stream()).
+    Pass it to Pipeline(model_pool=...) in place of the ModelPool.
+    """
+    def __init__(self, clients):
+        self.clients = clients
+        self.pose = None
+        self.owner = None
+
+    @property
+    def violence_worker(self):
+        return self.clients["violence"]
+
+    @property
+    def weapon_worker(self):
+        return self.clients["weapon"]
+
+    def attach(self, owner):
+        if self.pose is None:
+            self.pose = PoseDetector() # Loaded in the process that uses it
+        self.owner = owner
+        self.reset()
+        return self
+
+    def detach(self, owner):
+        if self.owner is owner:
+            self.owner = None
+
+    def reset(self):
+        self.pose.reset()
+        for client in self.clients.values():
+            client.reset()
+
+    def close(self):
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_model_pool():
+    """Shared pool; models load on first use and stay loaded for the process lifetime."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ModelPool()
+        return _pool
+
+def shutdown_model_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown()
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import glob
+import platform
+import cv2
+import numpy as np
+from backend.config.config import Config
+
+# Results are stored per machine so one calibration.json can be shipped to a
+# mixed fleet (x86 mini-PCs, ARM boards) and each picks its own variants:
+#   {"machines": {"<machine key>": {"violence": {"<variant>": {...}}, "weapon": {...}}}}
+KINDS = ("violence", "weapon")
+CLIP_EXTENSIONS = ("*.mp4", "*.avi", "*.mkv", "*.mov")
+
+
+def machine_key():
+    """Architecture, CPU model and core count, e.g. 'x86_64/Intel(R) N100/4'."""
+    cpu = platform.processor() or ""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.lower().startswith(("model name", "hardware")):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return f"{platform.machine()}/{cpu or 'unknown'}/{os.cpu_count()}"
+
+
+def variants(kind):
+    """Configured variants of a model kind whose artefact exists on disk."""
+    configured = Config.MOVINET_VARIANTS if kind == "violence" else Config.WEAPON_VARIANTS
+    return {name: v for name, v in configured.items() if os.path.exists(v["path"])}
+
+
+def default_variant(kind):
+    path = Config.MOVINET_MODEL_PATH if kind == "violence" else Config.WEAPON_MODEL_PATH
+    return {"name": "default", "path": path}
+
+
+def load_calibration(path=Config.MODEL_CALIBRATION_PATH):
+    if not os.path.exists(path):
+        return {"machines": {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def select_variant(kind, calibration=None):
+    """
+    The most accurate calibrated variant whose p95 latency fits the frame budget,
+    preferring the faster one among variants within MODEL_ACCURACY_TOLERANCE.
+    Falls back to the fastest variant if none fits, and to the configured
+    default model if this machine was never calibrated.
+    :return: {"name", "path", ...variant fields}
+    """
+    if Config.MODEL_VARIANT_SELECTION != "auto":
+        return default_variant(kind)
+    calibration = calibration or load_calibration()
+    results = calibration.get("machines", {}).get(machine_key(), {}).get(kind, {})
+    available = variants(kind)
+    candidates = {name: r for name, r in results.items() if name in available and "error" not in r}
+    if not candidates:
+        return default_variant(kind)
+
+    budget = Config.MODEL_FRAME_BUDGET_MS[kind]
+    fitting = {name: r for name, r in candidates.items() if r["p95_ms"] <= budget}
+    if fitting:
+        best_accuracy = max(r["accuracy"] for r in fitting.values())
+        good = [name for name, r in fitting.items() if r["accuracy"] >= best_accuracy - Config.MODEL_ACCURACY_TOLERANCE]
+        name = min(good, key=lambda n: fitting[n]["p95_ms"])
+    else:
+        name = min(candidates, key=lambda n: candidates[n]["p95_ms"])
+        print(f"[MODEL SELECT] No {kind} variant fits {budget:.0f} ms on this machine, using the fastest")
+    return dict(available[name], name=name)
+
+
+def worker_kwargs(kind, variant):
+    """Constructor arguments for the kind's worker process."""
+    if kind == "weapon":
+        return {"model_path": variant["path"], "img_size": variant.get("img_size")}
+    return {"model_path": variant["path"]}
+
+
+# --- Calibration ---
+
+def load_clips(kind):
+    """[(path, is_positive)] from MODEL_CALIBRATION_CLIPS/<kind>/<label>/."""
+    positive = Config.MODEL_CALIBRATION_POSITIVE[kind]
+    clips = []
+    for label_dir in sorted(glob.glob(os.path.join(Config.MODEL_CALIBRATION_CLIPS, kind, "*"))):
+        if not os.path.isdir(label_dir):
+            continue
+        label = os.path.basename(label_dir)
+        for ext in CLIP_EXTENSIONS:
+            for path in sorted(glob.glob(os.path.join(label_dir, ext))):
+                clips.append((path, label == positive))
+    return clips
+
+
+def read_frames(path, max_frames):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret: break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _make_detector(kind, variant):
+    # Imported here so selecting a variant never loads a runtime
+    if kind == "violence":
+        from backend.core.violence import ViolenceDetector
+        return ViolenceDetector(variant["path"])
+    from backend.core.weapon import WeaponDetector
+    return WeaponDetector(variant["path"], variant.get("img_size"))
+
+
+def benchmark_variant(kind, variant, clips, warmup=5):
+    """
+    Latency per frame and clip-level accuracy of one variant. A violence clip is
+    called positive when its 90th percentile fight probability exceeds 0.5, a
+    weapon clip when anything is detected in it.
+    """
+    t0 = time.perf_counter()
+    detector = _make_detector(kind, variant)
+    load_ms = (time.perf_counter() - t0) * 1000.0
+
+    latencies = []
+    correct = 0
+    for path, positive in clips:
+        frames = read_frames(path, Config.MODEL_CALIBRATION_FRAMES)
+        if not frames: continue
+        if kind == "violence":
+            detector.reset()
+        for frame in frames[:warmup]:
+            detector.predict(frame)
+        if kind == "violence":
+            detector.reset()
+
+        scores = []
+        for frame in frames:
+            t0 = time.perf_counter()
+            out = detector.predict(frame)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            # Fight probability is index 0 (see SignalProcessor.update)
+            scores.append(float(out[0]) if kind == "violence" else float(len(out) > 0))
+        predicted = np.percentile(scores, 90) > 0.5 if kind == "violence" else max(scores) > 0
+        correct += int(predicted == positive)
+
+    lat = np.asarray(latencies) if latencies else np.zeros(1)
+    return {
+        "path": variant["path"],
+        "load_ms": round(load_ms, 1),
+        "mean_ms": round(float(lat.mean()), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+        "accuracy": round(correct / len(clips), 4) if clips else None,
+        "clips": len(clips),
+        "frames": len(latencies)
+    }
+
+
+def calibrate(kinds=KINDS, path=Config.MODEL_CALIBRATION_PATH):
+    """Benchmark every available variant on this machine and store the results."""
+    calibration = load_calibration(path)
+    key = machine_key()
+    machine = calibration["machines"].setdefault(key, {})
+    for kind in kinds:
+        clips = load_clips(kind)
+        if not clips:
+            print(f"[MODEL SELECT] No labelled {kind} clips under {Config.MODEL_CALIBRATION_CLIPS}/{kind}, skipping")
+            continue
+        results = {}
+        for name, variant in variants(kind).items():
+            print(f"[MODEL SELECT] Benchmarking {kind}/{name} on {len(clips)} clips...")
+            try:
+                results[name] = benchmark_variant(kind, variant, clips)
+            except Exception as e:
+                print(f"[MODEL SELECT] {kind}/{name} failed: {e}")
+                results[name] = {"path": variant["path"], "error": str(e)}
+        machine[kind] = results
+    machine["calibrated_at"] = time.time()
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(calibration, f, indent=2)
+    os.replace(tmp_path, path)
+    return machine
+
+
+def is_calibrated(calibration=None):
+    calibration = calibration or load_calibration()
+    return machine_key() in calibration.get("machines", {})
+
+
+def print_table(machine):
+    print(f"{'model':<10} {'variant':<10} {'load ms':>8} {'mean ms':>8} {'p95 ms':>8} {'accuracy':>9} {'budget':>7}")
+    for kind in KINDS:
+        budget = Config.MODEL_FRAME_BUDGET_MS[kind]
+        for name, r in machine.get(kind, {}).items():
+            if "error" in r:
+                print(f"{kind:<10} {name:<10} error: {r['error']}")
+                continue
+            fits = "ok" if r["p95_ms"] <= budget else "over"
+            accuracy = f"{r['accuracy']:.2f}" if r["accuracy"] is not None else "-"
+            print(f"{kind:<10} {name:<10} {r['load_ms']:>8.0f} {r['mean_ms']:>8.1f} {r['p95_ms']:>8.1f} {accuracy:>9} {fits:>7}")
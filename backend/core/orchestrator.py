@@ -0,0 +1,102 @@
+import threading
+from backend.config.config import Config
+from backend.core.metrics import metrics
+from backend.core.pipeline_host import PipelineProcess
+
+
+def camera_for_sensor(sensor=None, device=None):
+    """Camera a sensor belongs to (Config.SENSOR_CAMERAS), DEFAULT_CAMERA if unmapped."""
+    keys = []
+    if device and sensor:
+        keys.append(f"{device}/{sensor}")
+    keys.extend(k for k in (device, sensor) if k)
+    for key in keys:
+        camera = Config.SENSOR_CAMERAS.get(key)
+        if camera in Config.CAMERAS:
+            return camera
+    return Config.DEFAULT_CAMERA
+
+
+class CameraOrchestrator:
+    """
+    One supervised PipelineProcess per configured camera (Config.CAMERAS), each
+    pinned to its cpus and logging under its own name.
+
+    With INFERENCE_SERVER the cameras share the ModelPool's inference servers
+    (one stream each) instead of each loading its own models.
+
+    Frames come back as on_frame(frame, metadata, camera_id); event
+    notifications carry the camera_id (EventLogger).
+    """
+    def __init__(self, on_frame, on_event=None, cameras=None, no_logs=False):
+        self.on_frame = on_frame
+        self.on_event = on_event
+        self.cameras = cameras or Config.CAMERAS
+        self.no_logs = no_logs
+        self.pipelines = {} # camera_id -> PipelineProcess
+        self.streams = {} # camera_id -> inference clients (ModelPool.open_stream())
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            for camera_id, spec in self.cameras.items():
+                self._start_camera(camera_id, spec)
+
+    def _start_camera(self, camera_id, spec):
+        models = None
+        if Config.INFERENCE_SERVER:
+            from backend.core.model_pool import StreamModels, get_model_pool
+            try:
+                self.streams[camera_id] = get_model_pool().open_stream()
+            except RuntimeError as e:
+                print(f"[ORCHESTRATOR] Camera {camera_id} not started: {e}")
+                metrics.set(f"cameras.{camera_id}.status", "error")
+                return
+            models = StreamModels(self.streams[camera_id])
+
+        cpus = spec.get("cpus")
+        pipeline = PipelineProcess(
+            on_frame=lambda frame, metadata, camera_id=camera_id: self.on_frame(frame, metadata, camera_id),
+            on_event=self.on_event,
+            input_source=spec.get("source", 0),
+            no_logs=self.no_logs,
+            camera_id=camera_id,
+            cpus=set(cpus) if cpus else None,
+            models=models
+        )
+        pipeline.start()
+        self.pipelines[camera_id] = pipeline
+        metrics.set(f"cameras.{camera_id}.status", "running")
+        print(f"[ORCHESTRATOR] Camera {camera_id} started")
+
+    def stop(self):
+        with self._lock:
+            pipelines, self.pipelines = self.pipelines, {}
+            streams, self.streams = self.streams, {}
+        for camera_id, pipeline in pipelines.items():
+            pipeline.stop()
+            metrics.set(f"cameras.{camera_id}.status", "stopped")
+        if streams:
+            from backend.core.model_pool import get_model_pool
+            pool = get_model_pool()
+            for clients in streams.values():
+                pool.close_stream(clients)
+
+    def trigger_doorbell(self, camera_id=None):
+        pipeline = self.pipelines.get(camera_id or Config.DEFAULT_CAMERA)
+        if pipeline:
+            pipeline.trigger_doorbell()
+
+    def status(self):
+        """{camera_id: {...}} for /api/cameras. Sources are left out: RTSP URLs carry credentials."""
+        result = {}
+        for camera_id, spec in self.cameras.items():
+            pipeline = self.pipelines.get(camera_id)
+            alive = bool(pipeline and pipeline.proc and pipeline.proc.is_alive())
+            result[camera_id] = {
+                "cpus": spec.get("cpus"),
+                "running": alive,
+                "pid": pipeline.proc.pid if alive else None,
+                "restarts": pipeline.restarts if pipeline else 0
+            }
+        return result
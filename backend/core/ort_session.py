@@ -0,0 +1,69 @@
+import os
+import hashlib
+import onnxruntime as ort
+from backend.config.config import Config
+from backend.core.model_select import machine_key
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+}
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL
+}
+
+
+def session_options(optimization=None):
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = Config.ORT_INTRA_OP_THREADS
+    options.inter_op_num_threads = Config.ORT_INTER_OP_THREADS
+    options.execution_mode = EXECUTION_MODES[Config.ORT_EXECUTION_MODE]
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[optimization or Config.ORT_GRAPH_OPTIMIZATION]
+    return options
+
+
+def cache_path(model_path):
+    """
+    Optimized graph location for a model. The key covers the model bytes, the
+    ONNX Runtime version, the optimization level and the machine: "all" level
+    graphs can contain layout / kernel choices specific to this CPU.
+    """
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(f"{ort.__version__}|{Config.ORT_GRAPH_OPTIMIZATION}|{machine_key()}".encode())
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(Config.ORT_CACHE_DIR, f"{name}-{digest.hexdigest()[:16]}.onnx")
+
+
+def create_session(model_path, providers=('CPUExecutionProvider',)):
+    """
+    InferenceSession with the configured options. The first start saves the
+    optimized graph to ORT_CACHE_DIR; later starts load it with optimization
+    disabled, skipping that work.
+    """
+    providers = list(providers)
+    if not Config.ORT_CACHE_DIR or Config.ORT_GRAPH_OPTIMIZATION == "disable":
+        return ort.InferenceSession(model_path, sess_options=session_options(), providers=providers)
+
+    cached = cache_path(model_path)
+    if os.path.exists(cached):
+        try:
+            return ort.InferenceSession(cached, sess_options=session_options("disable"), providers=providers)
+        except Exception as e:
+            print(f"[ORT] Cached graph {cached} unusable ({e}), rebuilding")
+            os.remove(cached)
+
+    os.makedirs(Config.ORT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cached}.{os.getpid()}.tmp"
+    options = session_options()
+    options.optimized_model_filepath = tmp_path
+    session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, cached)
+        print(f"[ORT] Cached optimized graph for {os.path.basename(model_path)} at {cached}")
+    return session
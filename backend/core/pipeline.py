@@ -4,42 +4,54 @@ import time
 import numpy as np
 import mediapipe as mp
 from backend.config.config import Config, IntentConfig
-from backend.core.pose_detector import PoseDetector
 from backend.core.signals import SignalProcessor
 from backend.core.visualization import Visualizer
 from backend.core.intent import IntentEngine
-from backend.core.violence import ViolenceWorker
-from backend.core.weapon import WeaponWorker
 from backend.core.logger import EventLogger
+from backend.core.tracking import WeaponTracker
+from backend.core.detections import no_detections
+from backend.core.model_pool import get_model_pool
+from backend.core.sources import create_source
 
 class Pipeline:
-    def __init__(self, headless=False, no_logs=False):
+    def __init__(self, headless=False, no_logs=False, model_pool=None, camera_id=None):
         self.config = Config()
+        self.camera_id = camera_id
         
         # Components
-        self.detector = PoseDetector()
         self.processor = SignalProcessor()
         self.intent_engine = IntentEngine()
+        self.weapon_tracker = WeaponTracker()
         self.visualizer = Visualizer(headless=headless)
-        self.logger = EventLogger(no_logs=no_logs)
+        # Retention covers the whole log dir: only the default camera's logger runs it
+        self.logger = EventLogger(no_logs=no_logs, camera_id=camera_id,
+                                  retention=camera_id in (None, Config.DEFAULT_CAMERA))
         
-        # Threaded Workers
-        self.violence_worker = ViolenceWorker()
-        self.violence_worker.start()
-        
-        self.weapon_worker = WeaponWorker()
-        self.weapon_worker.start()
+        # Models and worker processes are shared and stay loaded across pipelines
+        self.models = (model_pool or get_model_pool()).attach(self)
+
+    # Looked up on every use: the pool's supervisor may have replaced a worker
+    @property
+    def detector(self):
+        return self.models.pose
+
+    @property
+    def violence_worker(self):
+        return self.models.violence_worker
+
+    @property
+    def weapon_worker(self):
+        return self.models.weapon_worker
         
     def reset(self):
         """Reset pipeline state."""
         # Re-instantiate logic components to ensure clean state
         self.processor = SignalProcessor()
         self.intent_engine = IntentEngine()
+        self.weapon_tracker.reset()
         
-        # Reset detectors and workers
-        self.detector.reset()
-        self.violence_worker.reset()
-        self.weapon_worker.reset()
+        # Reset model state (no reload)
+        self.models.reset()
 
     def trigger_doorbell(self):
         """Pass hardware trigger to processor."""
@@ -47,31 +59,40 @@ class Pipeline:
             self.processor.trigger_doorbell()
 
     def run(self, input_source=0, headless=False, frame_callback=None, throttle=True):
+        """
+        :param input_source: anything create_source() accepts (device index, file,
+                             image directory, rtsp:// / http:// URL, "synthetic",
+                             dict spec) or a FrameSource
+        """
         print(f"Starting pipeline on source: {input_source}")
 
         if not headless:
             print("Press ESC to exit local window.")
             
-        cap = cv2.VideoCapture(input_source)
-        if not cap.isOpened():
-            print(f"Could not open source: {input_source}")
+        # Decoding runs on the source's own thread
+        source = create_source(input_source)
+        if not source.start():
+            print(f"Could not open source: {input_source} ({source.last_error or 'open failed'})")
             return
         
         # Init placeholders for holding previous values
         movinet_probs = np.array([0.0, 0.0])
-        weapon_detections = []
+        weapon_detections = no_detections()
+        frame_index = 0
 
         self.running = True
         
         # Simulated time for fast processing
         sim_time = time.time()
 
-        while cap.isOpened() and self.running:
-            ret, frame = cap.read()
-            if not ret: break
+        while self.running:
+            frame = source.read()
+            if frame is None:
+                if source.ended: break
+                continue # Live source reconnecting, or no new frame yet
             
             # Determine Time
-            if isinstance(input_source, str) and not throttle:
+            if not source.live and not throttle:
                 # Fast processing: Advance time by fixed DT
                 sim_time += self.config.DT
                 current_clock_time = sim_time
@@ -80,10 +101,12 @@ class Pipeline:
                 current_clock_time = time.time()
 
             # Send frame to workers
+            # Same frame_id: the shared inference slot copies the frame once for both
             if self.violence_worker.is_alive():
-                 self.violence_worker.process_frame(frame)
-            if self.weapon_worker.is_alive():
-                 self.weapon_worker.process_frame(frame)
+                 self.violence_worker.process_frame(frame, frame_id=frame_index)
+            if self.weapon_worker.is_alive() and frame_index % self.config.WEAPON_DETECT_INTERVAL == 0:
+                 self.weapon_worker.process_frame(frame, frame_id=frame_index)
+            frame_index += 1
             
             # Get latest results
             # Violence
@@ -93,7 +116,10 @@ class Pipeline:
             
             # Weapon
             dets = self.weapon_worker.get_latest_detections()
-            if dets is not None:
+            if self.config.WEAPON_TRACKING:
+                 # Fresh results re-anchor the tracks; in between, boxes follow the motion
+                 weapon_detections = self.weapon_tracker.update(frame, dets, current_clock_time)
+            elif dets is not None:
                  weapon_detections = dets
 
             # Detect Pose
@@ -127,8 +153,8 @@ class Pipeline:
             
             # Calculate max weapon score
             max_weapon_conf = 0.0
-            if weapon_detections:
-                 max_weapon_conf = max(d['score'] for d in weapon_detections)
+            if len(weapon_detections) > 0:
+                 max_weapon_conf = float(weapon_detections['score'].max())
 
             # Add max weapon score to signals for auto-aggregation in logger
             signals["weapon_score"] = max_weapon_conf
@@ -142,35 +168,36 @@ class Pipeline:
                 movinet_pressure=signals.get("movinet_pressure", 0.0)
             )
 
-            # Callback for Streaming
+            # Callback for Streaming (encoding is up to the streaming layer, on demand)
             if frame_callback:
-                # Encode frame to JPEG
-                ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
-                if ret:
-                    jpg_bytes = buffer.tobytes()
-                    # Metadata payload
-                    metadata = {
-                        "intent_score": float(intent_score),
-                        "threat_level": threat_level,
-                        "signals": {k: float(v) for k, v in signals.items() if isinstance(v, (int, float))}
-                    }
-                    frame_callback(jpg_bytes, metadata)
+                # Metadata payload
+                metadata = {
+                    "timestamp": current_clock_time,
+                    "intent_score": float(intent_score),
+                    "threat_level": threat_level,
+                    "signals": {k: float(v) for k, v in signals.items() if isinstance(v, (int, float))}
+                }
+                if self.camera_id:
+                    metadata["camera_id"] = self.camera_id
+                frame_callback(frame, metadata)
 
             if not headless:
                 if cv2.waitKey(1) & 0xFF == 27: # ESC
                     break
             
             # Throttle for simulation (file input)
-            if isinstance(input_source, str) and throttle:
+            if not source.live and throttle:
                 # Simple sleep to match FPS
                 time.sleep(self.config.DT)
 
+        source.stop()
         self.close()
-        cap.release()
 
     def stop(self):
         self.running = False
             
     def close(self):
-        self.detector.close()
+        # Models stay loaded in the pool for the next pipeline
+        self.models.detach(self)
         self.visualizer.close()
+        self.logger.close()
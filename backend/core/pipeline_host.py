@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import queue
+import struct
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from backend.config.config import Config
+from backend.core.metrics import metrics
+from backend.core.encoder import default_serializer
+from backend.core.sources import is_live
+
+# Shared frame slot (single writer, any number of readers), seqlock protected:
+#   [0:8]    seq u64, odd while the writer is mid-update
+#   [8:24]   height, width, channels, metadata length (u32 each)
+#   [64:64+PIPELINE_META_MAX_BYTES]  metadata JSON
+#   [...]    frame bytes (BGR uint8)
+SEQ = struct.Struct("<Q")
+SHAPE = struct.Struct("<IIII")
+META_OFFSET = 64
+
+
+def slot_size():
+    return META_OFFSET + Config.PIPELINE_META_MAX_BYTES + Config.PIPELINE_FRAME_MAX_BYTES
+
+
+class SharedFrameSlot:
+    """
+    Latest-frame slot in shared memory. The writer never waits for readers;
+    readers retry if the writer changed the slot while they were copying.
+    """
+    def __init__(self, name=None, create=False, writer=False):
+        """
+        :param writer: attach as the (single) writer. A previous writer that died
+                       mid-write left the sequence odd; it is rounded up to even
+                       so readers accept frames again.
+        """
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=slot_size())
+            SEQ.pack_into(self.shm.buf, 0, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.owner = create
+        self.frame_offset = META_OFFSET + Config.PIPELINE_META_MAX_BYTES
+        self.frame_capacity = self.shm.size - self.frame_offset
+        self._seq = SEQ.unpack_from(self.shm.buf, 0)[0]
+        if writer and self._seq % 2:
+            self._seq += 1
+            SEQ.pack_into(self.shm.buf, 0, self._seq)
+
+    def write(self, frame, metadata):
+        """:return: False if the frame or metadata does not fit the slot"""
+        meta = json.dumps(metadata, default=default_serializer).encode()
+        if frame.nbytes > self.frame_capacity or len(meta) > Config.PIPELINE_META_MAX_BYTES:
+            return False
+        buf = self.shm.buf
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+
+        SEQ.pack_into(buf, 0, self._seq + 1) # Odd: update in progress
+        SHAPE.pack_into(buf, 8, h, w, c, len(meta))
+        buf[META_OFFSET:META_OFFSET + len(meta)] = meta
+        dst = np.ndarray((frame.nbytes,), dtype=np.uint8, buffer=buf, offset=self.frame_offset)
+        dst[:] = np.ascontiguousarray(frame).reshape(-1)
+        self._seq += 2
+        SEQ.pack_into(buf, 0, self._seq)
+        return True
+
+    def read(self, last_seq=None, retries=5):
+        """
+        Copy the latest frame out of the slot.
+        :return: (seq, frame, metadata), or None if nothing new / the writer kept racing us
+        """
+        buf = self.shm.buf
+        for _ in range(retries):
+            seq = SEQ.unpack_from(buf, 0)[0]
+            if seq == 0 or seq == last_seq:
+                return None
+            if seq % 2:
+                time.sleep(0.0005)
+                continue
+            h, w, c, meta_len = SHAPE.unpack_from(buf, 8)
+            meta = bytes(buf[META_OFFSET:META_OFFSET + meta_len])
+            n = h * w * c
+            frame = np.ndarray((n,), dtype=np.uint8, buffer=buf, offset=self.frame_offset).copy()
+            if SEQ.unpack_from(buf, 0)[0] == seq:
+                frame = frame.reshape((h, w, c) if c > 1 else (h, w))
+                return seq, frame, json.loads(meta)
+        metrics.inc("pipeline_process.torn_reads")
+        return None
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _pipeline_main(slot_name, frame_ready, cmd_queue, event_queue, input_source, no_logs,
+                   camera_id=None, cpus=None, models=None):
+    """Entry point of the pipeline process."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+            print(f"[PIPELINE HOST] {camera_id or 'Pipeline'} pinned to CPUs {sorted(cpus)}")
+        except OSError as e:
+            print(f"[PIPELINE HOST] Could not pin to CPUs {cpus}: {e}")
+
+    # Imported here so the API process never loads the models
+    from backend.core.pipeline import Pipeline
+
+    slot = SharedFrameSlot(slot_name, writer=True)
+    pipeline = Pipeline(headless=True, no_logs=no_logs, model_pool=models, camera_id=camera_id)
+    pipeline.logger.on_event = lambda msg: event_queue.put(("event", msg))
+
+    def handle_commands():
+        while True:
+            cmd = cmd_queue.get()
+            if cmd == "stop":
+                pipeline.stop()
+                return
+            elif cmd == "doorbell":
+                pipeline.trigger_doorbell()
+
+    def report_metrics():
+        from backend.core.metrics import metrics as child_metrics
+        while True: # Daemon thread, ends with the process
+            event_queue.put(("metrics", child_metrics.snapshot()))
+            time.sleep(Config.PIPELINE_METRICS_INTERVAL_S)
+
+    oversized = {"reported": False}
+
+    def on_frame(frame, metadata):
+        if slot.write(frame, metadata):
+            frame_ready.set()
+            return
+        metrics.inc("pipeline_process.oversized_frames")
+        if not oversized["reported"]: # Once: it would repeat on every frame
+            oversized["reported"] = True
+            print(f"[PIPELINE HOST] Frame {frame.shape} does not fit the shared slot "
+                  f"(PIPELINE_FRAME_MAX_BYTES / PIPELINE_META_MAX_BYTES), frames are skipped")
+
+    threading.Thread(target=handle_commands, daemon=True).start()
+    threading.Thread(target=report_metrics, daemon=True).start()
+    event_queue.put(("started", os.getpid()))
+    try:
+        pipeline.run(input_source=input_source, headless=True, frame_callback=on_frame)
+    finally:
+        slot.close()
+        if models is not None:
+            models.close()
+
+
+class PipelineProcess:
+    """
+    Runs the Pipeline in its own supervised process (PIPELINE_MODE = "process").
+
+    Frames and their metadata come back through a SharedFrameSlot; the API
+    process copies the latest one out and hands it to on_frame. Event lifecycle
+    notifications and metrics snapshots come back over a queue. If the process
+    dies without being asked to stop, it is restarted with exponential backoff.
+
+    Same control surface as Pipeline as far as the server is concerned:
+    start(), stop(), trigger_doorbell().
+
+    With a camera_id (CameraOrchestrator) the process is pinned to cpus, the
+    pipeline logs under the camera's name, and its metrics, including the
+    ones reported by the child, are published under cameras.<id>.*. models
+    replaces the child's own ModelPool (StreamModels on shared inference servers).
+    """
+    def __init__(self, on_frame, on_event=None, input_source=0, no_logs=False,
+                 camera_id=None, cpus=None, models=None):
+        self.on_frame = on_frame
+        self.on_event = on_event
+        self.input_source = input_source
+        self.no_logs = no_logs
+        self.camera_id = camera_id
+        self.cpus = cpus
+        self.models = models
+        self.metrics_prefix = f"cameras.{camera_id}" if camera_id else "pipeline_process"
+
+        self.ctx = multiprocessing.get_context("spawn")
+        self.slot = SharedFrameSlot(create=True)
+        self.frame_ready = self.ctx.Event()
+        self.cmd_queue = None
+        self.event_queue = self.ctx.Queue()
+        self.proc = None
+        self.started_at = 0.0
+        self.running = False
+        self.restarts = 0
+        self._threads = []
+
+    def start(self):
+        self.running = True
+        self._spawn()
+        for target in (self._frame_loop, self._event_loop, self._supervise):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _spawn(self):
+        self.cmd_queue = self.ctx.Queue()
+        self.proc = self.ctx.Process(
+            target=_pipeline_main,
+            args=(self.slot.name, self.frame_ready, self.cmd_queue, self.event_queue,
+                  self.input_source, self.no_logs, self.camera_id, self.cpus, self.models),
+            daemon=False # The pipeline starts its own worker processes
+        )
+        self.proc.start()
+        self.started_at = time.time()
+        metrics.set(f"{self.metrics_prefix}.pid", self.proc.pid)
+        print(f"[PIPELINE HOST] {self._label()} process started (pid {self.proc.pid})")
+
+    def _label(self):
+        return f"Camera {self.camera_id}" if self.camera_id else "Pipeline"
+
+    def _supervise(self):
+        backoff = Config.PIPELINE_RESTART_BACKOFF_S
+        while self.running:
+            self.proc.join(timeout=1.0)
+            if self.proc.is_alive() or not self.running:
+                # Stayed up for a while: the next crash starts from the short backoff again
+                if time.time() - self.started_at > Config.PIPELINE_RESTART_BACKOFF_MAX_S:
+                    backoff = Config.PIPELINE_RESTART_BACKOFF_S
+                continue
+            if self.proc.exitcode == 0 and not is_live(self.input_source):
+                # A file or image directory played to the end: nothing to restart
+                print(f"[PIPELINE HOST] {self._label()} source finished, process exited")
+                metrics.set(f"{self.metrics_prefix}.status", "finished")
+                return
+            print(f"[PIPELINE HOST] {self._label()} process exited ({self.proc.exitcode}), restarting in {backoff:.0f}s")
+            metrics.inc(f"{self.metrics_prefix}.restarts")
+            self.restarts += 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2, Config.PIPELINE_RESTART_BACKOFF_MAX_S)
+            if self.running:
+                self._spawn()
+
+    def _frame_loop(self):
+        last_seq = None
+        while self.running:
+            if not self.frame_ready.wait(timeout=0.5):
+                continue
+            self.frame_ready.clear()
+            item = self.slot.read(last_seq)
+            if item is None:
+                continue
+            seq, frame, metadata = item
+            if last_seq is not None and seq > last_seq + 2:
+                metrics.inc(f"{self.metrics_prefix}.skipped_frames", (seq - last_seq) // 2 - 1)
+            last_seq = seq
+            self.on_frame(frame, metadata)
+
+    def _event_loop(self):
+        while self.running:
+            try:
+                kind, payload = self.event_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == "event" and self.on_event:
+                self.on_event(payload)
+            elif kind == "metrics":
+                if self.camera_id:
+                    payload = {f"{self.metrics_prefix}.{key}": value for key, value in payload.items()}
+                metrics.update(payload)
+            elif kind == "started":
+                print(f"[PIPELINE HOST] {self._label()} running in pid {payload}")
+
+    def trigger_doorbell(self):
+        if self.cmd_queue:
+            self.cmd_queue.put("doorbell")
+
+    def stop(self, timeout=5.0):
+        self.running = False
+        if self.proc and self.proc.is_alive():
+            self.cmd_queue.put("stop")
+            self.proc.join(timeout=timeout)
+            if self.proc.is_alive():
+                print(f"[PIPELINE HOST] {self._label()} process did not stop, terminating")
+                self.proc.terminate()
+                self.proc.join(timeout=1.0)
+        self.slot.close()
+        print(f"[PIPELINE HOST] {self._label()} process stopped")
@@ -8,6 +8,9 @@ from backend.config.config import Config
 class PoseDetector:
     def __init__(self):
         self._init_detector()
+        # VIDEO mode needs strictly increasing timestamps for the landmarker's whole life
+        self.last_timestamp_ms = -1
+        self.timestamp_offset_ms = 0
 
     def _init_detector(self):
         base_options = python.BaseOptions(model_asset_path=Config.MODEL_PATH)
@@ -19,9 +22,12 @@ class PoseDetector:
         self.landmarker = vision.PoseLandmarker.create_from_options(options)
 
     def reset(self):
-        if hasattr(self, 'landmarker'):
-            self.landmarker.close()
-        self._init_detector()
+        """
+        Start a new stream without reloading the model. The next stream's clock
+        may start anywhere (replay, sim time), so its timestamps are shifted past
+        the last one seen, with a gap so tracking does not carry across streams.
+        """
+        self.timestamp_offset_ms = None
 
     def detect(self, image, timestamp_ms):
         """
@@ -30,7 +36,11 @@ class PoseDetector:
         :param timestamp_ms: int
         :return: vision.PoseLandmarkerResult
         """
-        return self.landmarker.detect_for_video(image, timestamp_ms)
+        if self.timestamp_offset_ms is None:
+            self.timestamp_offset_ms = self.last_timestamp_ms + Config.POSE_RESET_GAP_MS - timestamp_ms
+        ts = max(timestamp_ms + self.timestamp_offset_ms, self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = ts
+        return self.landmarker.detect_for_video(image, ts)
 
     def close(self):
         self.landmarker.close()
@@ -0,0 +1,260 @@
+import os
+import json
+import shutil
+import threading
+from concurrent.futures import wait as wait_futures
+from backend.config.config import Config
+from backend.core.encoder import get_encoder_pool, encode_segment, concat_segments, spool_dir
+from backend.core.metrics import metrics
+
+# Raw frames spooled to tmpfs and not yet encoded, across all recordings
+_spool_lock = threading.Lock()
+_spooled_frames = 0
+
+
+def _reserve_spool_frame():
+    """:return: False if CLIP_SEGMENT_QUEUE_MAX frames are already waiting"""
+    global _spooled_frames
+    with _spool_lock:
+        if _spooled_frames >= Config.CLIP_SEGMENT_QUEUE_MAX:
+            return False
+        _spooled_frames += 1
+        metrics.set("clip_encoder.spooled_frames", _spooled_frames)
+        return True
+
+
+def _release_spool_frames(n):
+    global _spooled_frames
+    with _spool_lock:
+        _spooled_frames = max(0, _spooled_frames - n)
+        metrics.set("clip_encoder.spooled_frames", _spooled_frames)
+
+
+class SegmentedRecording:
+    """
+    One in-progress event written as short fixed-length segments plus a JSON playlist.
+
+    write() appends raw frames to a spool file (tmpfs); each full segment is handed
+    to the clip encoder pool. The playlist is rewritten whenever the next segment in
+    order is ready, so the dashboard can play the event while it is still recording
+    and a crash loses at most one segment.
+    """
+    def __init__(self, clips_dir, clip_id, start_timestamp):
+        self.config = Config
+        self.pool = get_encoder_pool()
+        self.clip_id = clip_id
+        self.segments_dir = os.path.join(clips_dir, "segments", clip_id)
+        self.playlist_path = os.path.join(self.segments_dir, "playlist.json")
+        self.url_prefix = f"/videos/segments/{clip_id}"
+        os.makedirs(self.segments_dir, exist_ok=True)
+
+        self.manifest = {
+            "clip_id": clip_id,
+            "status": "recording",
+            "timestamp": start_timestamp,
+            "segment_duration": self.config.CLIP_SEGMENT_SECONDS,
+            "dropped_frames": 0,
+            "segments": []
+        }
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._write_playlist()
+
+        # Current spool
+        self._spool = None
+        self._spool_path = None
+        self._shape = None
+        self._timestamps = []
+
+        # Submitted segment futures; finished ones wait in _ready until they can be
+        # published to the playlist in index order
+        self._futures = []
+        self._ready = {}
+        self._index = 0
+
+    @property
+    def playlist_url(self):
+        return f"{self.url_prefix}/playlist.json"
+
+    @property
+    def segments(self):
+        return self.manifest["segments"]
+
+    def _drop_frame(self):
+        self.manifest["dropped_frames"] += 1
+        metrics.inc("clip_encoder.dropped_frames")
+
+    def write(self, frame, timestamp):
+        """
+        Append a frame to the spool. Only a memcpy on the real-time loop; never
+        raises: frames are dropped (and counted) when the spool is full.
+        """
+        if self._timestamps and (
+            timestamp - self._timestamps[0] >= self.config.CLIP_SEGMENT_SECONDS or frame.shape != self._shape
+        ):
+            self._submit_segment()
+
+        # Backpressure: drop frames rather than fill tmpfs when encoders fall behind
+        if self._spool is None and self.pool.pending >= self.config.CLIP_ENCODER_MAX_PENDING:
+            self._drop_frame()
+            return
+        if not _reserve_spool_frame():
+            self._drop_frame()
+            return
+
+        try:
+            if self._spool is None:
+                self._shape = frame.shape
+                self._spool_path = os.path.join(spool_dir(), f"{self.clip_id}_{self._index:05d}.raw")
+                self._spool = open(self._spool_path, 'wb')
+            self._spool.write(memoryview(frame if frame.flags['C_CONTIGUOUS'] else frame.copy()))
+        except OSError as e:
+            # tmpfs full (ENOSPC) or similar: keep the complete frames, encode them, drop this one
+            _release_spool_frames(1)
+            self._drop_frame()
+            metrics.inc("clip_encoder.spool_errors")
+            print(f"[RECORDER] Spool write failed, dropping frame: {e}")
+            self._truncate_spool()
+            self._submit_segment()
+            return
+        self._timestamps.append(timestamp)
+
+    def _truncate_spool(self):
+        """Cut a partially written frame off the spool."""
+        if self._spool is None: return
+        try:
+            self._spool.truncate(len(self._timestamps) * self._frame_bytes())
+        except (OSError, ValueError):
+            pass
+
+    def _frame_bytes(self):
+        n = 1
+        for dim in self._shape:
+            n *= dim
+        return n
+
+    def _discard_spool(self):
+        try:
+            self._spool.close()
+        except OSError:
+            pass
+        try:
+            os.remove(self._spool_path)
+        except OSError:
+            pass
+        self._spool = None
+        self._spool_path = None
+        self._timestamps = []
+
+    def _submit_segment(self):
+        if self._spool is None: return
+        if not self._timestamps:
+            self._discard_spool()
+            return
+        try:
+            self._spool.close()
+        except OSError as e:
+            # Buffered bytes could not be flushed: the spool is incomplete
+            print(f"[RECORDER] Spool close failed, segment dropped: {e}")
+            metrics.inc("clip_encoder.spool_errors")
+            n = len(self._timestamps)
+            self.manifest["dropped_frames"] += n
+            metrics.inc("clip_encoder.dropped_frames", n)
+            _release_spool_frames(n)
+            self._discard_spool()
+            return
+
+        timestamps = self._timestamps
+        # Measured FPS so segments play back in real time
+        if len(timestamps) > 1 and timestamps[-1] > timestamps[0]:
+            fps = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+        else:
+            fps = self.config.FPS
+
+        index = self._index
+        out_base = os.path.join(self.segments_dir, f"seg_{index:05d}")
+        future = self.pool.submit(encode_segment, self._spool_path, self._shape, len(timestamps), fps, out_base)
+        future.add_done_callback(lambda f, i=index, n=len(timestamps), d=len(timestamps) / fps, p=self._spool_path,
+                                 s=self._shape: self._on_segment(i, f, n, d, p, s))
+        self._futures.append(future)
+
+        self._index += 1
+        self._spool = None
+        self._spool_path = None
+        self._timestamps = []
+
+    def _on_segment(self, index, future, n_frames, duration, spool_path, shape):
+        entry = None # A failed segment is skipped so the playlist stays contiguous
+        if future.exception() is None:
+            out_path, encode_ms = future.result()
+            metrics.observe("clip_encoder.segment_ms", encode_ms)
+            entry = (os.path.basename(out_path), n_frames, duration, [shape[1], shape[0]])
+        else:
+            try:
+                os.remove(spool_path) # Not removed by the failed encode
+            except OSError:
+                pass
+        _release_spool_frames(n_frames)
+
+        with self._lock:
+            self._ready[index] = entry
+            published = self._published_count()
+            while published in self._ready:
+                entry = self._ready.pop(published)
+                if entry is not None:
+                    name, n, dur, size = entry
+                    start = sum(s["duration"] for s in self.segments)
+                    self.segments.append({
+                        "file": name,
+                        "url": f"{self.url_prefix}/{name}",
+                        "start": start,
+                        "duration": dur,
+                        "frames": n,
+                        "size": size
+                    })
+                else:
+                    self.manifest.setdefault("failed_segments", []).append(published)
+                published += 1
+            self._write_playlist()
+            self._published.notify_all()
+
+    def _published_count(self):
+        return len(self.segments) + len(self.manifest.get("failed_segments", []))
+
+    def close(self):
+        """End of event: hand over the partial last segment. Non-blocking."""
+        self._submit_segment()
+
+    def wait(self, timeout=None):
+        """Block until every segment is encoded, then mark the playlist complete."""
+        wait_futures(self._futures, timeout=timeout)
+        with self._lock:
+            # Done callbacks may still be publishing
+            self._published.wait_for(lambda: self._published_count() >= self._index, timeout=timeout)
+            self.manifest["status"] = "complete"
+            self._write_playlist()
+
+    def _write_playlist(self):
+        # Atomic replace so readers never see a half-written playlist
+        tmp_path = self.playlist_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(tmp_path, self.playlist_path)
+
+    def concatenate(self, out_base):
+        """
+        Join the segments into one file without re-encoding (runs in the pool).
+        :param out_base: output path without extension
+        :return: output path, or None if segments should be served as is
+        """
+        if not self.segments: return None
+        files = [s["file"] for s in self.segments]
+        # Stream copy needs one codec and one frame size; a resolution change or a
+        # per-segment mp4v fallback is served as segments instead
+        if len({os.path.splitext(name)[1] for name in files}) > 1 or len({tuple(s["size"]) for s in self.segments}) > 1:
+            print(f"[RECORDER] Segments of {self.clip_id} differ in codec or size, serving them as is")
+            return None
+        return self.pool.submit(concat_segments, self.segments_dir, files, out_base, self.config.FFMPEG_BIN).result()
+
+    def remove(self):
+        shutil.rmtree(self.segments_dir, ignore_errors=True)
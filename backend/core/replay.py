@@ -0,0 +1,336 @@
+import os
+import json
+import time
+import shutil
+import threading
+import subprocess
+import cv2
+import numpy as np
+from backend.config.config import Config
+
+# Replay metadata is NDJSON: line 1 is a header (fps and any other top-level
+# fields), then one JSON object per video frame. Next to it:
+#   <name>.offsets.npy    int64 byte offset of every frame line (random access)
+#   <name>.keyframes.json presentation-order indices of the video's keyframes (fast seeks)
+SPEED_MIN = 0.25
+SPEED_MAX = 16.0
+
+
+def convert_to_ndjson(json_path, ndjson_path):
+    """One-time conversion of a legacy {"fps": .., "frames": [..]} file."""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    frames = data.pop("frames", [])
+    tmp_path = ndjson_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(data) + "\n")
+        for frame in frames:
+            f.write(json.dumps(frame, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, ndjson_path)
+    print(f"[REPLAY] Converted {os.path.basename(json_path)} to NDJSON ({len(frames)} frames)")
+
+
+class FrameMetadata:
+    """
+    Lazy, random-access reader for NDJSON frame metadata. Only the byte offsets
+    are kept in memory (memory-mapped); frames are parsed when requested.
+    """
+    def __init__(self, ndjson_path):
+        self.path = ndjson_path
+        offsets_path = os.path.splitext(ndjson_path)[0] + ".offsets.npy"
+        if not os.path.exists(offsets_path) or os.path.getmtime(offsets_path) < os.path.getmtime(ndjson_path):
+            self._build_offsets(offsets_path)
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        self.file = open(ndjson_path, 'rb')
+        self.header = json.loads(self.file.readline() or b"{}")
+        self._lock = threading.Lock()
+
+    def _build_offsets(self, offsets_path):
+        offsets = []
+        with open(self.path, 'rb') as f:
+            f.readline() # Header
+            pos = f.tell()
+            for line in f:
+                if line.strip():
+                    offsets.append(pos)
+                pos += len(line)
+        np.save(offsets_path, np.asarray(offsets, dtype=np.int64))
+
+    @property
+    def fps(self):
+        return float(self.header.get("fps", 30.0))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def get(self, index):
+        if len(self.offsets) == 0:
+            return {}
+        # Past the end (video longer than data): repeat the last frame
+        index = min(max(index, 0), len(self.offsets) - 1)
+        with self._lock:
+            self.file.seek(int(self.offsets[index]))
+            return json.loads(self.file.readline())
+
+    def close(self):
+        self.file.close()
+
+
+KEYFRAME_INDEX_VERSION = 2 # v1 mapped pts_time * fps, wrong for VFR and non-zero start_time
+
+
+def load_keyframes(video_path, cache_path):
+    """
+    Keyframe frame indices from ffprobe (packet flags, no decoding), cached.
+    A frame's index is its position in presentation order, the same numbering
+    as CAP_PROP_POS_FRAMES, so it holds for VFR video and any stream start_time.
+    :return: sorted list, or None if ffprobe is unavailable
+    """
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(video_path):
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+        if isinstance(cached, dict) and cached.get("version") == KEYFRAME_INDEX_VERSION:
+            return cached["keyframes"]
+
+    ffprobe = shutil.which(Config.FFPROBE_BIN)
+    if not ffprobe:
+        print("[REPLAY] ffprobe not found, seeking without keyframe index")
+        return None
+
+    cmd = [ffprobe, "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts,dts,flags",
+           "-of", "csv=p=0", video_path]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"[REPLAY] ffprobe failed: {result.stderr.strip()}")
+        return None
+
+    # Packets come in decode order; sort by pts to number frames as they are shown
+    packets = []
+    for line in result.stdout.splitlines():
+        parts = line.split(",")
+        if len(parts) < 3: continue
+        pts = parts[0] if parts[0] not in ("", "N/A") else parts[1]
+        if pts in ("", "N/A"): continue
+        packets.append((int(pts), "K" in parts[2]))
+    packets.sort(key=lambda p: p[0])
+    keyframes = [index for index, (_, key) in enumerate(packets) if key] or [0]
+
+    with open(cache_path, 'w') as f:
+        json.dump({"version": KEYFRAME_INDEX_VERSION, "keyframes": keyframes}, f)
+    print(f"[REPLAY] Indexed {len(keyframes)} keyframes in {os.path.basename(video_path)}")
+    return keyframes
+
+
+class ReplayEngine:
+    """
+    Plays a test video with its precomputed metadata, with pause, seek, frame
+    stepping and 0.25x-16x speed. Runs on its own thread; the control methods
+    only post commands and are safe to call from request handlers.
+
+    Above 1x (or when decoding falls behind) playback follows the wall clock and
+    frames in between are skipped: not converted to images or sent, and with a
+    keyframe index large gaps jump to the nearest keyframe instead of decoding
+    every frame in between (grab() still decodes inter frames).
+    """
+    STATE_PLAYING = "playing"
+    STATE_PAUSED = "paused"
+    STATE_ENDED = "ended"
+    STATE_STOPPED = "stopped"
+
+    def __init__(self, video_path, data_path, on_frame):
+        """
+        :param data_path: NDJSON metadata (a legacy .json next to it is converted once)
+        :param on_frame: callable(frame, metadata) for every frame shown
+        """
+        self.video_path = video_path
+        self.on_frame = on_frame
+
+        base = os.path.splitext(data_path)[0]
+        ndjson_path = base + ".ndjson"
+        legacy_path = base + ".json"
+        if os.path.exists(legacy_path) and (not os.path.exists(ndjson_path) or
+                                            os.path.getmtime(ndjson_path) < os.path.getmtime(legacy_path)):
+            convert_to_ndjson(legacy_path, ndjson_path)
+        if not os.path.exists(ndjson_path):
+            raise FileNotFoundError(f"No replay data for {os.path.basename(video_path)}")
+
+        self.metadata = FrameMetadata(ndjson_path)
+        self.fps = self.metadata.fps
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video {video_path}")
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) or len(self.metadata)
+        self.keyframes = load_keyframes(video_path, base + ".keyframes.json")
+
+        self.position = 0 # Index of the next frame to be read
+        self.shown = -1 # Index of the last frame sent
+        self.speed = 1.0
+        self.state = self.STATE_PAUSED
+
+        self._cond = threading.Condition()
+        self._seek_to = None
+        self._step = 0
+        self._clock_origin = None # (wall time, frame index) playback is anchored to
+        self._thread = None
+
+    # --- Control (any thread) ---
+
+    def start(self):
+        self.state = self.STATE_PLAYING
+        self._thread = threading.Thread(target=self._run, name="replay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self.state = self.STATE_STOPPED
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+
+    def pause(self):
+        with self._cond:
+            if self.state == self.STATE_PLAYING:
+                self.state = self.STATE_PAUSED
+            self._cond.notify_all()
+
+    def resume(self):
+        with self._cond:
+            if self.state == self.STATE_ENDED:
+                self._seek_to = 0
+            if self.state in (self.STATE_PAUSED, self.STATE_ENDED):
+                self.state = self.STATE_PLAYING
+                self._clock_origin = None
+            self._cond.notify_all()
+
+    def set_speed(self, speed):
+        with self._cond:
+            self.speed = min(max(float(speed), SPEED_MIN), SPEED_MAX)
+            self._clock_origin = None
+            self._cond.notify_all()
+        return self.speed
+
+    def seek(self, frame_index):
+        with self._cond:
+            self._seek_to = min(max(int(frame_index), 0), max(self.frame_count - 1, 0))
+            if self.state == self.STATE_ENDED:
+                self.state = self.STATE_PAUSED
+            self._cond.notify_all()
+        return self._seek_to
+
+    def step(self, frames=1):
+        """Show the frame `frames` away from the current one (pauses playback)."""
+        with self._cond:
+            if self.state in (self.STATE_PLAYING, self.STATE_ENDED):
+                self.state = self.STATE_PAUSED
+            self._step += int(frames)
+            self._cond.notify_all()
+
+    def status(self):
+        shown = max(self.shown, 0)
+        return {
+            "file": os.path.basename(self.video_path),
+            "state": self.state,
+            "frame": self.shown,
+            "frame_count": self.frame_count,
+            "fps": self.fps,
+            "speed": self.speed,
+            "time_s": shown / self.fps,
+            "duration_s": self.frame_count / self.fps,
+            "keyframe_index": self.keyframes is not None
+        }
+
+    # --- Playback thread ---
+
+    def _seek(self, target):
+        """Position the decoder so the next read returns frame `target`."""
+        if target == self.position:
+            return
+        if self.keyframes is None:
+            # No index: let the backend seek
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            self.position = target
+            return
+        # Jump to the closest keyframe at or before the target, unless decoding
+        # forward from the current position gets there sooner
+        i = int(np.searchsorted(self.keyframes, target, side='right')) - 1
+        keyframe = self.keyframes[max(i, 0)]
+        if target < self.position or keyframe > self.position:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self.position = keyframe
+        while self.position < target and self.cap.grab():
+            self.position += 1
+
+    def _show_next(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return False
+        index = self.position
+        self.position += 1
+        self.shown = index
+
+        meta = dict(self.metadata.get(index))
+        meta["replay_frame"] = index
+        meta["replay_time_s"] = index / self.fps
+        self.on_frame(frame, meta)
+        return True
+
+    def _run(self):
+        print(f"[REPLAY] Playing {os.path.basename(self.video_path)}: {self.frame_count} frames @ {self.fps} fps")
+        try:
+            while True:
+                with self._cond:
+                    while self.state in (self.STATE_PAUSED, self.STATE_ENDED) and self._seek_to is None and self._step == 0:
+                        self._cond.wait()
+                    if self.state == self.STATE_STOPPED:
+                        break
+                    seek_to, self._seek_to = self._seek_to, None
+                    step, self._step = self._step, 0
+                    playing = self.state == self.STATE_PLAYING
+
+                if seek_to is not None:
+                    self._seek(seek_to)
+                    self._clock_origin = None
+                    if not playing:
+                        self._show_next() # Show the frame that was sought to
+                    continue
+
+                if step:
+                    self._seek(max(self.shown + step, 0))
+                    self._show_next()
+                    continue
+
+                # Playing: follow the wall clock at the current speed
+                now = time.perf_counter()
+                if self._clock_origin is None:
+                    self._clock_origin = (now, self.position)
+                origin_time, origin_frame = self._clock_origin
+                due = origin_frame + int((now - origin_time) * self.fps * self.speed)
+                if due > self.position:
+                    # Behind schedule. grab() skips the image conversion but still
+                    # decodes, so with an index _seek() jumps to the keyframe before
+                    # `due` when that is ahead of the current position
+                    if self.keyframes is not None:
+                        self._seek(min(due, max(self.frame_count - 1, 0)))
+                    else:
+                        while self.position < due and self.cap.grab():
+                            self.position += 1
+
+                if not self._show_next():
+                    print("[REPLAY] Video ended.")
+                    with self._cond:
+                        if self.state == self.STATE_PLAYING:
+                            self.state = self.STATE_ENDED
+                    continue
+
+                next_at = origin_time + (self.position - origin_frame) / (self.fps * self.speed)
+                with self._cond:
+                    # Woken early by pause / seek / speed changes
+                    self._cond.wait(timeout=max(0.0, next_at - time.perf_counter()))
+        except Exception as e:
+            print(f"[REPLAY] Error: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            self.cap.release()
+            self.metadata.close()
+            print("[REPLAY] Stopped.")
@@ -0,0 +1,302 @@
+import os
+import glob
+import json
+import time
+import shutil
+import threading
+import multiprocessing
+from backend.config.config import Config
+from backend.core.event_index import EventIndex, save_event, remove_event
+
+# Lower rank is evicted first. Weapon events are always treated as THREAT.
+LEVEL_RANK = {
+    "CALM": 0,
+    "UNUSUAL": 1,
+    "SUSPICIOUS": 2,
+    "THREAT": 3
+}
+
+VIDEO_EXTENSIONS = (".webm", ".mp4")
+
+
+def _path_size(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path) for name in names
+        )
+    return os.path.getsize(path)
+
+
+def _reencode_clips(jobs, scale, nice_level):
+    """
+    Low-priority re-encode of old clips at reduced resolution.
+    Runs in its own process so it never competes with the real-time loop for the GIL.
+    :param jobs: list of (video_path, json_path)
+    """
+    import cv2
+
+    try:
+        os.nice(nice_level)
+    except (AttributeError, OSError):
+        pass # Not supported on this platform
+
+    for vid_path, json_path in jobs:
+        cap = cv2.VideoCapture(vid_path)
+        if not cap.isOpened():
+            print(f"[RETENTION] Could not open {vid_path} for re-encode")
+            continue
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or Config.FPS
+        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) * scale) // 2 * 2
+        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) * scale) // 2 * 2
+        if w <= 0 or h <= 0:
+            cap.release()
+            continue
+
+        root, ext = os.path.splitext(vid_path)
+        tmp_path = f"{root}.reencode{ext}"
+        fourcc = cv2.VideoWriter_fourcc(*('vp80' if ext == ".webm" else 'mp4v'))
+        out = cv2.VideoWriter(tmp_path, fourcc, fps, (w, h))
+        if not out.isOpened():
+            print(f"[RETENTION] Could not open writer for {tmp_path}")
+            cap.release()
+            continue
+
+        while True:
+            ret, frame = cap.read()
+            if not ret: break
+            out.write(cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA))
+
+        out.release()
+        cap.release()
+
+        # Only swap in the smaller file once it is complete
+        os.replace(tmp_path, vid_path)
+
+        try:
+            # Jobs only cover events whose save finished (saved_at), so nothing else writes this file
+            with open(json_path, 'r') as f:
+                metadata = json.load(f)
+            metadata["reencoded"] = {"scale": scale, "timestamp": time.time()}
+            save_event(json_path, metadata)
+        except Exception as e:
+            print(f"[RETENTION] Failed to mark {json_path} as re-encoded: {e}")
+
+        print(f"[RETENTION] Re-encoded {vid_path} at {w}x{h}")
+
+
+class RetentionManager:
+    """
+    Keeps logs/clips and logs/metadata within a byte quota and age limit.
+
+    An event is the metadata JSON plus its video (same filename base), its
+    thumbnail (<clip_id>.jpg) and its live segments (segments/<clip_id>/). Events
+    are always removed as a unit, metadata first, so /api/events never lists an
+    event whose media is gone.
+    """
+    def __init__(self, log_dir=None):
+        self.config = Config
+        log_dir = log_dir or self.config.LOG_DIR
+        self.clips_dir = os.path.join(log_dir, "clips")
+        self.segments_dir = os.path.join(self.clips_dir, "segments")
+        self.meta_dir = os.path.join(log_dir, "metadata")
+        self.learning_dir = os.path.join(log_dir, "learning")
+        self.index = EventIndex(log_dir)
+
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread = None
+        self._reencode_proc = None
+        self._lock = threading.Lock()
+        self.on_evict = None # callable(event, reason), after the event's files are gone
+
+    def start(self):
+        """Start the background sweep thread."""
+        if self._running: return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+
+    def request_sweep(self):
+        """Ask for an immediate sweep, e.g. right after a clip was saved."""
+        self._wakeup.set()
+
+    def _loop(self):
+        while self._running:
+            try:
+                self.enforce()
+            except Exception as e:
+                print(f"[RETENTION] Sweep failed: {e}")
+            self._wakeup.wait(timeout=self.config.RETENTION_SWEEP_INTERVAL_S)
+            self._wakeup.clear()
+
+    def _feedback_ids(self):
+        """Clip IDs that have at least one learning report. These are never evicted."""
+        ids = set()
+        for path in glob.glob(os.path.join(self.learning_dir, "report_*.json")):
+            # report_<clip_id>_<feedback_type>_<ts>.json
+            parts = os.path.basename(path)[len("report_"):].rsplit("_", 2)
+            if len(parts) == 3:
+                ids.add(parts[0])
+        return ids
+
+    def scan(self):
+        """
+        Build the list of events on disk.
+        :return: list of dicts (clip_id, level, timestamp, files, bytes, protected)
+        """
+        feedback_ids = self._feedback_ids()
+        events = []
+        referenced = set()
+
+        # Picks up files changed behind the index's back; only those are parsed
+        self.index.sync()
+        for meta_filename, updated, data in self.index.events():
+            json_path = os.path.join(self.meta_dir, meta_filename)
+            base = os.path.splitext(meta_filename)[0]
+            clip_id = data.get("clip_id")
+
+            files = [json_path]
+            video_path = None
+            for ext in VIDEO_EXTENSIONS:
+                for name in (base, clip_id):
+                    if not name: continue
+                    candidate = os.path.join(self.clips_dir, f"{name}{ext}")
+                    if os.path.exists(candidate):
+                        files.append(candidate)
+                        video_path = video_path or candidate
+            if clip_id:
+                thumb_path = os.path.join(self.clips_dir, f"{clip_id}.jpg")
+                if os.path.exists(thumb_path):
+                    files.append(thumb_path)
+                seg_dir = os.path.join(self.segments_dir, clip_id)
+                if os.path.isdir(seg_dir):
+                    files.append(seg_dir)
+
+            referenced.update(files)
+
+            level = data.get("final_level", "CALM")
+            rank = LEVEL_RANK.get(level, 0)
+            if data.get("weapon_detected"):
+                rank = LEVEL_RANK["THREAT"]
+
+            timestamp = data.get("timestamp", updated)
+            # Events still being recorded or saved (summary pending) are untouchable;
+            # stale ones are from a crash. Events from before saved_at count as saved.
+            now = time.time()
+            in_progress = (data.get("status") == "recording" and now - timestamp < 2 * self.config.CLIP_MAX_DURATION_S) or \
+                (data.get("status") == "complete" and not data.get("saved_at") and
+                 now - updated < self.config.RETENTION_ORPHAN_GRACE_S)
+
+            events.append({
+                "clip_id": clip_id,
+                "level": level,
+                "rank": rank,
+                "timestamp": timestamp,
+                "json_path": json_path,
+                "video_path": video_path,
+                "files": files,
+                "bytes": sum(_path_size(p) for p in files),
+                "protected": clip_id in feedback_ids or in_progress,
+                "reencoded": bool(data.get("reencoded")),
+                "saved": bool(data.get("saved_at"))
+            })
+
+        return events, referenced
+
+    def _orphans(self, referenced):
+        """Media files not referenced by any metadata, e.g. from a crash mid-eviction."""
+        orphans = []
+        grace = self.config.RETENTION_ORPHAN_GRACE_S
+        now = time.time()
+        paths = glob.glob(os.path.join(self.clips_dir, "*")) + glob.glob(os.path.join(self.segments_dir, "*"))
+        for path in paths:
+            if path in referenced or path == self.segments_dir: continue
+            # Saves write the video before the JSON, so leave recent files alone
+            if now - os.path.getmtime(path) > grace:
+                orphans.append(path)
+        return orphans
+
+    def _evict(self, event, reason):
+        print(f"[RETENTION] Evicting {os.path.basename(event['json_path'])} ({event['level']}, {reason})")
+        # Metadata first: the event disappears from the index before its media does
+        remove_event(event["json_path"])
+        for path in event["files"][1:]:
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[RETENTION] Failed to remove {path}: {e}")
+        if self.on_evict:
+            self.on_evict(event, reason)
+
+    def enforce(self):
+        """Run one sweep: orphans, age limit, byte quota, then schedule re-encodes."""
+        with self._lock:
+            events, referenced = self.scan()
+
+            for path in self._orphans(referenced):
+                print(f"[RETENTION] Removing orphan {path}")
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+            now = time.time()
+            max_age = self.config.RETENTION_MAX_AGE_DAYS * 86400 if self.config.RETENTION_MAX_AGE_DAYS else None
+
+            kept = []
+            for event in events:
+                if max_age and not event["protected"] and now - event["timestamp"] > max_age:
+                    self._evict(event, "age")
+                else:
+                    kept.append(event)
+
+            # Quota: lowest level first, oldest first within a level
+            total = sum(e["bytes"] for e in kept)
+            if self.config.RETENTION_MAX_BYTES and total > self.config.RETENTION_MAX_BYTES:
+                candidates = sorted(
+                    (e for e in kept if not e["protected"]),
+                    key=lambda e: (e["rank"], e["timestamp"])
+                )
+                for event in candidates:
+                    if total <= self.config.RETENTION_MAX_BYTES: break
+                    self._evict(event, "quota")
+                    total -= event["bytes"]
+                    kept.remove(event)
+
+                if total > self.config.RETENTION_MAX_BYTES:
+                    print(f"[RETENTION] Warning: {total} bytes still used, remaining events have feedback")
+
+            self._schedule_reencode(kept, now)
+
+    def _schedule_reencode(self, events, now):
+        after_days = self.config.RETENTION_REENCODE_AFTER_DAYS
+        if not after_days: return
+        if self._reencode_proc is not None and self._reencode_proc.is_alive(): return
+
+        jobs = [
+            (e["video_path"], e["json_path"]) for e in events
+            if e["video_path"] and e["saved"] and not e["reencoded"] and now - e["timestamp"] > after_days * 86400
+        ]
+        if not jobs: return
+
+        print(f"[RETENTION] Re-encoding {len(jobs)} old clips in background")
+        self._reencode_proc = multiprocessing.Process(
+            target=_reencode_clips,
+            args=(jobs, self.config.RETENTION_REENCODE_SCALE, self.config.RETENTION_REENCODE_NICE),
+            daemon=True
+        )
+        self._reencode_proc.start()
@@ -95,7 +95,7 @@ class SignalProcessor:
         :param landmarks_xy: np.array of shape (N, 2)
         :param current_time: float (timestamp)
         :param movinet_probs: np.array [p0, p1]
-        :param weapon_detections: list of dicts
+        :param weapon_detections: detection records (weapon.DETECTION_DTYPE)
         """
         if movinet_probs is None: movinet_probs = np.array([0.0, 0.0])
         if weapon_detections is None: weapon_detections = []
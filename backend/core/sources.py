@@ -0,0 +1,573 @@
+import os
+import re
+import time
+import glob
+import queue
+import threading
+import urllib.request
+from urllib.parse import urlparse
+import cv2
+import numpy as np
+from backend.config.config import Config
+from backend.core.metrics import metrics
+
+STATE_IDLE = "idle"
+STATE_CONNECTING = "connecting"
+STATE_STREAMING = "streaming"
+STATE_RECONNECTING = "reconnecting"
+STATE_ENDED = "ended"
+
+# cv2.imread / imdecode flags that let libjpeg decode straight to 1/n size
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+CONTENT_LENGTH = re.compile(rb"content-length:[ \t]*(\d+)", re.IGNORECASE)
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".webm", ".m3u8")
+
+
+class FrameSource:
+    """
+    Decodes frames on its own thread so the pipeline loop never waits on the
+    network or the decoder.
+
+    Live sources (cameras, streams) keep only the latest frame: if the pipeline
+    falls behind, older frames are dropped and counted. Files and image
+    directories decode ahead into a small bounded queue and never drop, so a
+    replayed clip is processed frame by frame as before.
+
+    Live sources reconnect with exponential backoff when the stream fails or
+    stalls; files end. Actual FPS, decode latency, drops and reconnects are
+    published as <metrics_prefix>.* metrics (stats()).
+
+    Subclasses implement _open(), _decode() and _close().
+    """
+    live = True
+
+    def __init__(self, name, decode_scale=None, metrics_prefix="source"):
+        self.name = name
+        self.decode_scale = int(decode_scale or Config.SOURCE_DECODE_SCALE)
+        if self.decode_scale not in REDUCED_FLAGS:
+            raise ValueError(f"decode_scale must be one of {sorted(REDUCED_FLAGS)}")
+        self.metrics_prefix = metrics_prefix
+        self.state = STATE_IDLE
+        self.last_error = None
+
+        self._cond = threading.Condition()
+        self._latest = None # Live: newest frame not yet read
+        self._queue = None if self.live else queue.Queue(maxsize=Config.SOURCE_FILE_QUEUE)
+        self._ended = False
+        self._running = False
+        self._thread = None
+
+        # Stats
+        self.frames = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.fps = 0.0
+        self.decode_ms = 0.0 # EMA
+        self.size = None # (width, height) of delivered frames
+        self._fps_start = None
+        self._fps_frames = 0
+        self._metrics_at = 0.0
+
+    # --- Subclass interface ---
+
+    def _open(self):
+        """Open / connect. :return: False on failure"""
+        raise NotImplementedError
+
+    def _decode(self):
+        """:return: next BGR frame, or None at end of stream / when the connection dropped"""
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def _reduce(self, frame):
+        """Downscale a frame the decoder could not reduce itself."""
+        if self.decode_scale == 1:
+            return frame
+        h, w = frame.shape[:2]
+        target = (w // self.decode_scale, h // self.decode_scale)
+        if getattr(self, "_native_reduced", None) == (w, h):
+            return frame # Already delivered at the reduced size (e.g. webcam mode)
+        return cv2.resize(frame, target, interpolation=cv2.INTER_AREA)
+
+    # --- Consumer side ---
+
+    def start(self):
+        """
+        Start decoding. Files are opened here so a missing file fails fast;
+        live sources keep trying to connect in the background.
+        :return: False if a file source could not be opened
+        """
+        self._running = True
+        self.state = STATE_CONNECTING
+        opened = False
+        if not self.live:
+            opened = self._try_open()
+            if not opened:
+                self.state = STATE_ENDED
+                self._running = False
+                return False
+        self._thread = threading.Thread(target=self._run, args=(opened,), name=f"source-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def read(self, timeout=0.5):
+        """:return: the next frame, or None if none arrived within timeout (see ended)"""
+        if not self.live:
+            try:
+                return self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return None
+        with self._cond:
+            if self._latest is None and not self._ended:
+                self._cond.wait(timeout)
+            frame, self._latest = self._latest, None
+        return frame
+
+    @property
+    def ended(self):
+        """True once the source finished and every decoded frame was read."""
+        if not self._ended:
+            return False
+        return self._queue is None or self._queue.empty()
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+            if self._thread.is_alive():
+                return # Stuck in a read: it closes the source itself when that returns
+        self._close()
+
+    def stats(self):
+        """decode_ms is the time per _decode() call: for network sources it includes waiting for the frame."""
+        return {
+            "type": type(self).__name__,
+            "state": self.state,
+            "fps": round(self.fps, 2),
+            "decode_ms": round(self.decode_ms, 2),
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "decode_scale": self.decode_scale,
+            "size": self.size,
+            "last_error": self.last_error
+        }
+
+    # --- Decode thread ---
+
+    def _try_open(self):
+        try:
+            if self._open():
+                return True
+        except Exception as e:
+            self.last_error = str(e)
+        return False
+
+    def _run(self, opened):
+        backoff = Config.SOURCE_RECONNECT_BACKOFF_S
+        connected_at = time.time() if opened else None
+        while self._running:
+            if not opened:
+                opened = self._try_open()
+                if not opened:
+                    if not self.live:
+                        break
+                    print(f"[SOURCE] {self.name}: could not connect ({self.last_error or 'open failed'}), retrying in {backoff:.0f}s")
+                    self._set_state(STATE_RECONNECTING)
+                    self._sleep(backoff)
+                    backoff = min(backoff * 2, Config.SOURCE_RECONNECT_BACKOFF_MAX_S)
+                    continue
+                connected_at = time.time()
+            self._set_state(STATE_STREAMING)
+
+            t0 = time.perf_counter()
+            try:
+                frame = self._decode()
+            except Exception as e:
+                self.last_error = str(e)
+                frame = None
+            if frame is None:
+                self._close()
+                opened = False
+                if not self.live:
+                    break
+                # Stayed up for a while: the next failure starts from the short backoff again
+                if time.time() - connected_at > Config.SOURCE_RECONNECT_BACKOFF_MAX_S:
+                    backoff = Config.SOURCE_RECONNECT_BACKOFF_S
+                self.reconnects += 1
+                print(f"[SOURCE] {self.name}: stream lost ({self.last_error or 'no frame'}), reconnecting in {backoff:.0f}s")
+                self._set_state(STATE_RECONNECTING)
+                self._sleep(backoff)
+                backoff = min(backoff * 2, Config.SOURCE_RECONNECT_BACKOFF_MAX_S)
+                continue
+
+            self._record((time.perf_counter() - t0) * 1000.0, frame)
+            self._deliver(frame)
+
+        self._close()
+        self._set_state(STATE_ENDED)
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+
+    def _deliver(self, frame):
+        if not self.live:
+            while self._running: # Blocks: files are never dropped
+                try:
+                    self._queue.put(frame, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+            return
+        with self._cond:
+            if self._latest is not None:
+                self.dropped += 1
+            self._latest = frame
+            self._cond.notify()
+
+    def _sleep(self, seconds):
+        with self._cond:
+            self._cond.wait_for(lambda: not self._running, timeout=seconds)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            metrics.set(f"{self.metrics_prefix}.state", state)
+
+    def _record(self, decode_ms, frame):
+        now = time.perf_counter()
+        self.frames += 1
+        self.decode_ms = decode_ms if self.frames == 1 else 0.1 * decode_ms + 0.9 * self.decode_ms
+        self.size = (frame.shape[1], frame.shape[0])
+        if self._fps_start is None:
+            self._fps_start = now
+        self._fps_frames += 1
+        if now - self._fps_start >= 1.0:
+            self.fps = self._fps_frames / (now - self._fps_start)
+            self._fps_start, self._fps_frames = now, 0
+        if now - self._metrics_at >= Config.SOURCE_METRICS_INTERVAL_S:
+            self._metrics_at = now
+            metrics.update({f"{self.metrics_prefix}.{key}": value for key, value in self.stats().items()})
+
+
+class CaptureSource(FrameSource):
+    """cv2.VideoCapture on a device, file or stream URL."""
+    def __init__(self, source, name=None, api=cv2.CAP_ANY, **kwargs):
+        super().__init__(name or str(source), **kwargs)
+        self.source = source
+        self.api = api
+        self.cap = None
+        self._native_reduced = None
+
+    def _params(self):
+        return []
+
+    def _open(self):
+        params = self._params()
+        self.cap = cv2.VideoCapture(self.source, self.api, params) if params else cv2.VideoCapture(self.source, self.api)
+        if not self.cap.isOpened():
+            self.last_error = "could not open"
+            self.cap.release()
+            self.cap = None
+            return False
+        return True
+
+    def _decode(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        return self._reduce(frame)
+
+    def _close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class WebcamSource(CaptureSource):
+    """Local camera by index or /dev/video path."""
+    def _open(self):
+        if not super()._open():
+            return False
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if self.decode_scale > 1:
+            # Ask the driver for a smaller mode; _reduce() resizes if it ignores us
+            w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) // self.decode_scale
+            h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) // self.decode_scale
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+            if (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))) == (w, h):
+                self._native_reduced = (w, h)
+        return True
+
+
+class StreamSource(CaptureSource):
+    """
+    RTSP / RTMP / HTTP video through FFmpeg, with hardware decoding when OpenCV
+    supports it and open / read timeouts so a dead camera is reconnected.
+    """
+    def __init__(self, url, name=None, **kwargs):
+        super().__init__(url, name=name or urlparse(url).hostname or url, api=cv2.CAP_FFMPEG, **kwargs)
+        if url.startswith("rtsp") and "OPENCV_FFMPEG_CAPTURE_OPTIONS" not in os.environ:
+            # Read by OpenCV when the capture opens; TCP avoids smeared frames on lossy Wi-Fi
+            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = f"rtsp_transport;{Config.SOURCE_RTSP_TRANSPORT}"
+
+    def _params(self):
+        params = []
+        if Config.SOURCE_HW_DECODE and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        if hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+            params += [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(Config.SOURCE_OPEN_TIMEOUT_S * 1000),
+                       cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(Config.SOURCE_READ_TIMEOUT_S * 1000)]
+        return params
+
+    def _open(self):
+        if not super()._open():
+            return False
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return True
+
+
+class VideoFileSource(CaptureSource):
+    """Local video file, decoded ahead; ends at the last frame."""
+    live = False
+
+    def __init__(self, path, name=None, **kwargs):
+        super().__init__(path, name=name or os.path.basename(path), **kwargs)
+
+
+class ImageDirectorySource(FrameSource):
+    """Images in a directory, in name order. JPEGs are decoded at reduced size directly."""
+    live = False
+
+    def __init__(self, path, name=None, **kwargs):
+        super().__init__(name or os.path.basename(os.path.normpath(path)), **kwargs)
+        self.path = path
+        self.files = []
+        self.index = 0
+
+    def _open(self):
+        self.files = sorted(f for f in glob.glob(os.path.join(self.path, "*")) if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.index = 0
+        if not self.files:
+            self.last_error = f"no images in {self.path}"
+        return bool(self.files)
+
+    def _decode(self):
+        while self.index < len(self.files):
+            path = self.files[self.index]
+            self.index += 1
+            frame = cv2.imread(path, REDUCED_FLAGS[self.decode_scale])
+            if frame is not None:
+                return frame
+            print(f"[SOURCE] {self.name}: could not read {path}, skipped")
+        return None
+
+
+class MjpegSource(FrameSource):
+    """
+    HTTP MJPEG (multipart/x-mixed-replace), as served by most IP doorbells'
+    snapshot streams. Each part is cut by its Content-Length header; only parts
+    without one are split on the SOI / EOI markers (an embedded EXIF thumbnail
+    has its own EOI). JPEGs are decoded with IMREAD_REDUCED_* when
+    decode_scale > 1, which skips most of the IDCT work rather than resizing
+    afterwards.
+    """
+    CHUNK = 64 * 1024
+    HEADER_MAX = 1024 # Bytes kept while waiting for a part's image to start
+    MAX_JPEG_BYTES = 16 * 1024 * 1024 # Larger Content-Length values are ignored
+
+    def __init__(self, url, name=None, **kwargs):
+        super().__init__(name or urlparse(url).hostname or url, **kwargs)
+        self.url = url
+        self.stream = None
+        self.buffer = bytearray()
+
+    def _open(self):
+        # The timeout also applies to every read: a stalled stream raises and is reconnected
+        self.stream = urllib.request.urlopen(self.url, timeout=Config.SOURCE_READ_TIMEOUT_S)
+        self.buffer = bytearray()
+        return True
+
+    def _take_jpeg(self):
+        """Cut the next complete JPEG out of the buffer, None if more data is needed."""
+        start = self.buffer.find(b"\xff\xd8")
+        if start < 0:
+            # Keep the tail: it may hold this part's headers
+            if len(self.buffer) > self.HEADER_MAX:
+                del self.buffer[:-self.HEADER_MAX]
+            return None
+
+        # The last Content-Length before the image belongs to its part
+        length = None
+        for match in CONTENT_LENGTH.finditer(self.buffer, 0, start):
+            length = int(match.group(1))
+        if length and length <= self.MAX_JPEG_BYTES:
+            if len(self.buffer) < start + length:
+                return None
+            jpg = bytes(self.buffer[start:start + length])
+            del self.buffer[:start + length]
+            return jpg
+
+        # No length: fall back to the first EOI after the SOI
+        end = self.buffer.find(b"\xff\xd9", start + 2)
+        if end < 0:
+            del self.buffer[:start] # Drop multipart headers before the image
+            return None
+        jpg = bytes(self.buffer[start:end + 2])
+        del self.buffer[:end + 2]
+        return jpg
+
+    def _next_jpeg(self):
+        while True:
+            jpg = self._take_jpeg()
+            if jpg is not None:
+                return jpg
+            chunk = self.stream.read1(self.CHUNK) if hasattr(self.stream, "read1") else self.stream.read(self.CHUNK)
+            if not chunk:
+                return None
+            self.buffer += chunk
+
+    def _decode(self):
+        while self._running:
+            jpg = self._next_jpeg()
+            if jpg is None:
+                return None
+            frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), REDUCED_FLAGS[self.decode_scale])
+            if frame is not None:
+                return frame
+            self.last_error = "corrupt JPEG" # Skip it, keep the connection
+        return None
+
+    def _close(self):
+        if self.stream is not None:
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generated frames at a fixed rate (a box moving over a gradient, with a
+    frame counter), for running the pipeline and benchmarks without a camera.
+    """
+    def __init__(self, name="synthetic", size=(640, 480), fps=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.width, self.height = int(size[0]) // self.decode_scale, int(size[1]) // self.decode_scale
+        self.interval = 1.0 / (fps or Config.FPS)
+        self.index = 0
+        self.next_at = 0.0
+        self.background = None
+
+    def _open(self):
+        ramp = np.linspace(40, 200, self.width, dtype=np.uint8)
+        self.background = np.dstack([np.tile(ramp, (self.height, 1))] * 3)
+        self.next_at = time.perf_counter()
+        return True
+
+    def _decode(self):
+        delay = self.next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_at = max(self.next_at + self.interval, time.perf_counter())
+
+        frame = self.background.copy()
+        box = max(self.height // 4, 8)
+        x = int((self.index * 4) % max(self.width - box, 1))
+        y = int((self.height - box) / 2 * (1 + np.sin(self.index / 15.0)))
+        cv2.rectangle(frame, (x, y), (x + box, y + box), (0, 0, 255), -1)
+        cv2.putText(frame, str(self.index), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        self.index += 1
+        return frame
+
+
+SOURCE_TYPES = {
+    "webcam": WebcamSource,
+    "stream": StreamSource,
+    "rtsp": StreamSource,
+    "file": VideoFileSource,
+    "images": ImageDirectorySource,
+    "mjpeg": MjpegSource,
+    "synthetic": SyntheticSource
+}
+
+
+def _parse_synthetic(url):
+    """synthetic://640x480@15 -> {"size": (640, 480), "fps": 15}"""
+    options = {}
+    spec = url.split("://", 1)[1] if "://" in url else ""
+    if "@" in spec:
+        spec, fps = spec.split("@", 1)
+        options["fps"] = float(fps)
+    if "x" in spec:
+        w, h = spec.split("x", 1)
+        options["size"] = (int(w), int(h))
+    return options
+
+
+def source_type(source):
+    """Source type name for a device index, path or URL."""
+    if isinstance(source, int) or (isinstance(source, str) and (source.isdigit() or source.startswith("/dev/video"))):
+        return "webcam"
+    lower = source.lower()
+    if lower.startswith("synthetic"):
+        return "synthetic"
+    if lower.startswith(("rtsp://", "rtsps://", "rtmp://")):
+        return "stream"
+    if lower.startswith(("http://", "https://")):
+        # Anything that is not a video file / playlist is taken to be MJPEG
+        return "stream" if urlparse(lower).path.endswith(VIDEO_EXTENSIONS) else "mjpeg"
+    if os.path.isdir(source):
+        return "images"
+    return "file"
+
+
+def create_source(source, metrics_prefix="source"):
+    """
+    FrameSource for a Pipeline input: a device index, file, image directory,
+    rtsp:// or http:// URL, "synthetic[://WxH@fps]", or a dict with "url" (or
+    "type") plus constructor options such as decode_scale.
+    """
+    if isinstance(source, FrameSource):
+        return source
+    options = {}
+    if isinstance(source, dict):
+        options = dict(source)
+        kind = options.pop("type", None)
+        source = options.pop("url", 0)
+        kind = kind or source_type(source)
+    else:
+        kind = source_type(source)
+    options["metrics_prefix"] = metrics_prefix
+
+    cls = SOURCE_TYPES[kind]
+    if cls is SyntheticSource:
+        if isinstance(source, str):
+            options = dict(_parse_synthetic(source), **options)
+        return cls(**options)
+    if cls is WebcamSource and isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cls(source, **options)
+
+
+def is_live(source):
+    """True if create_source(source) would be a live source (it reconnects, never ends on its own)."""
+    if isinstance(source, FrameSource):
+        return source.live
+    if isinstance(source, dict):
+        kind = source.get("type") or source_type(source.get("url", 0))
+    else:
+        kind = source_type(source)
+    return SOURCE_TYPES[kind].live
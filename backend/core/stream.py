@@ -0,0 +1,209 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from backend.config.config import Config
+from backend.core.metrics import metrics
+
+try:
+    import simplejpeg # libjpeg-turbo bindings, noticeably faster than cv2.imencode
+except ImportError:
+    simplejpeg = None
+
+TIER_META = "meta" # Metadata only, never encoded
+TIER_EVENTS = "events" # Event updates only: no frames, no per-frame metadata
+
+
+def encode_jpeg(frame, quality):
+    """BGR frame -> JPEG bytes (None on failure). Both backends release the GIL."""
+    backend = Config.STREAM_JPEG_BACKEND
+    if simplejpeg is not None and backend in ("auto", "simplejpeg"):
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(frame), quality=quality, colorspace='BGR')
+    ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buffer.tobytes() if ret else None
+
+
+class StreamEncoder:
+    """
+    Encodes live frames into the stream tiers that currently have subscribers.
+
+    Each tier is encoded at most once per frame regardless of how many clients use
+    it, and not at all when nobody is watching. Tiers with an FPS cap are only
+    re-encoded when due, and frames that did not visibly change are not re-encoded:
+    the previous JPEG (same image_id) is reused and clients that already have it
+    get metadata only.
+
+    plan() and commit() are cheap and locked; encode_tier() is the expensive part
+    and may run on several threads at once (see StreamEncodeStage).
+    """
+    def __init__(self, tiers=None, name="stream"):
+        self.tiers = tiers or Config.STREAM_TIERS
+        self.name = name # Metrics prefix, e.g. cameras.<id>.stream
+        self.latest = {} # tier -> (image_id, jpg_bytes)
+        self.last_encoded_at = {} # tier -> time
+        self.next_image_id = 1
+        self.prev_signature = None
+        self.last_forced_at = 0.0
+        self._lock = threading.Lock()
+
+    def _signature(self, frame):
+        """Tiny grayscale thumbnail used to detect unchanged frames."""
+        small = cv2.resize(frame, Config.STREAM_CHANGE_GRID, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def _changed(self, frame, now):
+        signature = self._signature(frame)
+        prev, self.prev_signature = self.prev_signature, signature
+        if prev is None or prev.shape != signature.shape:
+            return True
+        # Periodic refresh so slow drifts (lighting) still reach the clients
+        if now - self.last_forced_at > Config.STREAM_REFRESH_S:
+            self.last_forced_at = now
+            return True
+        return float(np.mean(np.abs(signature - prev))) > Config.STREAM_CHANGE_THRESH
+
+    def plan(self, frame, tiers):
+        """
+        Decide which tiers need a new JPEG for this frame and reserve their image ids.
+        Must be called in frame order.
+        :return: (wanted tiers, [(tier, image_id), ...] to encode)
+        """
+        now = time.time()
+        with self._lock:
+            wanted = [t for t in tiers if t in self.tiers]
+            changed = self._changed(frame, now) if wanted else False
+            if not changed:
+                metrics.inc(f"{self.name}.unchanged_frames")
+
+            jobs = []
+            for tier in wanted:
+                if tier in self.latest and not changed:
+                    continue
+                max_fps = self.tiers[tier].get("fps")
+                if max_fps and tier in self.latest and now - self.last_encoded_at.get(tier, 0.0) < 1.0 / max_fps:
+                    continue
+                jobs.append((tier, self.next_image_id))
+                self.next_image_id += 1
+                self.last_encoded_at[tier] = now
+
+            # Drop tiers nobody watches any more
+            for tier in list(self.latest):
+                if tier not in wanted:
+                    del self.latest[tier]
+        return wanted, jobs
+
+    def encode_tier(self, frame, tier):
+        spec = self.tiers[tier]
+        t0 = time.perf_counter()
+        height = spec.get("height")
+        h, w = frame.shape[:2]
+        if height and height < h:
+            width = int(round(w * height / h)) // 2 * 2
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        jpg = encode_jpeg(frame, spec.get("quality", 60))
+        metrics.observe(f"{self.name}.encode_ms.{tier}", (time.perf_counter() - t0) * 1000.0)
+        return jpg
+
+    def commit(self, wanted, results):
+        """
+        Store freshly encoded images. An image never replaces a newer one, so a
+        frame that finishes late cannot roll a tier back.
+        :param results: [(tier, image_id, jpg_bytes or None), ...]
+        :return: {tier: (image_id, jpg_bytes)} for every wanted tier that has an image
+        """
+        with self._lock:
+            for tier, image_id, jpg in results:
+                if jpg is None: continue
+                current = self.latest.get(tier)
+                if tier in wanted and (current is None or current[0] < image_id):
+                    self.latest[tier] = (image_id, jpg)
+            return {t: self.latest[t] for t in wanted if t in self.latest}
+
+    def encode(self, frame, tiers):
+        """Synchronous plan + encode + commit."""
+        wanted, jobs = self.plan(frame, tiers)
+        results = [(tier, image_id, self.encode_tier(frame, tier)) for tier, image_id in jobs]
+        return self.commit(wanted, results)
+
+
+class StreamEncodeStage:
+    """
+    Takes annotated frames off the real-time loop and encodes them on a small
+    thread pool (JPEG encoding releases the GIL).
+
+    submit() only stores a reference in a single slot: if the encoders fall
+    behind, intermediate frames are replaced rather than queued. Frames are
+    planned in order and a result is only published if it is newer than the
+    last one published, so output never goes backwards.
+    """
+    def __init__(self, encoder, on_output, workers=None):
+        self.encoder = encoder
+        self.name = encoder.name
+        self.on_output = on_output # (images, metadata) -> None, called from a worker thread
+        self.workers = workers or Config.STREAM_ENCODER_THREADS
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stream-encode")
+
+        self._cond = threading.Condition()
+        self._slot = None # (frame, metadata, tiers, submit time)
+        self._in_flight = 0
+        self._seq = 0
+        self._published_seq = 0
+        self._running = True
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="stream-dispatch", daemon=True)
+        self._dispatcher.start()
+        metrics.set(f"{self.name}.encoder_threads", self.workers)
+        metrics.set("stream.jpeg_backend", "simplejpeg" if simplejpeg is not None and Config.STREAM_JPEG_BACKEND != "opencv" else "opencv")
+
+    def submit(self, frame, metadata, tiers):
+        """Hand off a frame. The caller must not modify the frame afterwards."""
+        with self._cond:
+            if self._slot is not None:
+                metrics.inc(f"{self.name}.dropped_frames")
+            self._slot = (frame, metadata, tiers, time.perf_counter())
+            self._cond.notify()
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while self._running and (self._slot is None or self._in_flight >= self.workers):
+                    self._cond.wait()
+                if not self._running:
+                    return
+                frame, metadata, tiers, submitted = self._slot
+                self._slot = None
+                self._in_flight += 1
+                self._seq += 1
+                seq = self._seq
+
+            # Planning stays on this single thread so change detection sees frames in order
+            wanted, jobs = self.encoder.plan(frame, tiers)
+            self.executor.submit(self._encode, seq, frame, metadata, wanted, jobs, submitted)
+
+    def _encode(self, seq, frame, metadata, wanted, jobs, submitted):
+        try:
+            results = [(tier, image_id, self.encoder.encode_tier(frame, tier)) for tier, image_id in jobs]
+            images = self.encoder.commit(wanted, results)
+            with self._cond:
+                stale = seq <= self._published_seq
+                if not stale:
+                    self._published_seq = seq
+            if stale:
+                metrics.inc(f"{self.name}.stale_frames")
+            else:
+                metrics.observe(f"{self.name}.stage_ms", (time.perf_counter() - submitted) * 1000.0)
+                self.on_output(images, metadata)
+        except Exception as e:
+            print(f"[STREAM] Encode failed: {e}")
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._slot = None
+            self._cond.notify_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -18,27 +18,37 @@ class ClipSummarizer:
                 print(f"[SUMMARIZER] Failed to initialize client: {e}")
                 self.client = None
 
+    def _upload(self, path):
+        print(f"[SUMMARIZER] Uploading {path}...")
+        media_file = self.client.files.upload(file=path)
+
+        # Wait for processing
+        while media_file.state.name == "PROCESSING":
+            print("[SUMMARIZER] Waiting for video processing...")
+            time.sleep(2)
+            media_file = self.client.files.get(name=media_file.name)
+
+        if media_file.state.name == "FAILED":
+            print(f"[SUMMARIZER] Processing of {path} failed.")
+            return None
+        return media_file
+
     def summarize(self, video_path, metadata):
         """
-        Uploads video and generates summary using Gemini 1.5 Flash.
+        Uploads the footage and generates a summary with Gemini.
+        :param video_path: one video, or a list of files in order (segments of an
+                           event that was not joined, or a thumbnail)
         Returns the summary text or None if failed.
         """
         if not self.client:
             return None
+        paths = [video_path] if isinstance(video_path, str) else list(video_path)
+        if not paths:
+            return None
 
         try:
-            print(f"[SUMMARIZER] Uploading {video_path}...")
-            # Upload file
-            video_file = self.client.files.upload(file=video_path)
-            
-            # Wait for processing
-            while video_file.state.name == "PROCESSING":
-                print("[SUMMARIZER] Waiting for video processing...")
-                time.sleep(2)
-                video_file = self.client.files.get(name=video_file.name)
-                
-            if video_file.state.name == "FAILED":
-                print("[SUMMARIZER] Video processing failed.")
+            media_files = [self._upload(path) for path in paths]
+            if any(f is None for f in media_files):
                 return None
                 
             print(f"[SUMMARIZER] Generating summary context...")
@@ -49,8 +59,9 @@ class ClipSummarizer:
             weapon = metadata.get("weapon_detected", False)
             trigger = metadata.get("trigger_level", "Unknown")
             
+            parts = f" It is given as {len(paths)} consecutive parts." if len(paths) > 1 else ""
             prompt = f"""
-            Analyze this security camera footage. 
+            Analyze this security camera footage.{parts}
             Context:
             - Trigger Event: {trigger}
             - Max Intent Score: {max_intent:.2f} (Scale 0-1)
@@ -70,7 +81,7 @@ class ClipSummarizer:
             response = self.client.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=[
-                    video_file,
+                    *media_files,
                     prompt
                 ]
             )
@@ -0,0 +1,165 @@
+import time
+import cv2
+import numpy as np
+from backend.config.config import Config
+from backend.core.detections import DETECTION_DTYPE
+
+# Detector records plus the track they belong to
+TRACK_DTYPE = np.dtype(DETECTION_DTYPE.descr + [
+    ('track_id', '<i4'),
+    ('tracked', '?') # False on frames the detector itself produced
+])
+
+
+def iou(a, b):
+    """IoU of two [x, y, w, h] boxes."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id, box, score, class_id, now):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=np.float32) # [x, y, w, h] in frame pixels
+        self.score = float(score)
+        self.class_id = int(class_id)
+        self.last_detected = now
+
+
+class WeaponTracker:
+    """
+    Carries weapon boxes between detector results with sparse optical flow, so
+    boxes stay on a moving person while YOLO runs at a fraction of the frame
+    rate (WEAPON_DETECT_INTERVAL).
+
+    Fresh detections are matched to tracks by IoU and class (keeping track ids);
+    a track the detector no longer reports is dropped. Between detections every
+    track is moved by the median Lucas-Kanade flow of points inside its box and
+    its score decays by WEAPON_TRACK_DECAY per frame; if the flow is lost the
+    track holds its last box. Tracks are dropped when the score falls below
+    WEAPON_TRACK_MIN_SCORE or no detection confirmed them for
+    WEAPON_TRACK_MAX_AGE_S.
+
+    Output uses the detector's records (DETECTION_DTYPE) plus track_id and
+    tracked, so the debounce in SignalProcessor sees a present weapon on every
+    frame in between, as it did with reused results.
+    """
+    def __init__(self):
+        self.tracks = []
+        self.next_id = 1
+        self.prev_gray = None
+        self.scale = Config.WEAPON_TRACK_SCALE
+        self.lk_params = dict(winSize=(15, 15), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+    def reset(self):
+        self.tracks = []
+        self.prev_gray = None
+
+    def _gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def update(self, frame, detections=None, now=None):
+        """
+        :param detections: new detector output for this frame, or None if the
+                           detector has not produced a new result
+        :return: TRACK_DTYPE array for this frame
+        """
+        now = now or time.time()
+        gray = self._gray(frame) if self.tracks or (detections is not None and len(detections)) else None
+
+        if detections is not None:
+            self._match(detections, now)
+            tracked = False
+        else:
+            if self.tracks and self.prev_gray is not None:
+                self._propagate(self.prev_gray, gray, now)
+            tracked = True
+
+        self.prev_gray = gray
+        result = np.empty(len(self.tracks), dtype=TRACK_DTYPE)
+        for i, t in enumerate(self.tracks):
+            result[i] = (t.box.astype(np.int32), t.score, t.class_id, t.id, tracked)
+        return result
+
+    def _match(self, detections, now):
+        """Greedy IoU matching; unmatched detections start new tracks."""
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for di, det in enumerate(detections):
+                if det["class_id"] == track.class_id:
+                    overlap = iou(track.box, det["box"])
+                    if overlap >= Config.WEAPON_TRACK_IOU:
+                        pairs.append((overlap, ti, di))
+        pairs.sort(reverse=True)
+
+        matched_tracks, matched_dets = set(), set()
+        tracks = []
+        for _, ti, di in pairs:
+            if ti in matched_tracks or di in matched_dets: continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            track, det = self.tracks[ti], detections[di]
+            track.box = np.asarray(det["box"], dtype=np.float32)
+            track.score = float(det["score"])
+            track.last_detected = now
+            tracks.append(track)
+        for di, det in enumerate(detections):
+            if di not in matched_dets:
+                tracks.append(Track(self.next_id, det["box"], det["score"], det["class_id"], now))
+                self.next_id += 1
+        self.tracks = tracks # Tracks the detector did not confirm are dropped
+
+    def _propagate(self, prev_gray, gray, now):
+        kept = []
+        for track in self.tracks:
+            # Flow lost (tiny or textureless box): hold the last box, as reused results did
+            box = self._flow_box(track.box, prev_gray, gray)
+            if box is not None:
+                track.box = box
+
+            track.score *= Config.WEAPON_TRACK_DECAY
+            if track.score < Config.WEAPON_TRACK_MIN_SCORE or now - track.last_detected > Config.WEAPON_TRACK_MAX_AGE_S:
+                continue
+            kept.append(track)
+        self.tracks = kept
+
+    def _flow_box(self, frame_box, prev_gray, gray):
+        """
+        Move a box by the Lucas-Kanade flow of points inside it.
+        :return: new [x, y, w, h] in frame pixels, or None if the flow is lost
+        """
+        h, w = gray.shape[:2]
+        box = frame_box * self.scale
+        x, y, bw, bh = box
+        x0, y0 = int(max(x, 0)), int(max(y, 0))
+        x1, y1 = int(min(x + bw, w)), int(min(y + bh, h))
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            return None
+
+        mask = np.zeros_like(prev_gray)
+        mask[y0:y1, x0:x1] = 255
+        p0 = cv2.goodFeaturesToTrack(prev_gray, maxCorners=Config.WEAPON_TRACK_POINTS, qualityLevel=0.01,
+                                     minDistance=3, mask=mask)
+        if p0 is None or len(p0) < 3:
+            return None
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, p0, None, **self.lk_params)
+        ok = status.reshape(-1) == 1
+        if ok.sum() < 3:
+            return None
+        p0, p1 = p0.reshape(-1, 2)[ok], p1.reshape(-1, 2)[ok]
+
+        # Median shift, and scale from the spread of the points
+        dx, dy = np.median(p1 - p0, axis=0)
+        spread0 = np.median(np.linalg.norm(p0 - np.median(p0, axis=0), axis=1))
+        spread1 = np.median(np.linalg.norm(p1 - np.median(p1, axis=0), axis=1))
+        s = float(np.clip(spread1 / spread0, 0.8, 1.25)) if spread0 > 1e-3 else 1.0
+        cx, cy = x + bw / 2 + dx, y + bh / 2 + dy
+        bw, bh = bw * s, bh * s
+        return np.array([cx - bw / 2, cy - bh / 2, bw, bh], dtype=np.float32) / self.scale
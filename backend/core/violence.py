@@ -2,13 +2,46 @@ import multiprocessing
 import queue
 import time
 import numpy as np
-import tensorflow as tf
 import cv2
-from ai_edge_litert.interpreter import Interpreter
 from backend.config.config import Config
+from backend.core.worker_health import WorkerHealth
+
+# LiteRT is imported by the worker only (ViolenceDetector), never by the API /
+# pipeline process that merely imports this module. No TensorFlow anywhere.
+
+
+def softmax(logits):
+    """Numerically stable softmax over the last axis."""
+    logits = np.asarray(logits, dtype=np.float32)
+    e = np.exp(logits - np.max(logits, axis=-1, keepdims=True))
+    return e / np.sum(e, axis=-1, keepdims=True)
+
+
+def quant_params(details):
+    """(scale, zero_point) of an integer-quantized tensor, None for float tensors."""
+    scale, zero_point = details.get('quantization', (0.0, 0))
+    if not np.issubdtype(details['dtype'], np.integer) or not scale:
+        return None
+    return float(scale), int(zero_point)
+
+
+def quantize(values, params, dtype):
+    scale, zero_point = params
+    info = np.iinfo(dtype)
+    return np.clip(np.rint(values / scale + zero_point), info.min, info.max).astype(dtype)
+
+
+def dequantize(values, params):
+    values = np.asarray(values, dtype=np.float32)
+    if params is None:
+        return values
+    scale, zero_point = params
+    return (values - zero_point) * scale
+
 
 class ViolenceDetector:
-    def __init__(self, model_path=Config.MOVINET_MODEL_PATH):
+    def __init__(self, model_path=Config.MOVINET_MODEL_PATH, zero_copy=Config.MOVINET_ZERO_COPY):
+        from ai_edge_litert.interpreter import Interpreter
         self.interpreter = Interpreter(model_path=model_path)
         self.interpreter.allocate_tensors()
         
@@ -22,14 +55,21 @@ class ViolenceDetector:
         # Initialize states
         # The notebook pops "image" from input details to get pure states
         self.states = {}
+        # Quantized models (int8 variant): states are carried in each tensor's own
+        # scale/zero point, and a zero state is the zero point, not 0
+        self._state_quant = {}
         for name, info in self.input_details.items():
             if name != 'image':
-                self.states[name] = np.zeros(info['shape'], dtype=info['dtype'])
+                self._state_quant[name] = (quant_params(info), quant_params(self.output_details.get(name, info)))
+                self.states[name] = self._zero_state(name, info['shape'], info['dtype'])
+        self._logits_quant = quant_params(self.output_details['logits']) if 'logits' in self.output_details else None
 
         # Store input shape for resizing
         # We assume 'image' key exists and is the visual input
         if 'image' in self.input_details:
             self.input_shape = self.input_details['image']['shape'] # e.g. [1, 1, 172, 172, 3]
+            self._image_dtype = self.input_details['image']['dtype']
+            self._image_quant = quant_params(self.input_details['image'])
         else:
             # Fallback or error
             print("Warning: 'image' input not found in signature. Using Default.")
@@ -38,11 +78,106 @@ class ViolenceDetector:
                 if len(info['shape']) == 5:
                     self.input_shape = info['shape']
                     break
+            self._image_dtype = np.float32
+            self._image_quant = None
+
+        self.zero_copy = zero_copy and self._setup_zero_copy()
+
+    def _setup_zero_copy(self):
+        """
+        Preallocate the resize buffers and bind the interpreter's own tensor
+        buffers, so predict() allocates nothing per frame: the frame is resized
+        and converted straight into the image tensor and new states are copied
+        over the old ones in place.
+        :return: False if the signature does not map onto the interpreter's tensors
+        """
+        # Direct tensor access goes through the primary subgraph; only valid if
+        # that is the one the signature runs
+        primary = {d['index'] for d in self.interpreter.get_input_details()}
+        if 'image' not in self.input_details or {d['index'] for d in self.input_details.values()} != primary:
+            print("[VIOLENCE] Signature is not the primary subgraph, zero-copy input disabled")
+            return False
+        missing = [name for name in self.states if name not in self.output_details]
+        if missing or 'logits' not in self.output_details:
+            print(f"[VIOLENCE] No output for states {missing}, zero-copy input disabled")
+            return False
+
+        image = self.input_details['image']
+        h, w = self.input_shape[2], self.input_shape[3]
+        self._resized = np.empty((h, w, 3), dtype=np.uint8)
+        self._rgb = np.empty((h, w, 3), dtype=np.uint8)
+        self._scale = np.float32(1.0 / 255.0)
+        # Pixels go in as-is when the input is raw uint8 or quantized to exactly /255
+        self._raw_pixels = self._image_dtype == np.uint8 and (
+            self._image_quant is None or
+            (self._image_quant[1] == 0 and np.isclose(self._image_quant[0], 1.0 / 255.0)))
+        if self._image_quant and not self._raw_pixels:
+            q_scale, q_zero = self._image_quant
+            self._scale = np.float32(1.0 / (255.0 * q_scale))
+            self._q_zero = np.float32(q_zero)
+            self._q_range = np.iinfo(self._image_dtype)
+            self._pixels = np.empty((h, w, 3), dtype=np.float32)
+
+        # Tensor accessors, not arrays: views must not be held across invoke()
+        self._image_tensor = self.interpreter.tensor(image['index'])
+        self._state_tensors = [
+            (self.interpreter.tensor(self.input_details[name]['index']),
+             self.interpreter.tensor(self.output_details[name]['index']))
+            for name in self.states
+        ]
+        self._logits_tensor = self.interpreter.tensor(self.output_details['logits']['index'])
+        self._probs = np.empty(self.output_details['logits']['shape'], dtype=np.float32)
+        self._zero_state_tensors()
+        return True
+
+    def _zero_state(self, name, shape, dtype):
+        in_quant = self._state_quant[name][0]
+        return np.full(shape, in_quant[1] if in_quant else 0, dtype=dtype)
+
+    def _carry_state(self, name, value, dtype):
+        """A state output as the next call's input, requantized if the two tensors differ."""
+        in_quant, out_quant = self._state_quant[name]
+        if in_quant == out_quant:
+            return value
+        real = dequantize(value, out_quant)
+        return quantize(real, in_quant, dtype) if in_quant else real.astype(dtype)
+
+    def _zero_state_tensors(self):
+        for name, (state_in, _) in zip(self.states, self._state_tensors):
+            in_quant = self._state_quant[name][0]
+            state_in().fill(in_quant[1] if in_quant else 0)
 
     def reset(self):
         """Reset internal states to zeros."""
-        for name in self.states:
-            self.states[name] = np.zeros(self.states[name].shape, dtype=self.states[name].dtype)
+        if self.zero_copy:
+            self._zero_state_tensors()
+            return
+        for name, state in self.states.items():
+            self.states[name] = self._zero_state(name, state.shape, state.dtype)
+
+    # --- Per-stream state (one detector serving several cameras) ---
+
+    def new_states(self):
+        return {name: self._zero_state(name, state.shape, state.dtype) for name, state in self.states.items()}
+
+    def use_states(self, states):
+        """Make the next predict() continue from a stream's states."""
+        if self.zero_copy:
+            for name, (state_in, _) in zip(self.states, self._state_tensors):
+                np.copyto(state_in(), states[name])
+        else:
+            self.states = states
+
+    def store_states(self, states):
+        """
+        Save the states predict() left behind into a stream's (preallocated) dict.
+        :return: the stream's states
+        """
+        if not self.zero_copy:
+            return self.states
+        for name, (state_in, _) in zip(self.states, self._state_tensors):
+            np.copyto(states[name], state_in())
+        return states
 
     def predict(self, frame):
         """
@@ -52,6 +187,9 @@ class ViolenceDetector:
         Returns:
             float: Probability of fight [0.0, 1.0]
         """
+        if self.zero_copy:
+            return self._predict_zero_copy(frame)
+
         # Preprocess
         # Resize to input shape (usually 172x172)
         # input_shape is [1, 1, H, W, 3]
@@ -62,7 +200,10 @@ class ViolenceDetector:
 
         img = cv2.resize(frame, (target_w, target_h))
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = img.astype(np.float32) / 255.0
+        if self._image_quant:
+            img = quantize(img.astype(np.float32) / 255.0, self._image_quant, self._image_dtype)
+        elif self._image_dtype != np.uint8:
+            img = img.astype(np.float32) / 255.0
         img = np.expand_dims(img, axis=0) # [1, H, W, 3]
         img = np.expand_dims(img, axis=0) # [1, 1, H, W, 3]
 
@@ -73,12 +214,12 @@ class ViolenceDetector:
         
         # Extract logits and update states
         # outputs contains new states and 'logits'
-        logits = outputs.pop('logits')
-        self.states = outputs # The rest are the new states
+        logits = dequantize(outputs.pop('logits'), self._logits_quant)
+        # The rest are the new states
+        self.states = {name: self._carry_state(name, outputs[name], state.dtype) for name, state in self.states.items()}
         
         # Process logits
-        probs = tf.nn.softmax(logits)
-        probs_np = probs.numpy()
+        probs_np = softmax(logits)
         
         if len(probs_np.shape) == 2:
              # Log raw probabilities for verification
@@ -93,6 +234,47 @@ class ViolenceDetector:
         else:
              return np.array([0.0, 0.0])
 
+    def _predict_zero_copy(self, frame):
+        h, w = self._resized.shape[:2]
+        cv2.resize(frame, (w, h), dst=self._resized)
+        image = self._image_tensor()[0, 0] # [H, W, 3] view of the input tensor
+        if self._raw_pixels:
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=image)
+        elif self._image_quant:
+            # q = pixel / 255 / scale + zero_point, rounded and saturated into the tensor
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            pixels = self._pixels
+            np.multiply(self._rgb, self._scale, out=pixels)
+            pixels += self._q_zero
+            np.rint(pixels, out=pixels)
+            np.clip(pixels, self._q_range.min, self._q_range.max, out=pixels)
+            np.copyto(image, pixels, casting='unsafe')
+        else:
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            np.multiply(self._rgb, self._scale, out=image, casting='unsafe')
+
+        self.interpreter.invoke()
+
+        # New states become the next call's inputs, copied buffer to buffer
+        for name, (state_in, state_out) in zip(self.states, self._state_tensors):
+            target = state_in()
+            np.copyto(target, self._carry_state(name, state_out(), target.dtype))
+
+        probs = self._probs
+        np.copyto(probs, self._logits_tensor(), casting='unsafe')
+        if self._logits_quant:
+            probs -= self._logits_quant[1]
+            probs *= self._logits_quant[0]
+        np.subtract(probs, probs.max(axis=-1, keepdims=True), out=probs)
+        np.exp(probs, out=probs)
+        probs /= probs.sum(axis=-1, keepdims=True)
+        # Copy: the result outlives this call (it is queued to the pipeline)
+        if probs.ndim == 2:
+            return probs[0].copy()
+        elif probs.ndim == 3:
+            return probs[0, 0].copy()
+        return np.array([0.0, 0.0])
+
 class ViolenceWorker(multiprocessing.Process):
     def __init__(self, model_path=Config.MOVINET_MODEL_PATH):
         super().__init__()
@@ -101,8 +283,9 @@ class ViolenceWorker(multiprocessing.Process):
         self.queue = multiprocessing.Queue(maxsize=1) 
         self.result_queue = multiprocessing.Queue(maxsize=1)
         self.running = multiprocessing.Value('b', True) # Boolean flag
+        self.health = WorkerHealth() # Heartbeat / latency, read by the ModelPool supervisor
 
-    def process_frame(self, frame):
+    def process_frame(self, frame, frame_id=None):
         if not self.running.value: return
         try:
             self.queue.put_nowait(frame)
@@ -140,13 +323,17 @@ class ViolenceWorker(multiprocessing.Process):
     def run(self):
         # Initialize model INSIDE the process to avoid pickling issues
         try:
+            t0 = time.perf_counter()
             detector = ViolenceDetector(self.model_path)
             last_prob = np.array([0.0, 0.0])
         except Exception as e:
             print(f"Failed to load MoViNet model in worker: {e}")
-            return
+            raise SystemExit(1) # Non-zero exit: the supervisor restarts us with backoff
+        self.health.mark_ready((time.perf_counter() - t0) * 1000.0)
+        print(f"[VIOLENCE] Worker ready: runtime import + model load {self.health.load_ms.value:.0f} ms, RSS {self.health.rss_mb.value:.0f} MB")
         
         while self.running.value:
+            self.health.beat()
             try:
                 item = self.queue.get(timeout=0.1)
             except queue.Empty:
@@ -165,7 +352,9 @@ class ViolenceWorker(multiprocessing.Process):
             frame = item
                 
             try:
+                t0 = time.perf_counter()
                 prob = detector.predict(frame)
+                self.health.record((time.perf_counter() - t0) * 1000.0)
                 
                 # Update result
                 # We want to clear the old result if possible to keep it fresh
@@ -177,3 +366,4 @@ class ViolenceWorker(multiprocessing.Process):
                 
             except Exception as e:
                 print(f"Violence inference error: {e}")
+                self.health.record_error()
@@ -2,6 +2,7 @@
 import cv2
 import matplotlib.pyplot as plt
 from backend.config.config import Config
+from backend.core.detections import class_name
 
 class Visualizer:
     def __init__(self, headless=False):
@@ -44,12 +45,15 @@ class Visualizer:
         for det in weapon_detections:
             box = det['box']
             conf = det['score']
-            name = det['class']
+            name = class_name(det['class_id'])
             
             # Color: Red for high confidence
             color = (0, 0, 255) 
-            cv2.rectangle(frame, (box[0], box[1]), (box[2], box[3]), color, 2)
+            # Boxes are [x, y, w, h]
+            cv2.rectangle(frame, (box[0], box[1]), (box[0] + box[2], box[1] + box[3]), color, 2)
             label = f"{name} {conf:.2f}"
+            if "track_id" in det.dtype.names:
+                label = f"#{det['track_id']} {label}"
             cv2.putText(frame, label, (box[0], box[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
 
         # Background panel for text
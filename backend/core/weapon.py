@@ -1,29 +1,76 @@
+import os
+import copy
 import multiprocessing
 import queue
+import time
 import cv2
 import numpy as np
-import onnxruntime as ort
 from backend.config.config import Config
+from backend.core.detections import no_detections, postprocess_yolo
+from backend.core.worker_health import WorkerHealth
+
+# ONNX Runtime is imported by WeaponDetector only (the worker / inference
+# server), never by processes that merely import this module.
+
 
 class WeaponDetector:
-    def __init__(self, model_path=Config.WEAPON_MODEL_PATH):
-        # Load ONNX model
-        self.session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    def __init__(self, model_path=Config.WEAPON_MODEL_PATH, img_size=None, io_binding=Config.ORT_IO_BINDING, conf_thres=None):
+        from backend.core.ort_session import create_session
+        # Load ONNX model (tuned options, cached optimized graph)
+        self.session = create_session(model_path)
         
         model_inputs = self.session.get_inputs()
         self.input_name = model_inputs[0].name
         self.input_shape = model_inputs[0].shape
         self.output_name = self.session.get_outputs()[0].name
+
+        # Fixed-shape exports dictate the input size; dynamic ones run at img_size
+        if isinstance(self.input_shape[-1], int):
+            self.img_size = self.input_shape[-1]
+        else:
+            self.img_size = img_size or Config.WEAPON_IMG_SIZE
         
-        self.conf_thres = Config.WEAPON_CONF_THRESH
+        self.conf_thres = conf_thres or Config.WEAPON_CONF_THRESH
         self.iou_thres = Config.WEAPON_IOU_THRESH
         self.classes = Config.WEAPON_CLASS_NAMES
 
+        self.binding = self._bind_buffers() if io_binding else None
+        # Dynamic batch dimension: several frames can go through one run
+        self.batchable = not isinstance(self.input_shape[0], int)
+
+    def _bind_buffers(self):
+        """
+        Preallocate the input tensor (and the output, if its shape is static) and
+        bind them to the session once. The CPU OrtValues share memory with the
+        numpy arrays, so the input is written in place and results land in
+        self.output without per-call tensor allocations.
+        """
+        import onnxruntime as ort
+        size = self.img_size
+        self._resized = np.empty((size, size, 3), dtype=np.uint8)
+        self._rgb = np.empty((size, size, 3), dtype=np.uint8)
+        self._scale = np.float32(1.0 / 255.0)
+        self.input = np.empty((1, 3, size, size), dtype=np.float32)
+        self._input_value = ort.OrtValue.ortvalue_from_numpy(self.input)
+
+        binding = self.session.io_binding()
+        binding.bind_ortvalue_input(self.input_name, self._input_value)
+        output_shape = self.session.get_outputs()[0].shape
+        if all(isinstance(d, int) for d in output_shape):
+            self.output = np.empty(output_shape, dtype=np.float32)
+            self._output_value = ort.OrtValue.ortvalue_from_numpy(self.output)
+            binding.bind_ortvalue_output(self.output_name, self._output_value)
+        else:
+            # Dynamic output: ORT allocates it, the input copy is still avoided
+            self.output = None
+            binding.bind_output(self.output_name, 'cpu')
+        return binding
+
     def preprocess(self, frame):
-        # Resize to 640x640 (YOLOv8 default usually)
+        # Resize to img_size x img_size (640 is the YOLOv8 default)
         self.img_height, self.img_width = frame.shape[:2]
         
-        img = cv2.resize(frame, (Config.WEAPON_IMG_SIZE, Config.WEAPON_IMG_SIZE))
+        img = cv2.resize(frame, (self.img_size, self.img_size))
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         img = img.transpose((2, 0, 1)) # HWC -> CHW
         img = np.expand_dims(img, axis=0)
@@ -31,105 +78,141 @@ class WeaponDetector:
         return img
 
     def postprocess(self, output):
-        # Output shape: [1, 4 + num_classes, 8400] -> [1, 84, 8400] for 80 classes
-        # Transpose to [1, 8400, 84]
-        predictions = np.transpose(output[0], (0, 2, 1))
-        
-        # predictions[0] is [8400, 84]
-        # Box: [x, y, w, h]
-        
-        boxes = []
-        scores = []
-        class_ids = []
-        
-        # Iterate or vectorized? Vectorized is better.
-        # Format: [cx, cy, w, h, class_score_1, class_score_2, ...]
-        
-        pred = predictions[0] # [8400, 4+nc]
-        
-        # Filter by confidence
-        # Max class score
-        class_scores = pred[:, 4:]
-        max_scores = np.max(class_scores, axis=1)
-        max_indices = np.argmax(class_scores, axis=1)
-        
-        mask = max_scores > self.conf_thres
-        
-        filtered_pred = pred[mask]
-        filtered_scores = max_scores[mask]
-        filtered_indices = max_indices[mask]
-        
-        if len(filtered_pred) == 0:
-            return []
-            
-        # Boxes
-        # cx, cy, w, h -> x1, y1, x2, y2
-        cx = filtered_pred[:, 0]
-        cy = filtered_pred[:, 1]
-        w = filtered_pred[:, 2]
-        h = filtered_pred[:, 3]
-        
-        x1 = cx - w/2
-        y1 = cy - h/2
-        x2 = cx + w/2
-        y2 = cy + h/2
-        
-        # Scale back to original image size
-        scale_x = self.img_width / Config.WEAPON_IMG_SIZE
-        scale_y = self.img_height / Config.WEAPON_IMG_SIZE
-        
-        x1 *= scale_x
-        y1 *= scale_y
-        x2 *= scale_x
-        y2 *= scale_y
-        
-        boxes_np = np.stack([x1, y1, x2-x1, y2-y1], axis=1) # xywh for NMS? 
-        # OpenCV NMS expects [x, y, w, h]
-        
-        indices = cv2.dnn.NMSBoxes(
-            bboxes=boxes_np.tolist(),
-            scores=filtered_scores.tolist(),
-            score_threshold=self.conf_thres,
-            nms_threshold=self.iou_thres
-        )
-        
-        results = []
-        if len(indices) > 0:
-            for i in indices.flatten():
-                box = boxes_np[i]
-                score = filtered_scores[i]
-                class_id = filtered_indices[i]
-                
-                # Check bounds
-                if class_id < len(self.classes):
-                    class_name = self.classes[class_id]
-                else:
-                    class_name = f"Class {class_id}"
-                
-                results.append({
-                    "box": box.astype(int).tolist(), # [x, y, w, h]
-                    "score": float(score),
-                    "class": class_name
-                })
-                
-        return results
+        """Detections for the single frame last passed to preprocess()."""
+        return self.postprocess_batch(output[0], [(self.img_height, self.img_width)])[0]
+
+    def postprocess_batch(self, output, image_sizes):
+        return postprocess_yolo(output, image_sizes, self.img_size, self.conf_thres, self.iou_thres)
+
+    def preprocess_into_input(self, frame):
+        """preprocess() writing into the bound input buffer."""
+        self.img_height, self.img_width = frame.shape[:2]
+        cv2.resize(frame, (self.img_size, self.img_size), dst=self._resized)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        np.multiply(self._rgb.transpose((2, 0, 1)), self._scale, out=self.input[0]) # HWC -> CHW
+
+    def predict_batch(self, frames):
+        """Detections for several frames in one run (needs a dynamic-batch export)."""
+        batch = np.concatenate([self.preprocess(frame) for frame in frames])
+        output = self.session.run([self.output_name], {self.input_name: batch})[0]
+        return self.postprocess_batch(output, [frame.shape[:2] for frame in frames])
+
+    def predict_many(self, frames):
+        """One batched run when the export allows it, otherwise frame by frame."""
+        if self.batchable and len(frames) > 1:
+            return self.predict_batch(frames)
+        return [self.predict(frame) for frame in frames]
 
     def predict(self, frame):
-        input_tensor = self.preprocess(frame)
-        outputs = self.session.run([self.output_name], {self.input_name: input_tensor})
-        detections = self.postprocess(outputs)
+        if self.binding is None:
+            input_tensor = self.preprocess(frame)
+            outputs = self.session.run([self.output_name], {self.input_name: input_tensor})
+            return self.postprocess(outputs)
+
+        self.preprocess_into_input(frame)
+        self.session.run_with_iobinding(self.binding)
+        output = self.output if self.output is not None else self.binding.copy_outputs_to_cpu()[0]
+        return self.postprocess([output])
+
+class WeaponCascade:
+    """
+    Two-stage weapon detection with the same predict() output as WeaponDetector.
+
+    Stage 1 (a small / low-resolution model at a low threshold) screens every
+    frame; the full detector runs only when stage 1 has a candidate, every
+    WEAPON_CASCADE_SAFETY_INTERVAL frames regardless, and for
+    WEAPON_CASCADE_HOLD_FRAMES after it found something, so a confirmed weapon
+    keeps being reported frame after frame and the SignalProcessor debounce sees
+    the same sequence it would from the full detector alone.
+    """
+    def __init__(self, model_path=Config.WEAPON_MODEL_PATH, img_size=None):
+        self.full = WeaponDetector(model_path, img_size)
+        self.stage1 = self._make_stage1(model_path)
+        self.frames = 0
+        self.full_runs = 0
+        self.last_full = -Config.WEAPON_CASCADE_SAFETY_INTERVAL # Full run on the first frame
+        self.hold = 0
+
+    def _make_stage1(self, model_path):
+        path = Config.WEAPON_CASCADE_STAGE1_MODEL
+        if not path or not os.path.exists(path):
+            path = model_path
+        stage1 = WeaponDetector(path, Config.WEAPON_CASCADE_STAGE1_SIZE, conf_thres=Config.WEAPON_CASCADE_STAGE1_THRESH)
+        if stage1.img_size >= self.full.img_size and path == model_path:
+            print(f"[WEAPON] No cheaper stage-1 model (fixed {stage1.img_size}px input), cascade disabled")
+            return None
+        print(f"[WEAPON] Cascade: stage 1 {os.path.basename(path)} @ {stage1.img_size}, full @ {self.full.img_size}")
+        return stage1
+
+    def reset(self):
+        self.last_full = self.frames - Config.WEAPON_CASCADE_SAFETY_INTERVAL
+        self.hold = 0
+
+    def for_stream(self):
+        """A cascade with its own schedule that shares this one's detectors."""
+        other = copy.copy(self)
+        other.frames = other.full_runs = other.hold = 0
+        other.last_full = -Config.WEAPON_CASCADE_SAFETY_INTERVAL
+        return other
+
+    @property
+    def batchable(self):
+        return self.full.batchable or (self.stage1 is not None and self.stage1.batchable)
+
+    def _full_due(self):
+        return self.hold > 0 or self.frames - self.last_full >= Config.WEAPON_CASCADE_SAFETY_INTERVAL
+
+    def _after_full(self, detections):
+        self.last_full = self.frames
+        self.full_runs += 1
+        self.hold = Config.WEAPON_CASCADE_HOLD_FRAMES if len(detections) > 0 else max(self.hold - 1, 0)
         return detections
 
+    def predict(self, frame):
+        return WeaponCascade.predict_streams([self], [frame])[0]
+
+    @staticmethod
+    def predict_streams(cascades, frames):
+        """
+        predict() for several streams at once: cascades (from for_stream(), sharing
+        detectors) each advance their own schedule, while the stage-1 and full
+        runs are each batched across the streams that need them.
+        """
+        detector = cascades[0]
+        for cascade in cascades:
+            cascade.frames += 1
+        if detector.stage1 is None:
+            return detector.full.predict_many(frames)
+
+        results = [None] * len(frames)
+        full = [i for i, cascade in enumerate(cascades) if cascade._full_due()]
+        screen = [i for i in range(len(frames)) if i not in full]
+        if screen:
+            candidates = detector.stage1.predict_many([frames[i] for i in screen])
+            for i, found in zip(screen, candidates):
+                if len(found) > 0:
+                    full.append(i)
+                else:
+                    results[i] = no_detections() # Nothing to look at: same as the full detector finding nothing
+        if full:
+            detections = detector.full.predict_many([frames[i] for i in full])
+            for i, dets in zip(full, detections):
+                results[i] = cascades[i]._after_full(dets)
+        return results
+
+
 class WeaponWorker(multiprocessing.Process):
-    def __init__(self, model_path=Config.WEAPON_MODEL_PATH):
+    def __init__(self, model_path=Config.WEAPON_MODEL_PATH, img_size=None):
         super().__init__()
         self.daemon = True
         self.model_path = model_path
+        self.img_size = img_size
         self.queue = multiprocessing.Queue(maxsize=1) 
         self.result_queue = multiprocessing.Queue(maxsize=1)
         self.running = multiprocessing.Value('b', True)
+        self.health = WorkerHealth() # Heartbeat / latency, read by the ModelPool supervisor
 
-    def process_frame(self, frame):
+    def process_frame(self, frame, frame_id=None):
         if not self.running.value: return
         try:
             self.queue.put_nowait(frame)
@@ -162,19 +245,28 @@ class WeaponWorker(multiprocessing.Process):
     def run(self):
         # Init model inside process
         try:
-            detector = WeaponDetector(self.model_path)
+            t0 = time.perf_counter()
+            if Config.WEAPON_CASCADE:
+                detector = WeaponCascade(self.model_path, self.img_size)
+            else:
+                detector = WeaponDetector(self.model_path, self.img_size)
         except Exception as e:
             print(f"Failed to load Weapon model in worker: {e}")
-            return
+            raise SystemExit(1) # Non-zero exit: the supervisor restarts us with backoff
+        self.health.mark_ready((time.perf_counter() - t0) * 1000.0)
+        print(f"[WEAPON] Worker ready: model load {self.health.load_ms.value:.0f} ms, RSS {self.health.rss_mb.value:.0f} MB")
             
         while self.running.value:
+            self.health.beat()
             try:
                 item = self.queue.get(timeout=0.1)
             except queue.Empty:
                 continue
             
             if isinstance(item, str) and item == "RESET":
-                # WeaponDetector is stateless per frame, but we clear queues
+                # WeaponDetector is stateless per frame; the cascade restarts its schedule
+                if isinstance(detector, WeaponCascade):
+                    detector.reset()
                 try:
                     while not self.result_queue.empty():
                         self.result_queue.get_nowait()
@@ -185,7 +277,9 @@ class WeaponWorker(multiprocessing.Process):
             frame = item
                 
             try:
+                t0 = time.perf_counter()
                 detections = detector.predict(frame)
+                self.health.record((time.perf_counter() - t0) * 1000.0)
                 
                 # Update result
                 try:
@@ -196,3 +290,4 @@ class WeaponWorker(multiprocessing.Process):
                 
             except Exception as e:
                 print(f"Weapon inference error: {e}")
+                self.health.record_error()
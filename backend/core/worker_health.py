@@ -0,0 +1,97 @@
+import os
+import time
+import multiprocessing
+from backend.config.config import Config
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+STATUS_OK = "ok"
+STATUS_LOADING = "loading"
+STATUS_HUNG = "hung"
+STATUS_DEAD = "dead"
+STATUS_RESTARTING = "restarting"
+
+
+def rss_mb():
+    """Resident set size of this process in MB (0 if it cannot be measured)."""
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+class WorkerHealth:
+    """
+    Liveness and latency of one inference worker, in shared memory so the
+    parent can read it without talking to the (possibly hung) worker.
+    The worker beats at least every queue timeout, even when idle.
+    """
+    def __init__(self):
+        self.started_at = multiprocessing.Value('d', time.time())
+        self.heartbeat = multiprocessing.Value('d', 0.0)
+        self.ready = multiprocessing.Value('b', False) # Model loaded
+        self.latency_ms = multiprocessing.Value('d', 0.0) # EMA
+        self.max_latency_ms = multiprocessing.Value('d', 0.0)
+        self.inferences = multiprocessing.Value('q', 0)
+        self.errors = multiprocessing.Value('q', 0)
+        self.load_ms = multiprocessing.Value('d', 0.0) # Runtime import + model load
+        self.rss_mb = multiprocessing.Value('d', 0.0) # Measured once the model is loaded
+        self.batch_size = multiprocessing.Value('d', 0.0) # EMA, inference servers only
+
+    # --- Worker side ---
+
+    def beat(self):
+        self.heartbeat.value = time.time()
+
+    def mark_ready(self, load_ms=0.0):
+        self.load_ms.value = load_ms
+        self.rss_mb.value = rss_mb()
+        self.ready.value = True
+        self.beat()
+
+    def record(self, latency_ms):
+        ema = self.latency_ms.value
+        self.latency_ms.value = latency_ms if self.inferences.value == 0 else 0.1 * latency_ms + 0.9 * ema
+        self.max_latency_ms.value = max(self.max_latency_ms.value, latency_ms)
+        self.inferences.value += 1
+        self.beat()
+
+    def record_batch(self, size):
+        self.batch_size.value = size if self.batch_size.value == 0 else 0.1 * size + 0.9 * self.batch_size.value
+
+    def record_error(self):
+        self.errors.value += 1
+
+    # --- Supervisor side ---
+
+    def status(self, alive, now=None):
+        now = now or time.time()
+        if not alive:
+            return STATUS_DEAD
+        if not self.ready.value:
+            # Model still loading, unless it has been far too long
+            return STATUS_LOADING if now - self.started_at.value < Config.WORKER_LOAD_TIMEOUT_S else STATUS_HUNG
+        if now - self.heartbeat.value > Config.WORKER_HANG_TIMEOUT_S:
+            return STATUS_HUNG
+        return STATUS_OK
+
+    def snapshot(self, alive, now=None):
+        now = now or time.time()
+        return {
+            "status": self.status(alive, now),
+            "heartbeat_age_s": now - self.heartbeat.value if self.heartbeat.value else None,
+            "latency_ms": self.latency_ms.value,
+            "max_latency_ms": self.max_latency_ms.value,
+            "inferences": self.inferences.value,
+            "errors": self.errors.value,
+            "load_ms": self.load_ms.value,
+            "rss_mb": self.rss_mb.value,
+            "batch_size": self.batch_size.value,
+            "uptime_s": now - self.started_at.value
+        }
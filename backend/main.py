@@ -10,10 +10,16 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 cv2.setNumThreads(0)
 
 from backend.core.pipeline import Pipeline
+from backend.core.model_pool import shutdown_model_pool
 
 def main():
+    # Optional source: device index, video file, image directory, rtsp:// / http:// URL or "synthetic"
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
     pipeline = Pipeline()
-    pipeline.run()
+    try:
+        pipeline.run(input_source=source)
+    finally:
+        shutdown_model_pool()
 
 if __name__ == "__main__":
     main()
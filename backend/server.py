@@ -1,4 +1,4 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -10,12 +10,20 @@ import asyncio
 import time
 import sys
 import cv2
-from typing import List, Optional
+from typing import Optional
 
 # Add project root to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.core.pipeline import Pipeline
+from backend.core.orchestrator import CameraOrchestrator, camera_for_sensor
+from backend.core.model_pool import shutdown_model_pool
+from backend.core.metrics import metrics
+from backend.core.connections import ConnectionManager, FrameMailbox
+from backend.core.stream import StreamEncoder, StreamEncodeStage
+from backend.core.live_video import LiveVideoHub
+from backend.core.replay import ReplayEngine
+from backend.core.event_index import EventIndex
 from backend.config.config import Config
 
 # Disable internal threading to prevent GIL issues
@@ -38,111 +46,133 @@ LOG_DIR = os.path.join(BASE_DIR, "logs")
 CLIPS_DIR = os.path.join(LOG_DIR, "clips")
 META_DIR = os.path.join(LOG_DIR, "metadata")
 DASHBOARD_DIR = os.path.join(BASE_DIR, "frontend")
-
-# ... (ConnectionManager same)
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.sensor_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    async def connect_sensor(self, websocket: WebSocket):
-        await websocket.accept()
-        self.sensor_connections.append(websocket)
-        print("Sensor connected!")
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.sensor_connections:
-            self.sensor_connections.remove(websocket)
-
-    async def broadcast_bytes(self, data: bytes):
-        for connection in self.active_connections:
-            try:
-                await connection.send_bytes(data)
-            except Exception:
-                pass
-
-    async def broadcast_json(self, data: dict):
-        # Only send high-bandwidth data to frontend clients
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(data)
-            except Exception:
-                pass
+event_index = EventIndex(LOG_DIR)
 
 manager = ConnectionManager()
 
 # Global State
-pipeline = None
+pipeline = None # Pipeline (thread mode) or CameraOrchestrator
 pipeline_thread = None
-latest_frame_data = None # (jpg_bytes, metadata)
-data_lock = threading.Lock()
+live_video = None # LiveVideoHub, fragmented MP4 on /ws/video (default camera)
+frame_mailboxes = {} # camera -> FrameMailbox: encoder threads -> broadcast_loop, ({tier: (image_id, jpg_bytes)}, metadata)
 running = False
-frame_counter = 0
+frame_counters = {}
+
+def stream_metrics_name(camera_id):
+    # A single camera keeps the plain stream.* metrics
+    return "stream" if len(Config.CAMERAS) == 1 else f"cameras.{camera_id}.stream"
 
-def frame_handler(jpg_bytes, metadata):
+def encoded_frame_handler(images, metadata, camera_id):
     """
-    Callback from Pipeline thread.
-    Updates the latest frame data.
+    Called from a stream encoder thread with the encoded tiers.
+    Wakes the camera's broadcast_loop right away.
     """
-    global latest_frame_data, frame_counter
-    
-    with data_lock:
-        latest_frame_data = (jpg_bytes, metadata)
-    
-    frame_counter += 1
-    if frame_counter % 100 == 0:
-        print(f"[SERVER] Processing frame {frame_counter}, JPG Size: {len(jpg_bytes)} bytes")
+    mailbox = frame_mailboxes.get(camera_id)
+    if mailbox is None:
+        return # Server loop not started yet
+    mailbox.put((images, metadata))
+
+    count = frame_counters[camera_id] = frame_counters.get(camera_id, 0) + 1
+    if count % 100 == 0:
+        sizes = {tier: len(jpg) for tier, (_, jpg) in images.items()}
+        print(f"[SERVER] {camera_id}: processing frame {count}, JPG Sizes: {sizes}")
+
+# One encode stage per camera: a busy camera only drops its own frames
+stream_stages = {
+    camera_id: StreamEncodeStage(
+        StreamEncoder(name=stream_metrics_name(camera_id)),
+        on_output=lambda images, metadata, camera_id=camera_id: encoded_frame_handler(images, metadata, camera_id))
+    for camera_id in Config.CAMERAS
+}
+
+def frame_handler(frame, metadata, camera_id=Config.DEFAULT_CAMERA):
+    """
+    Callback from Pipeline / CameraOrchestrator / replay thread.
+    Only hands the frame reference to the encode stage; encoding happens off this thread.
+    """
+    if live_video and camera_id == Config.DEFAULT_CAMERA:
+        live_video.submit(frame, metadata)
+    if not manager.watched(camera_id):
+        return # Nobody watching this camera: no encoding, no handoff
+    stream_stages[camera_id].submit(frame, metadata, manager.tiers_for(camera_id))
 
 broadcast_active = False
+main_loop = None
 
-async def broadcast_loop():
+def publish_event(message):
     """
-    Async loop to push updates to websockets.
+    Event lifecycle notification (EventLogger.on_event, feedback) -> every /ws client.
+    Safe to call from any thread.
     """
-    global latest_frame_data, broadcast_active
-    
+    if main_loop is None:
+        return
+    try:
+        main_loop.call_soon_threadsafe(manager.broadcast_json, message)
+    except RuntimeError:
+        pass # Loop closed during shutdown
+
+def start_pipeline():
+    """
+    Start the live pipelines. Several cameras (or PIPELINE_MODE = "process") run
+    one process per camera under the CameraOrchestrator; a single camera in
+    thread mode runs in this process.
+    """
+    global pipeline, pipeline_thread
+    if Config.PIPELINE_MODE == "process" or len(Config.CAMERAS) > 1:
+        pipeline = CameraOrchestrator(on_frame=frame_handler, on_event=publish_event, no_logs=Config.NO_LOGS)
+        pipeline.start()
+        pipeline_thread = None
+        return
+
+    input_source = Config.CAMERAS[Config.DEFAULT_CAMERA].get("source", 0)
+    pipeline = Pipeline(headless=True, no_logs=Config.NO_LOGS)
+    pipeline.logger.on_event = publish_event
+
+    def run_pipeline():
+        pipeline.run(input_source=input_source, headless=True, frame_callback=frame_handler)
+
+    pipeline_thread = threading.Thread(target=run_pipeline, daemon=True)
+    pipeline_thread.start()
+
+def trigger_doorbell(camera_id):
+    if isinstance(pipeline, CameraOrchestrator):
+        pipeline.trigger_doorbell(camera_id)
+    elif pipeline and camera_id == Config.DEFAULT_CAMERA:
+        pipeline.trigger_doorbell()
+
+async def broadcast_loop(camera_id):
+    """
+    Async loop to push one camera's updates to websockets.
+    Sleeps until the mailbox has a frame; no polling.
+    """
+    mailbox = frame_mailboxes[camera_id]
     while broadcast_active:
-        data_to_send = None
-        
-        with data_lock:
-            if latest_frame_data:
-                data_to_send = latest_frame_data
-                latest_frame_data = None
-        
-        if data_to_send:
-            jpg, meta = data_to_send
-            # Send Metadata first (text)
-            await manager.broadcast_json(meta)
-            # Send Frame (binary)
-            await manager.broadcast_bytes(jpg)
-            
-        await asyncio.sleep(0.015) # ~60 FPS check rate
+        (images, meta), _ = await mailbox.get()
+        if not broadcast_active:
+            break
+        # Queued per client, in the format and tier each client asked for
+        manager.broadcast_frame(images, meta, camera=camera_id)
 
 @app.on_event("startup")
 def startup_event():
-    global pipeline, pipeline_thread, running, broadcast_active
+    global pipeline, pipeline_thread, running, broadcast_active, main_loop, live_video
     print("Starting Pipeline in background...")
     running = True
     broadcast_active = True
+    main_loop = asyncio.get_running_loop()
+    # Metadata written while the server was down (or by older versions)
+    event_index.sync()
+    for camera_id in Config.CAMERAS:
+        frame_mailboxes[camera_id] = FrameMailbox(main_loop, name=stream_metrics_name(camera_id))
+    if Config.LIVE_VIDEO_ENABLED:
+        live_video = LiveVideoHub(main_loop)
     
-    # Initialize Pipeline
-    pipeline = Pipeline(headless=True, no_logs=Config.NO_LOGS)
-    
-    # Start Thread
-    def run_pipeline():
-        pipeline.run(headless=True, frame_callback=frame_handler)
-        
-    pipeline_thread = threading.Thread(target=run_pipeline, daemon=True)
-    pipeline_thread.start()
+    # Start Pipeline (thread or processes)
+    start_pipeline()
     
-    # Start Broadcast Loop
-    asyncio.create_task(broadcast_loop())
+    # Start Broadcast Loops
+    for camera_id in Config.CAMERAS:
+        asyncio.create_task(broadcast_loop(camera_id))
 
 
 
@@ -161,24 +191,52 @@ def shutdown_event():
     if pipeline_thread:
         # Don't join forever, just wait a bit then let the main process exit kill it
         pipeline_thread.join(timeout=1.0)
+    for stage in stream_stages.values():
+        stage.stop()
+    if live_video:
+        live_video.close()
+    # Worker processes live in the model pool, not the pipeline
+    shutdown_model_pool()
     print("Pipeline stopped.")
 
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, protocol: str = "legacy", tier: Optional[str] = None,
+                             camera: Optional[str] = None):
+    # ?protocol=binary -> one message per frame; default keeps the JSON + JPEG pair
+    # ?tier=480p etc. picks a stream tier (Config.STREAM_TIERS), tier=meta skips images,
+    # tier=events gets event_update messages only
+    # ?camera=<id> picks the camera (Config.CAMERAS), default Config.DEFAULT_CAMERA
+    await manager.connect(websocket, protocol=protocol, tier=tier, camera=camera)
     try:
         while True:
             # Keep alive / receive frontend commands
             data = await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     except Exception as e:
         pass
+    finally:
+        manager.disconnect(websocket)
+
+@app.websocket("/ws/video")
+async def video_websocket_endpoint(websocket: WebSocket):
+    # Fragmented MP4 for Media Source Extensions, metadata as JSON keyed by pts
+    if not live_video:
+        await websocket.close(code=1013)
+        return
+    await live_video.connect(websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_video.disconnect(websocket)
 
 @app.websocket("/ws/sensor")
-async def sensor_websocket_endpoint(websocket: WebSocket):
-    global pipeline
+async def sensor_websocket_endpoint(websocket: WebSocket, device: Optional[str] = None):
+    # ?device=<id> names the ESP board; readings map to cameras via Config.SENSOR_CAMERAS
     await manager.connect_sensor(websocket)
     try:
         while True:
@@ -186,15 +244,16 @@ async def sensor_websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             try:
                 msg = json.loads(data)
+                camera_id = camera_for_sensor(msg.get("sensor"), msg.get("device") or device)
                 
                 # Hardware Action: Doorbell Press
                 if msg.get("type") == "sensor_reading" and msg.get("sensor") == "doorbell_btn" and msg.get("state") == "pressed":
-                    if pipeline:
-                         pipeline.trigger_doorbell()
+                    trigger_doorbell(camera_id)
 
                 # Broadcast relevant sensor events to Frontends
                 if msg.get("type") in ["sensor_reading", "heartbeat"]:
-                    await manager.broadcast_json(msg)
+                    msg["camera_id"] = camera_id
+                    manager.broadcast_json(msg)
             except:
                 pass
     except WebSocketDisconnect:
@@ -204,65 +263,92 @@ async def sensor_websocket_endpoint(websocket: WebSocket):
 
 
 @app.get("/api/events")
-def get_events():
+def get_events(camera: Optional[str] = None):
     events = []
-    # glob all json in metadata
-    pattern = os.path.join(META_DIR, "*.json")
-    files = glob.glob(pattern)
-    
-    # Sort by time (filename usually has timestamp or check content)
-    # Filename: event_YYYYMMDD_HHMMSS_LEVEL.json
-    files.sort(key=os.path.getmtime, reverse=True)
-    
-    for f in files:
-        try:
-            with open(f, 'r') as json_file:
-                data = json.load(json_file)
-                # Add filename for reference
-                filename = os.path.basename(f)
-                
-                video_url = None
-                
-                # Method 1: Check by clip_id (UUID)
-                if "clip_id" in data:
-                    cid = data["clip_id"]
-                    if os.path.exists(os.path.join(CLIPS_DIR, f"{cid}.mp4")):
-                        video_url = f"/videos/{cid}.mp4"
-                    elif os.path.exists(os.path.join(CLIPS_DIR, f"{cid}.webm")):
-                        video_url = f"/videos/{cid}.webm"
-                        
-                # Method 2: Check by filename (Legacy/Fallback)
-                if not video_url:
-                    webm_name = filename.replace(".json", ".webm")
-                    mp4_name = filename.replace(".json", ".mp4")
-                    
-                    if os.path.exists(os.path.join(CLIPS_DIR, webm_name)):
-                         video_url = f"/videos/{webm_name}"
-                    elif os.path.exists(os.path.join(CLIPS_DIR, mp4_name)):
-                         video_url = f"/videos/{mp4_name}"
-                
-                if video_url:
-                     data["video_url"] = video_url
-                     # Check for thumbnail
-                     if "clip_id" in data:
-                         thumb_path = os.path.join(CLIPS_DIR, f"{data['clip_id']}.jpg")
-                         if os.path.exists(thumb_path):
-                             data["thumbnail_url"] = f"/videos/{data['clip_id']}.jpg"
-                     
-                     data["meta_filename"] = filename
-                     events.append(data)
-                elif "clip_id" in data: 
-                    # Even if video missing, return event if we have data? 
-                    # Frontend might break if no video_url. Let's skip for consistency with valid events only.
-                    # Or provide null?
-                    # The original logic skipped. Stick to skipping or maybe log warning.
-                    pass
-
-        except Exception as e:
-            print(f"Error loading {f}: {e}")
-            
+    # Served from the event index (most recently written first), no glob / parse per file
+    for filename, _, data in event_index.events(camera):
+        video_url = None
+
+        # Method 1: Check by clip_id (UUID)
+        if "clip_id" in data:
+            cid = data["clip_id"]
+            if os.path.exists(os.path.join(CLIPS_DIR, f"{cid}.mp4")):
+                video_url = f"/videos/{cid}.mp4"
+            elif os.path.exists(os.path.join(CLIPS_DIR, f"{cid}.webm")):
+                video_url = f"/videos/{cid}.webm"
+
+        # Method 2: Check by filename (Legacy/Fallback)
+        if not video_url:
+            webm_name = filename.replace(".json", ".webm")
+            mp4_name = filename.replace(".json", ".mp4")
+
+            if os.path.exists(os.path.join(CLIPS_DIR, webm_name)):
+                video_url = f"/videos/{webm_name}"
+            elif os.path.exists(os.path.join(CLIPS_DIR, mp4_name)):
+                video_url = f"/videos/{mp4_name}"
+
+        if video_url:
+            data["video_url"] = video_url
+            # Check for thumbnail
+            if "clip_id" in data:
+                thumb_path = os.path.join(CLIPS_DIR, f"{data['clip_id']}.jpg")
+                if os.path.exists(thumb_path):
+                    data["thumbnail_url"] = f"/videos/{data['clip_id']}.jpg"
+
+            data["meta_filename"] = filename
+            events.append(data)
+        elif data.get("playlist_url"):
+            # Segmented recording (in progress, or not concatenated)
+            data["video_url"] = None
+            data["meta_filename"] = filename
+            events.append(data)
+        # Events without any media are skipped, as before
+
     return events
 
+@app.get("/api/metrics")
+async def get_metrics():
+    data = metrics.snapshot()
+    data["ws_clients"] = manager.stats()
+    return data
+
+@app.get("/api/health")
+def get_health():
+    """
+    Inference worker health. Built from the workers.* metrics so it works whether
+    the pipeline runs in this process or its own (PIPELINE_MODE).
+    """
+    workers = {}
+    for key, value in metrics.snapshot().items():
+        if key.startswith("workers."):
+            _, name, field = key.split(".", 2)
+            workers.setdefault(name, {})[field] = value
+        elif key.startswith("cameras.") and ".workers." in key:
+            # Camera processes with their own models: cameras.<id>.workers.<name>.<field>
+            camera_id, rest = key[len("cameras."):].split(".workers.", 1)
+            name, field = rest.split(".", 1)
+            workers.setdefault(f"{camera_id}/{name}", {})[field] = value
+    healthy = bool(workers) and all(w.get("status") == "ok" for w in workers.values())
+    result = {
+        "status": "ok" if healthy else "degraded",
+        "pipeline_running": running,
+        "workers": workers
+    }
+    if isinstance(pipeline, CameraOrchestrator):
+        result["cameras"] = pipeline.status()
+    return result
+
+@app.get("/api/cameras")
+def list_cameras():
+    status = pipeline.status() if isinstance(pipeline, CameraOrchestrator) else {}
+    return {
+        "default": Config.DEFAULT_CAMERA,
+        "cameras": [
+            dict(status.get(camera_id, {"running": running and camera_id == Config.DEFAULT_CAMERA}), id=camera_id)
+            for camera_id in Config.CAMERAS
+        ]
+    }
+
 # Mounts for static serving
 # Must be after API routes to avoid intercepting them
 app.mount("/videos", StaticFiles(directory=CLIPS_DIR), name="videos")
@@ -284,87 +370,32 @@ def list_test_videos():
     
     return [os.path.basename(f) for f in files]
 
-replay_running = False
+replay = None # ReplayEngine while a test video is loaded
 
-def run_replay(filename):
-    global replay_running, latest_frame_data
-    
-    print(f"[REPLAY] Starting replay for {filename}")
-    
-    video_path = os.path.join(TEST_CLIPS_DIR, filename)
-    json_path = os.path.join(TEST_DATA_DIR, os.path.splitext(filename)[0] + ".json")
-    
-    if not os.path.exists(json_path):
-        print(f"[REPLAY] Error: JSON data not found for {filename}")
-        return
+class SeekRequest(BaseModel):
+    frame: Optional[int] = None
+    time_s: Optional[float] = None
 
-    try:
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-            
-        frames_data = data.get("frames", [])
-        fps = data.get("fps", 30.0)
-        dt = 1.0 / fps
-        
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"[REPLAY] Error: Could not open video {filename}")
-            return
-            
-        print(f"[REPLAY] Loaded {len(frames_data)} frames from JSON. FPS: {fps}")
-        
-        frame_idx = 0
-        total_frames = len(frames_data)
-        
-        while replay_running and cap.isOpened():
-            start_time = time.time()
-            
-            ret, frame = cap.read()
-            if not ret:
-                print("[REPLAY] Video ended. Stopping.")
-                replay_running = False
-                break
-            
-            if frame_idx % 100 == 0:
-                 print(f"[REPLAY] Frame {frame_idx}/{total_frames}")
-
-            # Get pre-computed metadata
-            meta = {}
-            if frame_idx < total_frames:
-                meta = frames_data[frame_idx]
-            else:
-                 # Should not happen if synced, but fallback
-                 meta = frames_data[-1] if frames_data else {}
-            
-            # Encode Frame
-            ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
-            if ret:
-                jpg_bytes = buffer.tobytes()
-                
-                # Update global latest_frame_data for the broadcast_loop to pick up
-                # Note: broadcast_loop sends whatever is in latest_frame_data
-                with data_lock:
-                    latest_frame_data = (jpg_bytes, meta)
-            
-            frame_idx += 1
-            
-            # Throttle
-            elapsed = time.time() - start_time
-            wait = dt - elapsed
-            if wait > 0:
-                time.sleep(wait)
-                
-        cap.release()
-        print("[REPLAY] Stopped.")
-        
-    except Exception as e:
-        print(f"[REPLAY] Error: {e}")
-        import traceback
-        traceback.print_exc()
+class SpeedRequest(BaseModel):
+    speed: float
+
+class StepRequest(BaseModel):
+    frames: int = 1
+
+def stop_replay():
+    global replay
+    if replay:
+        replay.stop()
+        replay = None
+
+def require_replay():
+    if not replay:
+        raise HTTPException(status_code=409, detail="No replay loaded")
+    return replay
 
 @app.post("/api/test/start")
 def start_simulation(request: TestStartRequest):
-    global pipeline, pipeline_thread, running, replay_running
+    global pipeline, pipeline_thread, running, replay
     
     filename = request.filename
     
@@ -381,54 +412,81 @@ def start_simulation(request: TestStartRequest):
             pipeline_thread.join()
     
     # 2. Stop existing Replay if any
-    if replay_running:
-         replay_running = False
-         # Wait a bit? Ideally we track the thread.
-         time.sleep(0.5)
+    stop_replay()
 
-    # 3. Start Replay Thread
-    replay_running = True
-    
-    # We use a separate thread for replay generation, 
-    # but we reuse the SAME broadcast_loop (it reads latest_frame_data).
-    # So run_replay just needs to update latest_frame_data.
-    
-    replay_thread = threading.Thread(target=run_replay, args=(filename,), daemon=True)
-    replay_thread.start()
+    # 3. Start Replay Engine (own thread, frames go through frame_handler -> broadcast_loop)
+    video_path = os.path.join(TEST_CLIPS_DIR, os.path.basename(filename))
+    data_path = os.path.join(TEST_DATA_DIR, os.path.splitext(os.path.basename(filename))[0] + ".ndjson")
+    try:
+        replay = ReplayEngine(video_path, data_path, on_frame=frame_handler)
+    except (FileNotFoundError, IOError) as e:
+        print(f"[REPLAY] Error: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
+    replay.start()
     
-    return {"status": "started", "mode": "replay", "file": filename}
+    return {"status": "started", "mode": "replay", "file": filename, **replay.status()}
 
 @app.post("/api/test/stop")
 def stop_simulation():
-    global replay_running
-    
     print(f"[SERVER] Stopping REPLAY.")
-    replay_running = False
+    stop_replay()
     # Do NOT restart webcam automatically.
     
     return {"status": "stopped", "source": "none"}
 
+@app.post("/api/test/pause")
+def pause_simulation():
+    require_replay().pause()
+    return replay.status()
+
+@app.post("/api/test/resume")
+def resume_simulation():
+    require_replay().resume()
+    return replay.status()
+
+@app.post("/api/test/seek")
+def seek_simulation(request: SeekRequest):
+    engine = require_replay()
+    if request.frame is not None:
+        target = request.frame
+    elif request.time_s is not None:
+        target = int(round(request.time_s * engine.fps))
+    else:
+        raise HTTPException(status_code=422, detail="frame or time_s required")
+    engine.seek(target)
+    return engine.status()
+
+@app.post("/api/test/speed")
+def set_simulation_speed(request: SpeedRequest):
+    engine = require_replay()
+    engine.set_speed(request.speed)
+    return engine.status()
+
+@app.post("/api/test/step")
+def step_simulation(request: StepRequest):
+    engine = require_replay()
+    engine.step(request.frames)
+    return engine.status()
+
+@app.get("/api/test/status")
+def simulation_status():
+    if not replay:
+        return {"state": "stopped"}
+    return replay.status()
+
 @app.post("/api/live/start")
 def start_live_feed():
-    global pipeline, pipeline_thread, running, replay_running
+    global pipeline, pipeline_thread, running
     
     print(f"[SERVER] Switching to LIVE Webcam.")
     
     # 1. Stop Replay if running
-    if replay_running:
-        replay_running = False
-        time.sleep(0.5)
+    stop_replay()
         
     # 2. Start Webcam Pipeline if not running
     if not running:
         running = True
-        pipeline = Pipeline(headless=True, no_logs=Config.NO_LOGS)
-        
-        def run_pipeline():
-            pipeline.run(input_source=0, headless=True, frame_callback=frame_handler)
-            
-        pipeline_thread = threading.Thread(target=run_pipeline, daemon=True)
-        pipeline_thread.start()
+        start_pipeline()
         return {"status": "started", "source": "webcam"}
     else:
         return {"status": "already_running", "source": "webcam"}
@@ -442,6 +500,13 @@ def submit_feedback(request: FeedbackRequest):
     from backend.core.learning import LearningSystem
     ls = LearningSystem()
     report = ls.process_feedback(request.event_id, request.feedback_type)
+    if "error" not in report:
+        publish_event({
+            "type": "event_update",
+            "action": "feedback_recorded",
+            "clip_id": request.event_id,
+            "changes": {"feedback": request.feedback_type}
+        })
     return report
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+import { useEffect, useRef } from 'react';
+
+// Fragmented MP4 live stream from /ws/video (backend/core/live_video.py), played
+// through Media Source Extensions. Signal metadata arrives as JSON keyed by the
+// presentation timestamp and is reported for the frame currently on screen.
+const VIDEO_WS_URL = 'ws://localhost:8000/ws/video';
+const MAX_LIVE_LAG_S = 1.5; // Jump to the live edge if playback falls further behind
+const KEEP_BUFFER_S = 20; // Trim older media from the SourceBuffer
+
+const LiveVideoPlayer = ({ onMetadata, onConnectionChange, className }) => {
+    const videoRef = useRef(null);
+
+    useEffect(() => {
+        const video = videoRef.current;
+        if (!video || !window.MediaSource) {
+            console.error("Media Source Extensions not supported");
+            return;
+        }
+
+        const mediaSource = new MediaSource();
+        video.src = URL.createObjectURL(mediaSource);
+
+        let sourceBuffer = null;
+        let mime = null;
+        const pending = []; // Segments waiting for the SourceBuffer ({ offset } marks a new stream)
+        const metaQueue = []; // [{ pts, metadata }] in pts order
+        let ptsOffset = 0; // The server restarted its encoder: its timestamps restart at zero
+        let frameCallback = null;
+        let closed = false;
+
+        const appendNext = () => {
+            if (!sourceBuffer || sourceBuffer.updating || pending.length === 0) return;
+            if (pending[0].offset !== undefined) {
+                // Place the new stream after what is already buffered
+                sourceBuffer.timestampOffset = pending.shift().offset;
+                appendNext();
+                return;
+            }
+            try {
+                sourceBuffer.appendBuffer(pending.shift());
+            } catch (e) {
+                if (e.name === 'QuotaExceededError' && video.currentTime > 1) {
+                    sourceBuffer.remove(0, video.currentTime - 1);
+                } else {
+                    console.error("Failed to append video segment", e);
+                }
+            }
+        };
+
+        const onUpdateEnd = () => {
+            const buffered = sourceBuffer.buffered;
+            if (buffered.length > 0) {
+                const end = buffered.end(buffered.length - 1);
+                // Stay close to live; dropped fragments leave gaps, skip over them
+                if (end - video.currentTime > MAX_LIVE_LAG_S || video.currentTime < buffered.start(buffered.length - 1)) {
+                    video.currentTime = Math.max(buffered.start(buffered.length - 1), end - 0.2);
+                }
+                const start = buffered.start(0);
+                if (!sourceBuffer.updating && video.currentTime - start > KEEP_BUFFER_S * 1.5) {
+                    sourceBuffer.remove(start, video.currentTime - KEEP_BUFFER_S);
+                    return;
+                }
+            }
+            appendNext();
+        };
+
+        mediaSource.addEventListener('sourceopen', () => {
+            if (mime) {
+                sourceBuffer = mediaSource.addSourceBuffer(mime);
+                sourceBuffer.addEventListener('updateend', onUpdateEnd);
+                appendNext();
+            }
+        });
+
+        // Report the metadata of the frame being shown
+        const reportMetadata = () => {
+            const t = video.currentTime;
+            let current = null;
+            while (metaQueue.length > 0 && metaQueue[0].pts <= t) {
+                current = metaQueue.shift();
+            }
+            if (current && onMetadata) onMetadata(current.metadata);
+        };
+        const scheduleFrameCallback = () => {
+            if (closed) return;
+            if (video.requestVideoFrameCallback) {
+                frameCallback = video.requestVideoFrameCallback(() => {
+                    reportMetadata();
+                    scheduleFrameCallback();
+                });
+            } else {
+                frameCallback = requestAnimationFrame(() => {
+                    reportMetadata();
+                    scheduleFrameCallback();
+                });
+            }
+        };
+        scheduleFrameCallback();
+
+        const ws = new WebSocket(VIDEO_WS_URL);
+        ws.binaryType = 'arraybuffer';
+
+        ws.onopen = () => onConnectionChange && onConnectionChange(true);
+        ws.onclose = () => onConnectionChange && onConnectionChange(false);
+
+        ws.onmessage = (event) => {
+            if (typeof event.data === 'string') {
+                try {
+                    const data = JSON.parse(event.data);
+                    if (data.type === 'video_init') {
+                        mime = data.mime;
+                        if (!MediaSource.isTypeSupported(mime)) {
+                            console.error(`Unsupported live video format: ${mime}`);
+                        } else if (mediaSource.readyState === 'open' && !sourceBuffer) {
+                            sourceBuffer = mediaSource.addSourceBuffer(mime);
+                            sourceBuffer.addEventListener('updateend', onUpdateEnd);
+                        }
+                    } else if (data.type === 'video_reset') {
+                        const buffered = sourceBuffer ? sourceBuffer.buffered : null;
+                        ptsOffset = buffered && buffered.length > 0 ? buffered.end(buffered.length - 1) : video.currentTime;
+                        pending.push({ offset: ptsOffset });
+                        metaQueue.length = 0;
+                    } else if (data.type === 'video_meta') {
+                        metaQueue.push({ pts: data.pts + ptsOffset, metadata: data.metadata });
+                        // Bounded: metadata for frames that were never shown
+                        if (metaQueue.length > 600) metaQueue.splice(0, metaQueue.length - 600);
+                    }
+                } catch (e) {
+                    console.error("Error parsing message", e);
+                }
+                return;
+            }
+
+            pending.push(event.data);
+            appendNext();
+            if (video.paused) video.play().catch(() => { });
+        };
+
+        return () => {
+            closed = true;
+            ws.close();
+            if (frameCallback !== null) {
+                if (video.cancelVideoFrameCallback) video.cancelVideoFrameCallback(frameCallback);
+                else cancelAnimationFrame(frameCallback);
+            }
+            URL.revokeObjectURL(video.src);
+        };
+    }, [onMetadata, onConnectionChange]);
+
+    return <video ref={videoRef} className={className} autoPlay muted playsInline />;
+};
+
+export default LiveVideoPlayer;
@@ -1,3 +1,4 @@
+import { useState, useEffect } from 'react';
 import { X, Check, ThumbsUp, ThumbsDown, Shield } from 'lucide-react';
 import { format } from 'date-fns';
 import clsx from 'clsx';
@@ -5,10 +6,61 @@ import { motion, AnimatePresence } from 'framer-motion';
 import toast from 'react-hot-toast';
 
 const VideoModal = ({ event, onClose }) => {
+    // Segmented playback (event still recording, or segments not concatenated)
+    const [segments, setSegments] = useState([]);
+    const [segIndex, setSegIndex] = useState(0);
+    const [waitingForSegment, setWaitingForSegment] = useState(false);
+    const [liveStatus, setLiveStatus] = useState(null);
+
+    useEffect(() => {
+        if (!event || event.video_url || !event.playlist_url) return;
+        let cancelled = false;
+        let timer = null;
+
+        const poll = async () => {
+            try {
+                const res = await fetch(`http://localhost:8000${event.playlist_url}`, { cache: 'no-store' });
+                const playlist = await res.json();
+                if (cancelled) return;
+                setSegments(playlist.segments);
+                setLiveStatus(playlist.status);
+                if (playlist.status === 'recording') timer = setTimeout(poll, 2000);
+            } catch (err) {
+                console.error("Failed to fetch playlist", err);
+                if (!cancelled) timer = setTimeout(poll, 2000);
+            }
+        };
+        poll();
+
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
+        };
+    }, [event]);
+
+    // Continue with the next segment once it has been written
+    useEffect(() => {
+        if (waitingForSegment && segIndex + 1 < segments.length) {
+            setSegIndex(segIndex + 1);
+            setWaitingForSegment(false);
+        }
+    }, [segments, segIndex, waitingForSegment]);
+
     if (!event) return null;
 
     const date = new Date(event.timestamp * 1000);
-    const videoSrc = `http://localhost:8000${event.video_url}`;
+    const videoSrc = event.video_url
+        ? `http://localhost:8000${event.video_url}`
+        : segments[segIndex] ? `http://localhost:8000${segments[segIndex].url}` : undefined;
+
+    const handleEnded = () => {
+        if (event.video_url) return;
+        if (segIndex + 1 < segments.length) {
+            setSegIndex(segIndex + 1);
+        } else {
+            setWaitingForSegment(true);
+        }
+    };
 
     const handleFeedback = async (type) => {
         try {
@@ -52,8 +104,14 @@ const VideoModal = ({ event, onClose }) => {
                             src={videoSrc}
                             controls
                             autoPlay
+                            onEnded={handleEnded}
                             className="max-w-full max-h-full"
                         />
+                        {liveStatus === 'recording' && (
+                            <span className="absolute top-4 left-4 bg-accent-red text-white px-3 py-1 rounded-full text-xs font-bold animate-pulse">
+                                RECORDING
+                            </span>
+                        )}
                         <button
                             onClick={onClose}
                             className="absolute top-4 right-4 p-2 bg-black/50 hover:bg-white/20 rounded-full text-white transition-colors"
@@ -101,7 +159,7 @@ const VideoModal = ({ event, onClose }) => {
                         <div className="grid grid-cols-2 gap-4 mb-8">
                             <div className="bg-slate-100 p-3 rounded-lg border border-border">
                                 <span className="text-xs text-secondary block mb-1">Max Intent</span>
-                                <span className="text-lg font-mono font-bold text-primary">{event.max_intent.toFixed(2)}</span>
+                                <span className="text-lg font-mono font-bold text-primary">{(event.max_intent ?? 0).toFixed(2)}</span>
                             </div>
                             <div className="bg-slate-100 p-3 rounded-lg border border-border">
                                 <span className="text-xs text-secondary block mb-1">Duration</span>
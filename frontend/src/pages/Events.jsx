@@ -1,24 +1,54 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import EventCard from '../components/EventCard';
 import VideoModal from '../components/VideoModal';
+import { isEventUpdate, applyEventUpdate, applyPendingUpdates } from '../utils/eventFeed';
+
+// Events-only socket: event_update messages, no frames or per-frame metadata
+const WS_URL = 'ws://localhost:8000/ws?tier=events';
 
 const Events = () => {
     const [events, setEvents] = useState([]);
     const [loading, setLoading] = useState(true);
     const [selectedEvent, setSelectedEvent] = useState(null);
+    // Event updates that arrive before the initial list is loaded
+    const pendingUpdates = useRef([]);
 
     useEffect(() => {
+        // Subscribe first so nothing is missed while the list loads
+        const ws = new WebSocket(WS_URL);
+        ws.onmessage = (event) => {
+            if (typeof event.data !== 'string') return;
+            try {
+                const data = JSON.parse(event.data);
+                if (!isEventUpdate(data)) return;
+                if (pendingUpdates.current) {
+                    pendingUpdates.current.push(data);
+                } else {
+                    setEvents(prev => applyEventUpdate(prev, data));
+                    // Keep an open modal in sync (e.g. recording finished, summary arrived)
+                    setSelectedEvent(prev => (prev && prev.clip_id === data.clip_id && data.action !== 'removed')
+                        ? { ...prev, ...data.changes } : prev);
+                }
+            } catch (e) {
+                console.error("Error parsing message", e);
+            }
+        };
+
         fetchEvents();
+        return () => ws.close();
     }, []);
 
     const fetchEvents = async () => {
         try {
             // Assuming backend is playing on 8000
             const res = await axios.get('http://localhost:8000/api/events');
-            setEvents(res.data);
+            setEvents(applyPendingUpdates(res.data, pendingUpdates.current || []));
+            pendingUpdates.current = null;
         } catch (error) {
             console.error("Failed to fetch events", error);
+            setEvents(applyPendingUpdates([], pendingUpdates.current || []));
+            pendingUpdates.current = null;
         } finally {
             setLoading(false);
         }
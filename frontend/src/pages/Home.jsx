@@ -8,33 +8,35 @@ import {
     Wifi,
     WifiOff,
     Activity,
-    ArrowRight
+    ArrowRight,
+    Cpu
 } from 'lucide-react';
 import { Link } from 'react-router-dom';
 import clsx from 'clsx';
 import EventCard from '../components/EventCard';
 import VideoModal from '../components/VideoModal';
 import toast from 'react-hot-toast';
+import { isEventUpdate, applyEventUpdate, applyPendingUpdates } from '../utils/eventFeed';
 
 // Mock Config
-const WS_URL = 'ws://localhost:8000/ws';
+// Metadata and events only: no JPEGs are encoded or sent for this socket
+const WS_URL = 'ws://localhost:8000/ws?tier=meta';
 
 const Home = () => {
     // State
     const [events, setEvents] = useState([]);
-    const [metrics, setMetrics] = useState({
-        totalVisits: 0,
-        threats: 0,
-        suspicious: 0
-    });
     const [liveIntent, setLiveIntent] = useState(0.0);
     const [isLocked, setIsLocked] = useState(true);
     const [isOnline, setIsOnline] = useState(true);
     const [selectedEvent, setSelectedEvent] = useState(null);
+    // Inference worker health (/api/health)
+    const [health, setHealth] = useState(null);
 
     // WebSocket for Live Intent
     const ws = useRef(null);
     const lastAlertTime = useRef(0);
+    // Event updates that arrive before the initial list is loaded
+    const pendingUpdates = useRef([]);
 
     // Hardware State
     const [hwStatus, setHwStatus] = useState({
@@ -50,19 +52,14 @@ const Home = () => {
         fetch('http://localhost:8000/api/events')
             .then(res => res.json())
             .then(data => {
-                setEvents(data);
-
-                // Calculate Metrics
-                const threats = data.filter(e => e.final_level === 'THREAT' || e.trigger_level === 'THREAT').length;
-                const suspicious = data.filter(e => e.final_level === 'SUSPICIOUS' || e.trigger_level === 'SUSPICIOUS').length;
-
-                setMetrics({
-                    totalVisits: data.length,
-                    threats,
-                    suspicious
-                });
+                setEvents(applyPendingUpdates(data, pendingUpdates.current));
+                pendingUpdates.current = null;
             })
-            .catch(err => console.error("Failed to fetch events:", err));
+            .catch(err => {
+                console.error("Failed to fetch events:", err);
+                setEvents(applyPendingUpdates([], pendingUpdates.current));
+                pendingUpdates.current = null;
+            });
 
         // Connect WebSocket
         ws.current = new WebSocket(WS_URL);
@@ -75,6 +72,17 @@ const Home = () => {
         ws.current.onmessage = (event) => {
             try {
                 const data = JSON.parse(event.data);
+
+                // Event list changes (new clip, thumbnail, summary, ...)
+                if (isEventUpdate(data)) {
+                    if (pendingUpdates.current) {
+                        pendingUpdates.current.push(data);
+                    } else {
+                        setEvents(prev => applyEventUpdate(prev, data));
+                    }
+                    return;
+                }
+
                 // Expecting metadata frame
                 if (data.intent_score !== undefined) {
                     setLiveIntent(data.intent_score);
@@ -125,6 +133,28 @@ const Home = () => {
         };
     }, []);
 
+    // Poll inference health: a crashed or hung model worker must be visible
+    useEffect(() => {
+        const fetchHealth = () => fetch('http://localhost:8000/api/health')
+            .then(res => res.json())
+            .then(setHealth)
+            .catch(() => setHealth(null));
+        fetchHealth();
+        const timer = setInterval(fetchHealth, 5000);
+        return () => clearInterval(timer);
+    }, []);
+
+    const degradedWorkers = health
+        ? Object.entries(health.workers).filter(([, w]) => w.status !== 'ok').map(([name, w]) => `${name}: ${w.status}`)
+        : [];
+
+    // Metrics follow the (push-updated) event list
+    const metrics = {
+        totalVisits: events.length,
+        threats: events.filter(e => e.final_level === 'THREAT' || e.trigger_level === 'THREAT').length,
+        suspicious: events.filter(e => e.final_level === 'SUSPICIOUS' || e.trigger_level === 'SUSPICIOUS').length
+    };
+
     // Helper for Intent Color
     const getIntentColor = (score) => {
         if (score > 0.8) return "text-accent-red";
@@ -177,6 +207,27 @@ const Home = () => {
                         <Activity size={18} className={clsx(hwStatus.online && "animate-pulse")} />
                         <span>{hwStatus.online ? "ESP8266 Online" : "No Sensors"}</span>
                     </div>
+
+                    {/* Inference Health */}
+                    <div
+                        className={clsx(
+                            "flex items-center gap-2 px-4 py-2 rounded-lg font-medium border transition-colors",
+                            health?.status === 'ok'
+                                ? "bg-emerald-50 text-emerald-700 border-emerald-200"
+                                : "bg-red-50 text-accent-red border-red-200"
+                        )}
+                        title={health
+                            ? Object.entries(health.workers).map(([name, w]) =>
+                                `${name}: ${w.status}${w.latency_ms !== undefined ? `, ${w.latency_ms.toFixed(0)} ms` : ''}, ${w.restarts ?? 0} restarts`).join('\n')
+                            : "Health unavailable"}
+                    >
+                        <Cpu size={18} />
+                        <span>
+                            {!health ? "Models Unknown"
+                                : health.status === 'ok' ? "Models OK"
+                                    : `Degraded (${degradedWorkers.join(', ') || 'no workers'})`}
+                        </span>
+                    </div>
                 </div>
             </div>
 
@@ -2,20 +2,40 @@ import { useState, useEffect, useRef } from 'react';
 import { AlertTriangle, Shield, Activity, Wifi, WifiOff } from 'lucide-react';
 import clsx from 'clsx';
 import axios from 'axios';
+import { decodeFrame } from '../utils/frameProtocol';
+import LiveVideoPlayer from '../components/LiveVideoPlayer';
 
 const Live = () => {
     const [connected, setConnected] = useState(false);
     const [imgSrc, setImgSrc] = useState(null);
     const [metadata, setMetadata] = useState(null);
+    // 'jpeg': per-frame JPEG over /ws, 'video': H.264 over /ws/video (far less bandwidth)
+    const [mode, setMode] = useState('jpeg');
+    // Camera ids from /api/cameras; null until loaded (server default)
+    const [cameras, setCameras] = useState([]);
+    const [camera, setCamera] = useState(null);
     const wsRef = useRef(null);
     const imgRef = useRef(null);
+    const schemaRef = useRef(null);
 
     useEffect(() => {
         // Force server to Live Webcam mode on mount
         axios.post('http://localhost:8000/api/live/start').catch(e => console.error("Failed to switch to live mode", e));
+        axios.get('http://localhost:8000/api/cameras')
+            .then(res => {
+                setCameras(res.data.cameras.map(c => c.id));
+                setCamera(res.data.default);
+            })
+            .catch(e => console.error("Failed to load cameras", e));
+    }, []);
+
+    useEffect(() => {
+        if (mode !== 'jpeg') return;
 
-        // Connect to WebSocket
-        const ws = new WebSocket('ws://localhost:8000/ws');
+        // Connect to WebSocket (binary protocol: one message per frame)
+        const cameraParam = camera ? `&camera=${encodeURIComponent(camera)}` : '';
+        const ws = new WebSocket(`ws://localhost:8000/ws?protocol=binary${cameraParam}`);
+        ws.binaryType = 'arraybuffer';
         wsRef.current = ws;
 
         ws.onopen = () => {
@@ -28,39 +48,30 @@ const Live = () => {
             setConnected(false);
         };
 
-        ws.onmessage = async (event) => {
-            // Check data type
-            if (event.data instanceof Blob) {
-                // It's a frame
-                // console.log("Blob size:", event.data.size);
-                const url = URL.createObjectURL(event.data);
-
-                // Revoke previous URL to avoid memory leak
-                if (imgRef.current) {
-                    // We can't revoke immediately if it hasn't rendered?
-                    // Actually React state update is async.
-                    // Better: raw DOM manipulation for high freq video?
-                    // Or just rely on browser GC if we use one object URL?
-                    // Let's use simple state for now, but revoke inside the setter?
-                    // No, "previous" state is hard to get synchronously here.
-                    // Let's try direct ref update for image src to avoid React render cycle overhead for frames
-                    if (imgRef.current.src && imgRef.current.src.startsWith('blob:')) {
-                        URL.revokeObjectURL(imgRef.current.src);
-                    }
-                    imgRef.current.src = url;
-                }
-            } else {
-                // It's JSON metadata
+        ws.onmessage = (event) => {
+            if (typeof event.data === 'string') {
+                // JSON: schema (once at connect) or notifications
                 try {
                     const data = JSON.parse(event.data);
-                    // Only update if it's a full frame metadata packet
-                    if (data.signals) {
-                        setMetadata(data);
-                    }
+                    if (data.type === 'schema') schemaRef.current = data;
                 } catch (e) {
-                    console.error("Error parsing metadata", e);
+                    console.error("Error parsing message", e);
+                }
+                return;
+            }
+
+            const frame = decodeFrame(event.data, schemaRef.current);
+            if (!frame) return;
+
+            // Direct ref update for image src to avoid React render cycle overhead for frames
+            // jpeg is null when the image did not change since the last frame
+            if (imgRef.current && frame.jpeg) {
+                if (imgRef.current.src && imgRef.current.src.startsWith('blob:')) {
+                    URL.revokeObjectURL(imgRef.current.src);
                 }
+                imgRef.current.src = URL.createObjectURL(frame.jpeg);
             }
+            setMetadata(frame.metadata);
         };
 
         return () => {
@@ -68,7 +79,7 @@ const Live = () => {
                 wsRef.current.close();
             }
         };
-    }, []);
+    }, [mode, camera]);
 
     const intentScore = metadata?.intent_score || 0;
     const threatLevel = metadata?.threat_level || "WAITING";
@@ -83,7 +94,14 @@ const Live = () => {
         <div className="flex h-[calc(100vh-theme(spacing.24))] gap-6">
             {/* Main Video Feed */}
             <div className="flex-1 bg-black rounded-2xl overflow-hidden relative border border-border flex items-center justify-center">
-                {connected ? (
+                {mode === 'video' && (
+                    <LiveVideoPlayer
+                        className={clsx("w-full h-full object-contain", !connected && "hidden")}
+                        onMetadata={setMetadata}
+                        onConnectionChange={setConnected}
+                    />
+                )}
+                {mode === 'video' && connected ? null : connected ? (
                     <img
                         ref={imgRef}
                         alt="Live Stream"
@@ -105,6 +123,22 @@ const Live = () => {
                         <div className={clsx("w-2 h-2 rounded-full", connected ? "bg-accent-green" : "bg-red-500")} />
                         {connected ? "LIVE" : "OFFLINE"}
                     </span>
+                    <button
+                        onClick={() => { setConnected(false); setMode(mode === 'jpeg' ? 'video' : 'jpeg'); }}
+                        className="px-3 py-1 rounded-full text-xs font-bold shadow-sm bg-white/90 text-secondary hover:text-primary"
+                    >
+                        {mode === 'jpeg' ? "JPEG" : "H.264"}
+                    </button>
+                    {/* H.264 (/ws/video) only carries the default camera */}
+                    {mode === 'jpeg' && cameras.length > 1 && (
+                        <select
+                            value={camera || ''}
+                            onChange={(e) => { setConnected(false); setCamera(e.target.value); }}
+                            className="px-3 py-1 rounded-full text-xs font-bold shadow-sm bg-white/90 text-secondary"
+                        >
+                            {cameras.map(id => <option key={id} value={id}>{formatName(id)}</option>)}
+                        </select>
+                    )}
                     {metadata?.signals?.weapon_score > 0.6 && (
                         <span className="bg-accent-red text-white px-3 py-1 rounded-full text-xs font-bold flex items-center gap-2 shadow-sm animate-pulse">
                             <AlertTriangle size={14} /> WEAPON DETECTED
@@ -1,7 +1,8 @@
 import { useState, useEffect, useRef } from 'react';
-import { Play, Square, Film, Activity, Shield, Wifi, AlertTriangle } from 'lucide-react';
+import { Play, Pause, Square, SkipBack, SkipForward, Film, Activity, Shield, Wifi, AlertTriangle } from 'lucide-react';
 import axios from 'axios';
 import clsx from 'clsx';
+import { decodeFrame } from '../utils/frameProtocol';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 
 const Test = () => {
@@ -11,9 +12,11 @@ const Test = () => {
     const [metadata, setMetadata] = useState(null);
     const [connected, setConnected] = useState(false);
     const [history, setHistory] = useState([]);
+    const [replayStatus, setReplayStatus] = useState(null); // /api/test/status
 
     const wsRef = useRef(null);
     const imgRef = useRef(null);
+    const schemaRef = useRef(null);
     const historyRef = useRef([]); // Use ref for performance to avoid dependency loops in effect
 
     // Fetch Videos on Mount
@@ -35,43 +38,51 @@ const Test = () => {
 
     // WebSocket Connection
     useEffect(() => {
-        const ws = new WebSocket('ws://localhost:8000/ws');
+        const ws = new WebSocket('ws://localhost:8000/ws?protocol=binary');
+        ws.binaryType = 'arraybuffer';
         wsRef.current = ws;
 
         ws.onopen = () => setConnected(true);
         ws.onclose = () => setConnected(false);
 
-        ws.onmessage = async (event) => {
-            if (event.data instanceof Blob) {
-                const url = URL.createObjectURL(event.data);
-                if (imgRef.current) {
-                    if (imgRef.current.src && imgRef.current.src.startsWith('blob:')) {
-                        URL.revokeObjectURL(imgRef.current.src);
-                    }
-                    imgRef.current.src = url;
-                }
-            } else {
+        ws.onmessage = (event) => {
+            if (typeof event.data === 'string') {
                 try {
                     const data = JSON.parse(event.data);
-                    setMetadata(data);
-                    // Update History
-                    const now = new Date().toLocaleTimeString();
-                    const point = {
-                        time: now,
-                        intent: data.intent_score,
-                        threat: data.threat_level === "THREAT" ? 1.0 : data.threat_level === "SUSPICIOUS" ? 0.5 : 0.0,
-                        ...data.signals
-                    };
-
-                    // Keep last 100 points
-                    const newHistory = [...historyRef.current, point].slice(-100);
-                    historyRef.current = newHistory;
-                    setHistory(newHistory);
-
+                    if (data.type === 'schema') schemaRef.current = data;
                 } catch (e) {
-                    console.error("Error parsing metadata", e);
+                    console.error("Error parsing message", e);
                 }
+                return;
             }
+
+            const frame = decodeFrame(event.data, schemaRef.current);
+            if (!frame) return;
+
+            // jpeg is null when the image did not change since the last frame
+            if (imgRef.current && frame.jpeg) {
+                if (imgRef.current.src && imgRef.current.src.startsWith('blob:')) {
+                    URL.revokeObjectURL(imgRef.current.src);
+                }
+                imgRef.current.src = URL.createObjectURL(frame.jpeg);
+            }
+
+            // Metadata and frame now arrive together, so they can never be mismatched
+            const data = frame.metadata;
+            setMetadata(data);
+            // Update History
+            const now = new Date().toLocaleTimeString();
+            const point = {
+                time: now,
+                intent: data.intent_score,
+                threat: data.threat_level === "THREAT" ? 1.0 : data.threat_level === "SUSPICIOUS" ? 0.5 : 0.0,
+                ...data.signals
+            };
+
+            // Keep last 100 points
+            const newHistory = [...historyRef.current, point].slice(-100);
+            historyRef.current = newHistory;
+            setHistory(newHistory);
         };
 
         return () => {
@@ -79,6 +90,29 @@ const Test = () => {
         };
     }, []);
 
+    // Replay position / state (seek bar, pause button)
+    useEffect(() => {
+        if (!simulating) return;
+        const timer = setInterval(async () => {
+            try {
+                const res = await axios.get('http://localhost:8000/api/test/status');
+                setReplayStatus(res.data);
+            } catch (e) {
+                console.error("Failed to fetch replay status", e);
+            }
+        }, 500);
+        return () => clearInterval(timer);
+    }, [simulating]);
+
+    const replayControl = async (action, body = {}) => {
+        try {
+            const res = await axios.post(`http://localhost:8000/api/test/${action}`, body);
+            setReplayStatus(res.data);
+        } catch (e) {
+            console.error(`Replay ${action} failed`, e);
+        }
+    };
+
     const handleStart = async () => {
         if (!selectedVideo) return;
         try {
@@ -94,6 +128,7 @@ const Test = () => {
             await axios.post('http://localhost:8000/api/test/stop');
             setSimulating(false);
             setMetadata(null);
+            setReplayStatus(null);
         } catch (e) {
             console.error("Failed to stop simulation", e);
         }
@@ -173,6 +208,47 @@ const Test = () => {
                                     <Square size={14} fill="currentColor" /> Stop
                                 </button>
                             </div>
+
+                            {/* Replay transport: pause / step / speed / seek */}
+                            {simulating && replayStatus && replayStatus.state !== 'stopped' && (
+                                <div className="flex flex-col gap-2">
+                                    <input
+                                        type="range"
+                                        min={0}
+                                        max={Math.max(replayStatus.frame_count - 1, 0)}
+                                        value={Math.max(replayStatus.frame, 0)}
+                                        onChange={(e) => replayControl('seek', { frame: Number(e.target.value) })}
+                                        className="w-full"
+                                    />
+                                    <div className="flex items-center justify-between gap-2">
+                                        <div className="flex gap-1">
+                                            <button onClick={() => replayControl('step', { frames: -1 })} className="p-2 rounded-lg bg-slate-100 hover:bg-slate-200" title="Previous frame">
+                                                <SkipBack size={14} />
+                                            </button>
+                                            <button
+                                                onClick={() => replayControl(replayStatus.state === 'playing' ? 'pause' : 'resume')}
+                                                className="p-2 rounded-lg bg-slate-100 hover:bg-slate-200"
+                                                title={replayStatus.state === 'playing' ? "Pause" : "Resume"}
+                                            >
+                                                {replayStatus.state === 'playing' ? <Pause size={14} /> : <Play size={14} />}
+                                            </button>
+                                            <button onClick={() => replayControl('step', { frames: 1 })} className="p-2 rounded-lg bg-slate-100 hover:bg-slate-200" title="Next frame">
+                                                <SkipForward size={14} />
+                                            </button>
+                                        </div>
+                                        <select
+                                            className="p-1.5 rounded-lg border border-border bg-slate-50 text-xs font-medium"
+                                            value={replayStatus.speed}
+                                            onChange={(e) => replayControl('speed', { speed: Number(e.target.value) })}
+                                        >
+                                            {[0.25, 0.5, 1, 2, 4, 8, 16].map(v => <option key={v} value={v}>{v}x</option>)}
+                                        </select>
+                                        <span className="text-xs font-mono text-secondary">
+                                            {replayStatus.time_s.toFixed(1)}s / {replayStatus.duration_s.toFixed(1)}s
+                                        </span>
+                                    </div>
+                                </div>
+                            )}
                         </div>
                     </div>
 
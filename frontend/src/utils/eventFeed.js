@@ -0,0 +1,28 @@
+// Incremental event list updates pushed on /ws (backend EventLogger._publish):
+//   { type: "event_update", action, clip_id, changes }
+// action: recording_started | thumbnail_ready | clip_saved | summary_attached |
+//         feedback_recorded | removed
+// `changes` only holds new or changed fields; merge them into the entry with the
+// same clip_id. The list is fetched once from /api/events, never refetched.
+
+export const isEventUpdate = (msg) => msg && msg.type === 'event_update' && msg.clip_id;
+
+export const applyEventUpdate = (events, msg) => {
+    if (msg.action === 'removed') {
+        return events.filter(e => e.clip_id !== msg.clip_id);
+    }
+
+    const idx = events.findIndex(e => e.clip_id === msg.clip_id);
+    if (idx === -1) {
+        // New event: newest first, like /api/events
+        return [{ clip_id: msg.clip_id, ...msg.changes }, ...events];
+    }
+
+    const next = events.slice();
+    next[idx] = { ...next[idx], ...msg.changes };
+    return next;
+};
+
+// Updates received before the initial fetch resolves are applied on top of it
+export const applyPendingUpdates = (events, pending) =>
+    pending.reduce((list, msg) => applyEventUpdate(list, msg), events);
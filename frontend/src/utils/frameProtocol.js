@@ -0,0 +1,46 @@
+// Decoder for the binary live-frame format (backend/core/frame_protocol.py).
+// Connect with `/ws?protocol=binary` and set `ws.binaryType = 'arraybuffer'`.
+// The server sends a JSON schema message once, then one binary message per frame:
+//   magic "DBF" | version u8 | schema_id u32 | seq u32 | timestamp f64 |
+//   intent f32 | level u8 | n_signals u16 | float32[n_signals] | JPEG bytes
+// An empty JPEG payload means the image is unchanged: keep showing the previous one.
+// Pick a smaller stream with `&tier=480p` / `&tier=240p` (Config.STREAM_TIERS).
+
+const MAGIC = [0x44, 0x42, 0x46]; // "DBF"
+const HEADER_BYTES = 27;
+
+export const decodeFrame = (buffer, schema) => {
+    const view = new DataView(buffer);
+    if (buffer.byteLength < HEADER_BYTES ||
+        view.getUint8(0) !== MAGIC[0] || view.getUint8(1) !== MAGIC[1] || view.getUint8(2) !== MAGIC[2]) {
+        return null;
+    }
+
+    const version = view.getUint8(3);
+    const schemaId = view.getUint32(4, true);
+    // A different version may lay the header out differently: don't guess
+    if (!schema || version !== schema.version || schemaId !== schema.schema_id) return null;
+
+    const levelIdx = view.getUint8(24);
+    const count = view.getUint16(25, true);
+
+    const signals = {};
+    let offset = HEADER_BYTES;
+    for (let i = 0; i < count; i++) {
+        const val = view.getFloat32(offset, true);
+        if (!Number.isNaN(val)) signals[schema.signals[i]] = val;
+        offset += 4;
+    }
+
+    return {
+        version,
+        seq: view.getUint32(8, true),
+        timestamp: view.getFloat64(12, true),
+        metadata: {
+            intent_score: view.getFloat32(20, true),
+            threat_level: schema.levels[levelIdx] ?? "UNKNOWN",
+            signals
+        },
+        jpeg: offset < buffer.byteLength ? new Blob([buffer.slice(offset)], { type: 'image/jpeg' }) : null
+    };
+};
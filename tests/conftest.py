@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Project root, so "backend.*" imports work however pytest is invoked
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
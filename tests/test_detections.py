@@ -0,0 +1,87 @@
+"""
+postprocess_yolo / nms against the previous transpose + cv2.dnn.NMSBoxes path
+on fixed synthetic YOLOv8 outputs.
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+IMG_SIZE = 640
+CLASSES = ["gun", "knife"]
+CONF, IOU = 0.5, 0.45
+ANCHORS = 16
+
+
+def _output(*frames):
+    """[N, 4 + classes, anchors]; each frame is a list of (cx, cy, w, h, class_id, score)."""
+    out = np.zeros((len(frames), 4 + len(CLASSES), ANCHORS), dtype=np.float32)
+    out[:, 2:4] = 10.0
+    for i, boxes in enumerate(frames):
+        for anchor, (cx, cy, w, h, class_id, score) in enumerate(boxes):
+            out[i, :4, anchor] = (cx, cy, w, h)
+            out[i, 4 + class_id, anchor] = score
+    return out
+
+
+# One class: class-aware and class-agnostic NMS must agree
+SINGLE_CLASS = [
+    (100, 100, 80, 80, 0, 0.9),
+    (104, 102, 80, 80, 0, 0.8), # Suppressed by the first
+    (300, 300, 60, 60, 0, 0.7),
+    (302, 298, 60, 60, 0, 0.6), # Suppressed by the third
+    (500, 100, 50, 50, 0, 0.3) # Below the confidence threshold
+]
+# Same place, different classes: only same-class boxes suppress each other
+TWO_CLASSES = [
+    (100, 100, 80, 80, 0, 0.9),
+    (102, 101, 80, 80, 1, 0.8),
+    (103, 100, 80, 80, 1, 0.7) # Suppressed by the class 1 box only
+]
+
+
+def _as_tuples(dets):
+    return sorted((tuple(int(v) for v in d["box"]), round(float(d["score"]), 5), int(d["class_id"])) for d in dets)
+
+
+def test_matches_legacy_nms():
+    from backend.benchmarks.yolo_postprocess import legacy_postprocess
+    from backend.core.detections import postprocess_yolo
+    out = _output(SINGLE_CLASS)
+    height, width = 720, 1280
+
+    legacy = legacy_postprocess([out[0:1]], width, height, IMG_SIZE, CONF, IOU, CLASSES)
+    (new,) = postprocess_yolo(out, [(height, width)], IMG_SIZE, CONF, IOU)
+
+    assert len(new) == len(legacy) == 2
+    assert _as_tuples(new) == sorted((tuple(d["box"]), round(d["score"], 5), 0) for d in legacy)
+    assert list(new["score"]) == sorted(new["score"], reverse=True)
+
+
+def test_class_aware_suppression():
+    from backend.core.detections import postprocess_yolo
+    (dets,) = postprocess_yolo(_output(TWO_CLASSES), [(IMG_SIZE, IMG_SIZE)], IMG_SIZE, CONF, IOU)
+    assert sorted((int(d["class_id"]), round(float(d["score"]), 5)) for d in dets) == [(0, 0.9), (1, 0.8)]
+
+
+def test_batch_matches_single_frames():
+    from backend.core.detections import postprocess_yolo, DETECTION_DTYPE
+    frames = [SINGLE_CLASS, TWO_CLASSES, []]
+    sizes = [(720, 1280), (480, 640), (1080, 1920)]
+    batched = postprocess_yolo(_output(*frames), sizes, IMG_SIZE, CONF, IOU)
+
+    assert len(batched) == 3
+    for boxes, size, dets in zip(frames, sizes, batched):
+        (single,) = postprocess_yolo(_output(boxes), [size], IMG_SIZE, CONF, IOU)
+        assert dets.dtype == DETECTION_DTYPE
+        assert _as_tuples(dets) == _as_tuples(single)
+    assert len(batched[2]) == 0
+
+
+def test_empty():
+    from backend.core.detections import postprocess_yolo, nms, DETECTION_DTYPE
+    out = _output([(100, 100, 80, 80, 0, 0.2)], [])
+    result = postprocess_yolo(out, [(480, 640)] * 2, IMG_SIZE, CONF, IOU)
+    assert len(result) == 2
+    assert all(len(d) == 0 and d.dtype == DETECTION_DTYPE for d in result)
+    assert len(nms(np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), IOU)) == 0
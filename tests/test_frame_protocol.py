@@ -0,0 +1,75 @@
+"""
+Binary live-frame format: header layout (what frameProtocol.js reads at fixed
+offsets) and pack / unpack round trips.
+"""
+import math
+import struct
+import pytest
+
+np = pytest.importorskip("numpy")
+
+SIGNALS = ["loitering", "face_hidden", "weapon_score"]
+
+
+def _schema():
+    from backend.core.frame_protocol import FrameSchema
+    return FrameSchema(SIGNALS)
+
+
+def test_header_layout_matches_js_offsets():
+    from backend.core.frame_protocol import HEADER, FRAME_VERSION
+    schema = _schema()
+    data = schema.pack(7, 1234.5, {"intent_score": 0.25, "threat_level": "SUSPICIOUS",
+                                   "signals": {"face_hidden": 1.0}}, b"\xff\xd8jpg")
+
+    assert HEADER.size == 27 == schema.describe()["header_bytes"]
+    assert data[0:3] == b"DBF"
+    assert data[3] == FRAME_VERSION
+    assert struct.unpack_from("<I", data, 4)[0] == schema.schema_id
+    assert struct.unpack_from("<I", data, 8)[0] == 7
+    assert struct.unpack_from("<d", data, 12)[0] == 1234.5
+    assert struct.unpack_from("<f", data, 20)[0] == 0.25
+    assert data[24] == 2 # SUSPICIOUS
+    assert struct.unpack_from("<H", data, 25)[0] == len(SIGNALS)
+    assert len(data) == 27 + 4 * len(SIGNALS) + 5
+
+
+def test_round_trip():
+    schema = _schema()
+    metadata = {"intent_score": 0.75, "threat_level": "THREAT",
+                "signals": {"loitering": 0.5, "weapon_score": 0.125, "not_in_schema": 3.0}}
+    frame = schema.unpack(schema.pack(42, 99.0, metadata, b"jpeg-bytes"))
+
+    assert frame["seq"] == 42 and frame["timestamp"] == 99.0
+    assert frame["metadata"]["intent_score"] == 0.75
+    assert frame["metadata"]["threat_level"] == "THREAT"
+    # Missing signals travel as NaN and are left out on decode
+    assert frame["metadata"]["signals"] == {"loitering": 0.5, "weapon_score": 0.125}
+    assert frame["jpeg"] == b"jpeg-bytes"
+
+
+def test_missing_values_and_empty_payload():
+    from backend.core.frame_protocol import UNKNOWN_LEVEL
+    schema = _schema()
+    data = schema.pack(2 ** 32 + 3, 1.0, {}, b"")
+
+    assert data[24] == UNKNOWN_LEVEL
+    assert math.isnan(struct.unpack_from("<f", data, 20)[0])
+    frame = schema.unpack(data)
+    assert frame["seq"] == 3 # Wraps at 32 bits
+    assert frame["metadata"]["signals"] == {}
+    assert frame["metadata"]["threat_level"] == "UNKNOWN"
+    assert math.isnan(frame["metadata"]["intent_score"])
+    assert frame["jpeg"] == b"" # Image unchanged
+
+
+def test_rejects_other_version_or_schema():
+    from backend.core.frame_protocol import FrameSchema
+    schema = _schema()
+    data = bytearray(schema.pack(1, 1.0, {}, b""))
+    other = FrameSchema(SIGNALS[:2])
+    assert other.unpack(bytes(data)) is None
+
+    data[3] += 1
+    assert schema.unpack(bytes(data)) is None
+    assert schema.unpack(bytes(data[:10])) is None
@@ -0,0 +1,82 @@
+"""
+Smoke tests for cameras in their own (spawned) processes sharing the
+inference servers.
+"""
+import os
+import time
+import threading
+import multiprocessing
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from conftest import ROOT
+
+
+def _client_main(clients, done):
+    """Spawned child: what a camera process does with its inference clients."""
+    frame = np.full((48, 64, 3), 7, dtype=np.uint8)
+    clients["violence"].process_frame(frame)
+    clients["weapon"].process_frame(frame)
+    done.set()
+
+
+def test_stream_clients_survive_spawn():
+    from backend.core.inference_server import InferenceChannels, InferenceClient, StreamSlot
+    from backend.core.pipeline_host import SharedFrameSlot
+
+    ctx = multiprocessing.get_context("spawn")
+    channels = {name: InferenceChannels(max_streams=2) for name in ("violence", "weapon")}
+    slot = SharedFrameSlot(create=True)
+    try:
+        writer = StreamSlot(slot.name)
+        clients = {name: InferenceClient(0, channels[name], writer) for name in channels}
+        done = ctx.Event()
+        proc = ctx.Process(target=_client_main, args=(clients, done))
+        proc.start() # Raised "SemLock created in a fork context" before
+        assert done.wait(timeout=30)
+        proc.join(timeout=10)
+        assert proc.exitcode == 0
+
+        for name in channels:
+            assert channels[name].requests.get(timeout=5) == ("frame", 0)
+        _, frame, _ = slot.read()
+        assert frame.shape == (48, 64, 3) and int(frame[0, 0, 0]) == 7
+    finally:
+        slot.close()
+
+
+def test_two_synthetic_cameras(monkeypatch):
+    for module in ("mediapipe", "onnxruntime"):
+        pytest.importorskip(module)
+    from backend.config.config import Config
+    for path in (Config.MODEL_PATH, Config.MOVINET_MODEL_PATH, Config.WEAPON_MODEL_PATH):
+        if not os.path.exists(os.path.join(ROOT, path)):
+            pytest.skip(f"model {path} not available")
+    monkeypatch.chdir(ROOT)
+
+    from backend.core.model_pool import shutdown_model_pool
+    from backend.core.orchestrator import CameraOrchestrator
+
+    cameras = {
+        "cam_a": {"source": "synthetic://320x240@10", "cpus": None},
+        "cam_b": {"source": "synthetic://320x240@10", "cpus": None}
+    }
+    seen = set()
+    both = threading.Event()
+
+    def on_frame(frame, metadata, camera_id):
+        seen.add(camera_id)
+        if seen == set(cameras):
+            both.set()
+
+    orchestrator = CameraOrchestrator(on_frame=on_frame, cameras=cameras, no_logs=True)
+    try:
+        orchestrator.start()
+        assert both.wait(timeout=120), f"frames only from {sorted(seen)}"
+        status = orchestrator.status()
+        assert all(status[camera_id]["running"] for camera_id in cameras)
+    finally:
+        orchestrator.stop()
+        shutdown_model_pool()
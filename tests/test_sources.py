@@ -0,0 +1,138 @@
+"""
+MjpegSource against a local HTTP stand-in serving multipart JPEGs.
+"""
+import time
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+BOUNDARY = b"frame"
+WIDTH, HEIGHT = 64, 48
+
+
+def _jpeg(w, h, value):
+    frame = np.full((h, w, 3), value, dtype=np.uint8)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def _with_thumbnail(jpg):
+    """Embed a second JPEG in an APPn segment, as EXIF thumbnails are: its EOI comes first."""
+    thumb = _jpeg(8, 8, 200)
+    return jpg[:2] + b"\xff\xe3" + struct.pack(">H", len(thumb) + 2) + thumb + jpg[2:]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    jpeg = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        # /len: Content-Length per part, /nolen: none, /drop: closes after two frames
+        self.server.connections += 1
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY.decode()}")
+        self.end_headers()
+        count = 2 if self.path == "/drop" else 200
+        try:
+            for _ in range(count):
+                headers = b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+                if self.path != "/nolen":
+                    headers += f"Content-Length: {len(self.jpeg)}\r\n".encode()
+                self.wfile.write(headers + b"\r\n" + self.jpeg + b"\r\n")
+                time.sleep(0.02)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(jpeg):
+        handler = type("Handler", (_Handler,), {"jpeg": jpeg})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.connections = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def _read_frame(source, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        frame = source.read(timeout=0.2)
+        if frame is not None:
+            return frame
+    return None
+
+
+def test_content_length_keeps_embedded_thumbnail(serve):
+    from backend.core.sources import MjpegSource
+    jpg = _with_thumbnail(_jpeg(WIDTH, HEIGHT, 90))
+    _, url = serve(jpg)
+    source = MjpegSource(url + "/len")
+    source._open()
+    try:
+        assert source._next_jpeg() == jpg # Not cut at the thumbnail's EOI
+    finally:
+        source._close()
+
+    source = MjpegSource(url + "/len")
+    source.start()
+    try:
+        frame = _read_frame(source)
+        assert frame is not None and frame.shape == (HEIGHT, WIDTH, 3)
+    finally:
+        source.stop()
+
+
+def test_missing_content_length_falls_back_to_markers(serve):
+    from backend.core.sources import MjpegSource
+    jpg = _jpeg(WIDTH, HEIGHT, 90)
+    _, url = serve(jpg)
+    source = MjpegSource(url + "/nolen")
+    source._open()
+    try:
+        assert source._next_jpeg() == jpg
+        assert source._next_jpeg() == jpg
+    finally:
+        source._close()
+
+
+def test_reconnects_when_stream_closes(serve, monkeypatch):
+    from backend.config.config import Config
+    from backend.core.sources import MjpegSource
+    monkeypatch.setattr(Config, "SOURCE_RECONNECT_BACKOFF_S", 0.05)
+    server, url = serve(_jpeg(WIDTH, HEIGHT, 90))
+    source = MjpegSource(url + "/drop")
+    source.start()
+    try:
+        end = time.time() + 10
+        while time.time() < end and source.reconnects < 2:
+            source.read(timeout=0.2)
+        assert source.reconnects >= 2
+        assert server.connections >= 3
+        assert _read_frame(source) is not None
+    finally:
+        source.stop()
+
+
+def test_reduced_resolution_decode(serve):
+    from backend.core.sources import MjpegSource
+    _, url = serve(_jpeg(WIDTH, HEIGHT, 90))
+    source = MjpegSource(url + "/len", decode_scale=2)
+    source.start()
+    try:
+        frame = _read_frame(source)
+        assert frame is not None and frame.shape == (HEIGHT // 2, WIDTH // 2, 3)
+    finally:
+        source.stop()